@@ -0,0 +1,95 @@
+"""
+Latency of GET /api/authors/stat as the catalogue grows.
+
+Runs against the test database (settings.TEST_DATABASE_URL): for every size the
+tables are recreated, filled with synthetic authors and books, and the first and
+a deep page of /stat are requested through the ASGI app.
+
+    python -m benchmarks.authors_stat
+"""
+import asyncio
+import random
+import statistics
+import time
+from uuid import uuid4
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from config import settings
+from src.database.database import get_async_session, get_read_session
+from src.database.models import Author, Base, Book, BookGenre
+from src.main import app
+
+SIZES = [(1_000, 10), (10_000, 10), (50_000, 10)]
+PAGE_SIZE = 100
+REPEATS = 30
+CHUNK = 5_000
+
+engine = create_async_engine(settings.TEST_DATABASE_URL, poolclass=NullPool)
+session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def override_get_async_session():
+    async with session_factory() as session:
+        yield session
+
+
+async def seed(authors_count: int, books_per_author: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        genres = list(BookGenre)
+        authors = [{"id": uuid4(), "title": f"Author {i}"} for i in range(authors_count)]
+        for start in range(0, len(authors), CHUNK):
+            await conn.execute(insert(Author), authors[start:start + CHUNK])
+        books = []
+        for author in authors:
+            for i in range(random.randint(0, 2 * books_per_author)):
+                books.append({"id": uuid4(), "title": f"Book {i}", "author_id": author["id"],
+                              "genre": random.choice(genres), "count": random.randint(1, 50)})
+                if len(books) == CHUNK:
+                    await conn.execute(insert(Book), books)
+                    books = []
+        if books:
+            await conn.execute(insert(Book), books)
+        await conn.exec_driver_sql("ANALYZE")
+
+
+async def measure(ac: AsyncClient, params: dict) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        response = await ac.get("/api/authors/stat", params=params)
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return statistics.median(timings) * 1000
+
+
+async def main() -> None:
+    app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides[get_read_session] = override_get_async_session
+    print(f"{'authors':>8} {'books~':>8} {'first ms':>9} {'deep ms':>9} {'+copies,genres ms':>18}")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test",
+                           follow_redirects=True) as ac:
+        for authors_count, books_per_author in SIZES:
+            await seed(authors_count, books_per_author)
+            params = {"limit": PAGE_SIZE}
+            first = await measure(ac, params)
+
+            cursor = None
+            for _ in range(authors_count // PAGE_SIZE // 2):
+                response = await ac.get("/api/authors/stat", params={**params, "cursor": cursor} if cursor else params)
+                cursor = response.headers["X-Next-Cursor"]
+            deep = await measure(ac, {**params, "cursor": cursor})
+            full = await measure(ac, {**params, "cursor": cursor, "copies": True, "genres": True})
+            print(f"{authors_count:>8} {authors_count * books_per_author:>8} {first:>9.2f} {deep:>9.2f} {full:>18.2f}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""
+Synthetic catalogue for benchmarks: N authors and M books spread over every BookGenre,
+bulk-loaded with COPY. The same seed always produces the same rows (ids included).
+
+Recreates all tables of the target database, so it defaults to settings.TEST_DATABASE_URL.
+
+    python -m benchmarks.catalogue --authors 10000 --books 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import func, literal, select, tablesample
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings
+from src.database.database import create_engine
+from src.database.models import Author, Base, Book, BookGenre
+
+CHUNK = 50_000
+SAMPLE_SIZE = 1_000
+WORDS = ["война", "мир", "ночь", "дорога", "море", "город", "тайна", "сад", "зима", "огонь", "река", "письмо",
+         "остров", "звезда", "дом", "время", "память", "ветер", "лес", "сердце", "дождь", "камень", "небо", "сон"]
+NAMES = ["Анна", "Борис", "Вера", "Глеб", "Дарья", "Егор", "Жанна", "Иван", "Кира", "Лев", "Мария", "Олег"]
+SURNAMES = ["Орлов", "Белова", "Зимин", "Костина", "Лебедев", "Морозова", "Новиков", "Панова", "Соколов"]
+
+
+@dataclass
+class Catalogue:
+    # Row counts plus samples of existing rows that scenarios draw their requests from.
+    authors: int
+    books: int
+    author_ids: List[UUID] = field(default_factory=list)
+    books_sample: List[Dict] = field(default_factory=list)
+    words: List[str] = field(default_factory=lambda: list(WORDS))
+
+
+def _uuid(rng: random.Random) -> UUID:
+    return UUID(int=rng.getrandbits(128), version=4)
+
+
+def _author_rows(rng: random.Random, count: int):
+    for i in range(count):
+        yield _uuid(rng), f"{rng.choice(NAMES)} {rng.choice(SURNAMES)} {i}"
+
+
+def _book_rows(rng: random.Random, count: int, author_ids: List[UUID]):
+    genres = [genre.name for genre in BookGenre]
+    for i in range(count):
+        title = f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {i}"
+        description = None if rng.random() < 0.3 else " ".join(rng.choices(WORDS, k=rng.randint(5, 20)))
+        # Books are spread over genres evenly; about one in ten is out of stock.
+        count_ = 0 if rng.random() < 0.1 else rng.randint(1, 100)
+        yield _uuid(rng), title, genres[i % len(genres)], rng.choice(author_ids), count_, description
+
+
+async def generate(engine: AsyncEngine, authors: int, books: int, seed: int = 0) -> Catalogue:
+    rng = random.Random(seed)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        author_rows = list(_author_rows(rng, authors))
+        await raw.copy_records_to_table("author", records=author_rows, columns=["id", "title"])
+        author_ids = [row[0] for row in author_rows]
+        rows = _book_rows(rng, books, author_ids)
+        while chunk := [row for _, row in zip(range(CHUNK), rows)]:
+            await raw.copy_records_to_table(
+                "book", records=chunk, columns=["id", "title", "genre", "author_id", "count", "description"])
+        await conn.commit()
+        await conn.exec_driver_sql("ANALYZE")
+        await conn.commit()
+    return await load(engine, seed)
+
+
+def _percent(rows: int) -> float:
+    return min(100.0, SAMPLE_SIZE * 100.0 / max(rows, 1))
+
+
+async def load(engine: AsyncEngine, seed: int = 0) -> Catalogue:
+    # Samples an already generated catalogue (e.g. when re-running scenarios without regenerating).
+    async with engine.connect() as conn:
+        authors = (await conn.execute(select(func.count()).select_from(Author))).scalar_one()
+        books = (await conn.execute(select(func.count()).select_from(Book))).scalar_one()
+        sampled_authors = tablesample(Author, func.bernoulli(_percent(authors)), seed=literal(seed))
+        sampled_books = tablesample(Book, func.bernoulli(_percent(books)), seed=literal(seed))
+        author_ids = (await conn.execute(select(sampled_authors.c.id).limit(SAMPLE_SIZE))).scalars().all()
+        books_sample = (await conn.execute(
+            select(sampled_books.c.id, sampled_books.c.title, sampled_books.c.genre, sampled_books.c.author_id)
+            .limit(SAMPLE_SIZE))).mappings().all()
+    return Catalogue(authors=authors, books=books, author_ids=list(author_ids),
+                     books_sample=[dict(book) for book in books_sample])
+
+
+async def main(authors: int, books: int, seed: int, url: Optional[str]) -> None:
+    engine = create_engine(url or settings.TEST_DATABASE_URL)
+    started = time.perf_counter()
+    catalogue = await generate(engine, authors, books, seed)
+    await engine.dispose()
+    print(f"{catalogue.authors} authors, {catalogue.books} books in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic book catalogue")
+    parser.add_argument("--authors", type=int, default=10_000)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", default=None, help="database URL (default: the test database)")
+    args = parser.parse_args()
+    asyncio.run(main(args.authors, args.books, args.seed, args.url))
@@ -0,0 +1,196 @@
+"""
+Load scenarios against a synthetic catalogue, reported as p50/p95/p99 latency and throughput.
+
+The catalogue is generated into the test database (settings.TEST_DATABASE_URL, all tables
+are recreated) unless --reuse is given, and dropped after the run unless --keep is given:
+the test suite expects an empty test database. Requests go through httpx either in-process via
+ASGITransport (--target asgi) or to a uvicorn started on a local port (--target uvicorn,
+needs the uvicorn package). Results can be saved as a baseline and later runs compared
+against it; a run fails (exit code 1) when a scenario regresses beyond --tolerance.
+
+    python -m benchmarks.run --authors 2000 --books 100000 --keep --save benchmarks/baseline.json
+    python -m benchmarks.run --reuse --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+
+from httpx import ASGITransport, AsyncClient
+
+from benchmarks.catalogue import Catalogue, generate, load
+from benchmarks.scenarios import SCENARIOS, Scenario
+from config import settings
+from src.database.database import create_engine, get_async_session, get_read_session, get_read_session_factory, \
+    get_session_factory
+from src.database.models import Base
+
+WARMUP = 10
+
+
+def percentile(timings: List[float], q: int) -> float:
+    return statistics.quantiles(timings, n=100, method="inclusive")[q - 1] if len(timings) > 1 else timings[0]
+
+
+async def run_scenario(client: AsyncClient, scenario: Scenario, catalogue: Catalogue, requests: int,
+                       concurrency: int, seed: int) -> Dict[str, float]:
+    rng = random.Random(seed)
+    planned = [scenario.build(rng, catalogue) for _ in range(WARMUP + requests)]
+    for request in planned[:WARMUP]:
+        await client.request(request.method, request.url, params=request.params, json=request.json)
+
+    queue = iter(planned[WARMUP:])
+    timings: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for request in queue:
+            started = time.perf_counter()
+            response = await client.request(request.method, request.url, params=request.params, json=request.json)
+            timings.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "p50_ms": round(percentile(timings, 50) * 1000, 2),
+        "p95_ms": round(percentile(timings, 95) * 1000, 2),
+        "p99_ms": round(percentile(timings, 99) * 1000, 2),
+        "rps": round(len(timings) / elapsed, 1),
+        "errors": errors,
+    }
+
+
+@asynccontextmanager
+async def asgi_client(engine) -> AsyncIterator[AsyncClient]:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+    from src.main import app
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_async_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides[get_read_session] = override_get_async_session
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    app.dependency_overrides[get_read_session_factory] = lambda: session_factory
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+
+
+@asynccontextmanager
+async def uvicorn_client() -> AsyncIterator[AsyncClient]:
+    # The server gets the test database as its main one, so it serves the generated catalogue.
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = {**os.environ, "POSTGRES_USER": settings.POSTGRES_USER_TEST, "POSTGRES_PASSWORD": settings.POSTGRES_PASSWORD_TEST,
+           "POSTGRES_DB": settings.POSTGRES_DB_TEST, "POSTGRES_HOST": settings.POSTGRES_HOST_TEST,
+           "DB_CREATE_ALL": "true"}
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port),
+                               "--log-level", "warning", "--no-access-log"], env=env)
+    try:
+        async with AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            for _ in range(100):
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn exited; is it installed?")
+                try:
+                    await client.get("/metrics")
+                    break
+                except OSError:
+                    await asyncio.sleep(0.1)
+            yield client
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']} -> {result['p95_ms']} ms")
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['rps']} -> {result['rps']} rps")
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    engine = create_engine(settings.TEST_DATABASE_URL)
+    if args.reuse:
+        catalogue = await load(engine, args.seed)
+    else:
+        started = time.perf_counter()
+        catalogue = await generate(engine, args.authors, args.books, args.seed)
+        print(f"generated {catalogue.authors} authors, {catalogue.books} books "
+              f"in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    client_context = asgi_client(engine) if args.target == "asgi" else uvicorn_client()
+    results = {}
+    print(f"{'scenario':<14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rps':>8} {'errors':>7}")
+    async with client_context as client:
+        # Write scenarios go last so that reads see the catalogue as generated.
+        for name in sorted(names, key=lambda name: SCENARIOS[name].writes):
+            result = await run_scenario(client, SCENARIOS[name], catalogue, args.requests, args.concurrency,
+                                        args.seed)
+            results[name] = result
+            print(f"{name:<14} {result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8} "
+                  f"{result['rps']:>8} {result['errors']:>7}")
+    if not args.keep:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+    report = {
+        "meta": {"authors": catalogue.authors, "books": catalogue.books, "target": args.target,
+                 "requests": args.requests, "concurrency": args.concurrency, "seed": args.seed},
+        "scenarios": results,
+    }
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file)["scenarios"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run benchmark scenarios against a synthetic catalogue")
+    parser.add_argument("--authors", type=int, default=10_000)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reuse", action="store_true", help="use the catalogue already in the test database")
+    parser.add_argument("--keep", action="store_true", help="leave the catalogue in place for --reuse")
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--scenarios", default=None, help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--save", default=None, help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument("--baseline", default=None, help="compare with a saved result; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,71 @@
+import random
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+from uuid import uuid4
+
+from benchmarks.catalogue import Catalogue
+from src.database.models import BookGenre
+
+
+@dataclass
+class Request:
+    method: str
+    url: str
+    params: Optional[Dict[str, Any]] = None
+    json: Any = None
+
+
+@dataclass
+class Scenario:
+    name: str
+    # Builds the next request from the catalogue sample; called once per request.
+    build: Callable[[random.Random, Catalogue], Request]
+    writes: bool = False
+
+
+def _list(rng: random.Random, catalogue: Catalogue) -> Request:
+    return Request("GET", "/api/books/", {"limit": 50, "genre": rng.choice(list(BookGenre)).value,
+                                          "order_by": rng.choice(["id", "title", "count"])})
+
+
+def _get(rng: random.Random, catalogue: Catalogue) -> Request:
+    return Request("GET", f"/api/books/{rng.choice(catalogue.books_sample)['id']}")
+
+
+def _author_stat(rng: random.Random, catalogue: Catalogue) -> Request:
+    return Request("GET", f"/api/authors/{rng.choice(catalogue.author_ids)}/stat")
+
+
+def _authors_stat(rng: random.Random, catalogue: Catalogue) -> Request:
+    return Request("GET", "/api/authors/stat", {"limit": 100, "copies": True, "genres": True})
+
+
+def _copies(rng: random.Random, catalogue: Catalogue) -> Request:
+    return Request("GET", "/api/books/copies/", {"top": 100})
+
+
+def _delivery(rng: random.Random, catalogue: Catalogue) -> Request:
+    # Half restocks of existing books, half new titles.
+    books = [{"title": book["title"], "author_id": str(book["author_id"]), "genre": book["genre"].value,
+              "count": rng.randint(1, 10)}
+             for book in rng.sample(catalogue.books_sample, 10)]
+    books += [{"title": f"Поставка {uuid4()}", "author_id": str(rng.choice(catalogue.author_ids)),
+               "genre": rng.choice(list(BookGenre)).value, "count": rng.randint(1, 10)}
+              for _ in range(10)]
+    return Request("POST", "/api/books/delivery", json=books)
+
+
+def _search(rng: random.Random, catalogue: Catalogue) -> Request:
+    return Request("GET", "/api/books/search", {"q": " ".join(rng.sample(catalogue.words, rng.randint(1, 2))),
+                                                "limit": 20})
+
+
+SCENARIOS = {scenario.name: scenario for scenario in [
+    Scenario("list", _list),
+    Scenario("get", _get),
+    Scenario("author_stat", _author_stat),
+    Scenario("authors_stat", _authors_stat),
+    Scenario("copies", _copies),
+    Scenario("delivery", _delivery, writes=True),
+    Scenario("search", _search),
+]}
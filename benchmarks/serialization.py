@@ -0,0 +1,71 @@
+"""
+Serialization cost of a list response: the response_model path against the column fast path.
+
+The model path is what FastAPI does for `response_model=List[BookCreateResponse]` with ORM
+rows: validate every object into a model, dump it to JSON-compatible data and encode that
+with JSONResponse (json.dumps). The fast path serializes column rows through a TypedDict
+twin of the model (rows_response).
+Both produce the same bytes; only in-process serialization is timed, no database.
+
+    python -m benchmarks.serialization
+"""
+import random
+import statistics
+import time
+from typing import List
+from uuid import uuid4
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from src.api.responses import rows_adapter, rows_response
+from src.api.schemas.book import BookCreateResponse
+from src.database.models import Book, BookGenre
+
+SIZES = [1_000, 10_000, 100_000]
+REPEATS = 5
+
+books_adapter = TypeAdapter(List[BookCreateResponse])
+book_rows_adapter = rows_adapter(BookCreateResponse)
+
+
+def model_path(books: list) -> bytes:
+    books = books_adapter.validate_python(books, from_attributes=True)
+    return JSONResponse(books_adapter.dump_python(books, mode="json")).body
+
+
+def fast_path(rows: list) -> bytes:
+    return rows_response(book_rows_adapter, rows).body
+
+
+def generate(size: int) -> list:
+    genres = list(BookGenre)
+    authors = [uuid4() for _ in range(max(size // 10, 1))]
+    return [{"id": uuid4(), "title": f"Книга {i}", "genre": random.choice(genres), "count": random.randint(0, 50),
+             "author_id": random.choice(authors), "description": None if i % 3 else f"Описание книги {i}"}
+            for i in range(size)]
+
+
+def measure(function, value) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        function(value)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    random.seed(0)
+    print(f"{'rows':>8} {'model ms':>10} {'fast ms':>9} {'speedup':>8}")
+    for size in SIZES:
+        rows = generate(size)
+        books = [Book(**row) for row in rows]
+        assert model_path(books) == fast_path(rows)
+        model = measure(model_path, books)
+        fast = measure(fast_path, rows)
+        print(f"{size:>8} {model:>10.1f} {fast:>9.1f} {model / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
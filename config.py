@@ -1,9 +1,18 @@
+from typing import Dict, List, Literal, Optional
+
 from dotenv import load_dotenv
+from pydantic import BaseModel, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 load_dotenv()
 
 
+class AdmissionLimit(BaseModel):
+    concurrency: int
+    queue: int
+    timeout: float
+
+
 class Settings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
@@ -17,6 +26,82 @@ class Settings(BaseSettings):
     POSTGRES_HOST_TEST: str
     POSTGRES_PORT_TEST: str
 
+    POSTGRES_REPLICA_HOST: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[str] = None
+
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: Optional[int] = None
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    DB_POOL_WARMUP: int = 5
+    DB_CREATE_ALL: bool = False
+
+    DEFAULT_PAGE_SIZE: int = 50
+    MAX_PAGE_SIZE: int = 500
+    STREAM_CHUNK_SIZE: int = 1000
+    MAX_BATCH_SIZE: int = 500
+    DELIVERY_BATCH_SIZE: int = 1000
+    IMPORT_BATCH_SIZE: int = 10000
+    IMPORT_MAX_REPORTED_ERRORS: int = 100
+    EXPORT_QUEUE_SIZE: int = 16
+    AUTHOR_NAME_CACHE_SIZE: int = 10000
+    AUTHOR_NAME_CACHE_TTL: float = 300
+    DELIVERY_BACKGROUND_THRESHOLD: int = 1000
+    JOB_WORKERS: int = 2
+    JOB_CHUNK_SIZE: int = 1000
+    JOB_LEASE: float = 60
+    JOB_POLL_INTERVAL: float = 1
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_MAX_REPORTED_FAILURES: int = 1000
+    SEARCH_FUZZY: bool = True
+    IDEMPOTENCY_TTL: float = 24 * 60 * 60
+    CHANGES_TIMEOUT: float = 30
+    CHANGES_MAX_TIMEOUT: float = 300
+    CHANGES_KEEPALIVE: float = 15
+    CHANGES_POLL_INTERVAL: float = 5
+    CHANGES_BUFFER_SIZE: int = 10000
+    CHANGES_RETENTION: float = 7 * 24 * 60 * 60
+
+    CACHE_BACKEND: Literal["memory", "redis", "none"] = "memory"
+    CACHE_TTL: float = 60
+    CACHE_MAX_SIZE: int = 10000
+    CACHE_REDIS_URL: Optional[str] = None
+
+    # Admission control per route group (see src/api/admission.py): requests in flight, requests
+    # waiting for a slot and how long they may wait before a 503.
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_LIMITS: Dict[str, AdmissionLimit] = {
+        "read": AdmissionLimit(concurrency=16, queue=200, timeout=1),
+        "write": AdmissionLimit(concurrency=8, queue=100, timeout=2),
+        "heavy": AdmissionLimit(concurrency=4, queue=16, timeout=1),
+    }
+    ADMISSION_ROUTE_GROUPS: Dict[str, str] = {
+        "get_top_n_books_by_copies": "heavy",
+        "export_books": "heavy",
+        "bulk_data": "heavy",
+        "import_delivery": "heavy",
+        "get_all_authors_books_count": "heavy",
+        "export_authors": "heavy",
+    }
+    ADMISSION_RETRY_AFTER: int = 1
+    HEALTH_TIMEOUT: float = 1
+
+    HTTP_CACHE_CONTROL: str = "no-cache"
+    HTTP_CACHE_CONTROL_ROUTES: Dict[str, str] = {}
+
+    METRICS_LATENCY_BUCKETS: List[float] = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+    SLOW_QUERY_MS: Optional[float] = 200
+    N_PLUS_ONE_THRESHOLD: int = 10
+    SERVER_TIMING: bool = False
+
+    @field_validator("SLOW_QUERY_MS", mode="before")
+    @classmethod
+    def empty_disables(cls, value):
+        return None if value == "" else value
+
     @property
     def DATABASE_URL(self):
         return (f"postgresql+asyncpg://"
@@ -26,6 +111,17 @@ class Settings(BaseSettings):
                 f"{self.POSTGRES_PORT}/"
                 f"{self.POSTGRES_DB}")
 
+    @property
+    def REPLICA_DATABASE_URL(self):
+        if self.POSTGRES_REPLICA_HOST is None:
+            return None
+        return (f"postgresql+asyncpg://"
+                f"{self.POSTGRES_USER}:"
+                f"{self.POSTGRES_PASSWORD}@"
+                f"{self.POSTGRES_REPLICA_HOST}:"
+                f"{self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT}/"
+                f"{self.POSTGRES_DB}")
+
     @property
     def TEST_DATABASE_URL(self):
         return (f"postgresql+asyncpg://"
@@ -2,11 +2,13 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import text
 
 from alembic import context
 
 from config import settings
-from src.database.database import Base
+from src.database.models import Base
+from src.database.schema import SCHEMA_LOCK_ID
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -73,8 +75,17 @@ def run_migrations_online() -> None:
             connection=connection, target_metadata=target_metadata
         )
 
-        with context.begin_transaction():
-            context.run_migrations()
+        # Application workers wait on this lock at startup instead of reading a half-applied schema.
+        # It is taken for the session, not the transaction: migrations that run outside the
+        # transaction (autocommit_block) would otherwise release it halfway.
+        connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": SCHEMA_LOCK_ID})
+        connection.commit()
+        try:
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": SCHEMA_LOCK_ID})
+            connection.commit()
 
 
 if context.is_offline_mode():
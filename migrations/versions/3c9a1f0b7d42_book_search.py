@@ -0,0 +1,55 @@
+"""full-text and trigram search on books and authors
+
+Revision ID: 3c9a1f0b7d42
+Revises: efd8be5335ed
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9a1f0b7d42'
+down_revision: Union[str, None] = 'efd8be5335ed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # pg_trgm is optional: without it the trigram indexes are skipped and fuzzy search has to be
+    # turned off with SEARCH_FUZZY=false.
+    has_trgm = op.get_bind().scalar(
+        sa.text("SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')"))
+    if has_trgm:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column('book', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('russian'::regconfig, title || ' ' || coalesce(description, ''))", persisted=True),
+        nullable=True))
+    op.create_index('ix_book_search_vector', 'book', ['search_vector'], unique=False, postgresql_using='gin')
+    op.add_column('author', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('russian'::regconfig, title)", persisted=True),
+        nullable=True))
+    op.create_index('ix_author_search_vector', 'author', ['search_vector'], unique=False, postgresql_using='gin')
+    # Trigram indexes back the typo-tolerant "%" matching; they live only in migrations
+    # because they need the pg_trgm extension.
+    if not has_trgm:
+        return
+    op.create_index('ix_book_title_trgm', 'book', ['title'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index('ix_author_title_trgm', 'author', ['title'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS ix_author_title_trgm')
+    op.execute('DROP INDEX IF EXISTS ix_book_title_trgm')
+    op.drop_index('ix_author_search_vector', table_name='author')
+    op.drop_column('author', 'search_vector')
+    op.drop_index('ix_book_search_vector', table_name='book')
+    op.drop_column('book', 'search_vector')
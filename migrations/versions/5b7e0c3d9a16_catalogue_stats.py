@@ -0,0 +1,150 @@
+"""trigger-maintained catalogue statistics
+
+Revision ID: 5b7e0c3d9a16
+Revises: 8f2d6e4a1c90
+Create Date: 2026-10-18 14:05:52.660194
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e0c3d9a16'
+down_revision: Union[str, None] = '8f2d6e4a1c90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+GENRE = postgresql.ENUM('FICTION', 'NON_FICTION', 'FANTASY', 'SCIENCE_FICTION', 'MYSTERY', 'THRILLER', 'ROMANCE',
+                        'HORROR', 'BIOGRAPHY', 'HISTORICAL', 'SELF_HELP', 'CHILDREN', 'CLASSICS', 'POETRY',
+                        name='bookgenre', create_type=False)
+
+STATS_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION book_stats_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        delta_authors uuid[];
+        delta_genres bookgenre[];
+        delta_books bigint[];
+        delta_copies bigint[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, count(*) AS n, sum(count) AS c
+                  FROM new_rows GROUP BY author_id, genre) d;
+        ELSIF TG_OP = 'DELETE' THEN
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, -count(*) AS n, -sum(count) AS c
+                  FROM old_rows GROUP BY author_id, genre) d;
+        ELSE
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, sum(n) AS n, sum(c) AS c
+                  FROM (SELECT author_id, genre, 1 AS n, count AS c FROM new_rows
+                        UNION ALL
+                        SELECT author_id, genre, -1, -count FROM old_rows) r
+                  GROUP BY author_id, genre
+                  HAVING sum(n) <> 0 OR sum(c) <> 0) d;
+        END IF;
+        IF delta_authors IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        -- An upsert fires both the INSERT and the UPDATE trigger, and each call locks its own
+        -- set of stats rows, so key order alone cannot keep two writers from deadlocking across
+        -- calls. Stats writers are serialized per transaction instead: nearly every writer shares
+        -- genre_stats rows anyway.
+        PERFORM pg_advisory_xact_lock(hashtext('book_stats'));
+        -- Rows are upserted in key order so concurrent writers lock them in the same order.
+        WITH changes AS (
+            SELECT * FROM unnest(delta_authors, delta_genres, delta_books, delta_copies) AS c(author_id, genre, books, copies)
+        ), by_author_genre AS (
+            INSERT INTO author_genre_stats AS s (author_id, genre, books, copies)
+            SELECT author_id, genre, books, copies FROM changes ORDER BY author_id, genre
+            ON CONFLICT (author_id, genre)
+            DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies
+        ), by_author AS (
+            INSERT INTO author_stats AS s (author_id, books, copies)
+            SELECT author_id, sum(books), sum(copies) FROM changes GROUP BY author_id ORDER BY author_id
+            ON CONFLICT (author_id)
+            DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies
+        )
+        INSERT INTO genre_stats AS s (genre, books, copies)
+        SELECT genre, sum(books), sum(copies) FROM changes GROUP BY genre ORDER BY genre
+        ON CONFLICT (genre)
+        DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies;
+        RETURN NULL;
+    END;
+    $$
+    """,
+    """
+    CREATE TRIGGER book_stats_insert AFTER INSERT ON book
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_stats_apply()
+    """,
+    """
+    CREATE TRIGGER book_stats_update AFTER UPDATE ON book
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_stats_apply()
+    """,
+    """
+    CREATE TRIGGER book_stats_delete AFTER DELETE ON book
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_stats_apply()
+    """,
+]
+
+
+def upgrade() -> None:
+    op.create_table('author_stats',
+    sa.Column('author_id', sa.UUID(), nullable=False),
+    sa.Column('books', sa.BigInteger(), nullable=False),
+    sa.Column('copies', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['author_id'], ['author.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('author_id')
+    )
+    op.create_table('author_genre_stats',
+    sa.Column('author_id', sa.UUID(), nullable=False),
+    sa.Column('genre', GENRE, nullable=False),
+    sa.Column('books', sa.BigInteger(), nullable=False),
+    sa.Column('copies', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['author_id'], ['author.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('author_id', 'genre')
+    )
+    op.create_table('genre_stats',
+    sa.Column('genre', GENRE, nullable=False),
+    sa.Column('books', sa.BigInteger(), nullable=False),
+    sa.Column('copies', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('genre')
+    )
+    # Backfill under a SHARE lock so no book write slips in between the backfill and the triggers.
+    op.execute('LOCK TABLE book IN SHARE MODE')
+    op.execute("""
+        INSERT INTO author_genre_stats (author_id, genre, books, copies)
+        SELECT author_id, genre, count(*), sum(count) FROM book GROUP BY author_id, genre
+    """)
+    op.execute("""
+        INSERT INTO author_stats (author_id, books, copies)
+        SELECT author_id, count(*), sum(count) FROM book GROUP BY author_id
+    """)
+    op.execute("""
+        INSERT INTO genre_stats (genre, books, copies)
+        SELECT genre, count(*), sum(count) FROM book GROUP BY genre
+    """)
+    for statement in STATS_DDL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER book_stats_delete ON book')
+    op.execute('DROP TRIGGER book_stats_update ON book')
+    op.execute('DROP TRIGGER book_stats_insert ON book')
+    op.execute('DROP FUNCTION book_stats_apply()')
+    op.drop_table('genre_stats')
+    op.drop_table('author_genre_stats')
+    op.drop_table('author_stats')
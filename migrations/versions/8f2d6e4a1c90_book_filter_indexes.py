@@ -0,0 +1,35 @@
+"""indexes for book filters and sorting
+
+Revision ID: 8f2d6e4a1c90
+Revises: 3c9a1f0b7d42
+Create Date: 2026-10-18 12:40:05.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2d6e4a1c90'
+down_revision: Union[str, None] = '3c9a1f0b7d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so that an existing catalogue stays writable during the upgrade.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_book_genre', 'book', ['genre', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_book_author_id', 'book', ['author_id', 'id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_book_count', 'book', [sa.text('count DESC'), 'id'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_book_count', table_name='book', postgresql_concurrently=True)
+        op.drop_index('ix_book_author_id', table_name='book', postgresql_concurrently=True)
+        op.drop_index('ix_book_genre', table_name='book', postgresql_concurrently=True)
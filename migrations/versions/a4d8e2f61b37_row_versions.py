@@ -0,0 +1,48 @@
+"""row versions for conditional requests
+
+Revision ID: a4d8e2f61b37
+Revises: 5b7e0c3d9a16
+Create Date: 2026-10-18 15:20:31.402816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d8e2f61b37'
+down_revision: Union[str, None] = '5b7e0c3d9a16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROW_VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION row_version_bump() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    NEW.updated_at := now();
+    RETURN NEW;
+END;
+$$
+"""
+
+
+def upgrade() -> None:
+    # Constant / now() defaults do not rewrite the tables.
+    for table in ('author', 'book'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(),
+                                       nullable=False))
+    op.execute(ROW_VERSION_FUNCTION)
+    for table in ('author', 'book'):
+        op.execute(f"CREATE TRIGGER {table}_row_version BEFORE UPDATE ON {table} "
+                   f"FOR EACH ROW EXECUTE FUNCTION row_version_bump()")
+
+
+def downgrade() -> None:
+    for table in ('book', 'author'):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_row_version ON {table}")
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
+    op.execute("DROP FUNCTION IF EXISTS row_version_bump()")
@@ -0,0 +1,96 @@
+"""relay change feed events instead of serializing catalogue writers
+
+Revision ID: a7d3f9b2c581
+Revises: f5a1c8d2e6b9
+Create Date: 2026-10-19 00:18:32.551093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3f9b2c581'
+down_revision: Union[str, None] = 'f5a1c8d2e6b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Writers queue events in catalogue_change_pending; the relay assigns seq (src.database.changes).
+CHANGE_RECORD_FUNCTION = """
+CREATE OR REPLACE FUNCTION catalogue_change_record() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO catalogue_change_pending (entity, entity_id, op, version)
+        SELECT TG_TABLE_NAME, id, 'delete', version FROM old_rows ORDER BY id;
+    ELSE
+        INSERT INTO catalogue_change_pending (entity, entity_id, op, version)
+        SELECT TG_TABLE_NAME, id, lower(TG_OP), version FROM new_rows ORDER BY id;
+    END IF;
+    IF FOUND THEN
+        PERFORM pg_notify('catalogue_change', '');
+    END IF;
+    RETURN NULL;
+END;
+$$
+"""
+
+# As of d3a9b6c14e72, restored on downgrade.
+PREVIOUS_CHANGE_RECORD_FUNCTION = """
+CREATE OR REPLACE FUNCTION catalogue_change_record() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO catalogue_change (entity, entity_id, op, version)
+        SELECT TG_TABLE_NAME, id, 'delete', version FROM old_rows ORDER BY id;
+    ELSE
+        INSERT INTO catalogue_change (entity, entity_id, op, version)
+        SELECT TG_TABLE_NAME, id, lower(TG_OP), version FROM new_rows ORDER BY id;
+    END IF;
+    IF FOUND THEN
+        PERFORM pg_notify('catalogue_change',
+                          currval(pg_get_serial_sequence('catalogue_change', 'seq'))::text);
+    END IF;
+    RETURN NULL;
+END;
+$$
+"""
+
+WRITE_LOCK_FUNCTION = """
+CREATE OR REPLACE FUNCTION catalogue_write_lock() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('book_stats'));
+    RETURN NULL;
+END;
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table('catalogue_change_pending',
+    sa.Column('id', sa.BigInteger(), sa.Identity(always=False), nullable=False),
+    sa.Column('entity', sa.String(length=16), nullable=False),
+    sa.Column('entity_id', sa.UUID(), nullable=False),
+    sa.Column('op', sa.String(length=16), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(CHANGE_RECORD_FUNCTION)
+    for table in ('author', 'book'):
+        op.execute(f"DROP TRIGGER {table}_write_lock ON {table}")
+    op.execute("DROP FUNCTION catalogue_write_lock()")
+
+
+def downgrade() -> None:
+    op.execute(WRITE_LOCK_FUNCTION)
+    for table in ('author', 'book'):
+        op.execute(f"CREATE TRIGGER {table}_write_lock BEFORE INSERT OR UPDATE OR DELETE ON {table} "
+                   f"FOR EACH STATEMENT EXECUTE FUNCTION catalogue_write_lock()")
+    op.execute(PREVIOUS_CHANGE_RECORD_FUNCTION)
+    # Events not relayed yet go to the feed as they are.
+    op.execute("""
+        INSERT INTO catalogue_change (entity, entity_id, op, version, changed_at)
+        SELECT entity, entity_id, op, version, changed_at FROM catalogue_change_pending ORDER BY id
+    """)
+    op.drop_table('catalogue_change_pending')
@@ -0,0 +1,81 @@
+"""apply genre stats deltas of books whose author is deleted in the same transaction
+
+Revision ID: b4c8e1d7a052
+Revises: a7d3f9b2c581
+Create Date: 2026-10-19 01:07:44.318260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4c8e1d7a052'
+down_revision: Union[str, None] = 'a7d3f9b2c581'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# f5a1c8d2e6b9 creates this version too; databases migrated past it before the fix get it here.
+FLUSH_FUNCTION = """
+    CREATE OR REPLACE FUNCTION book_stats_flush() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        delta_authors uuid[];
+        delta_genres bookgenre[];
+        delta_books bigint[];
+        delta_copies bigint[];
+    BEGIN
+        -- Fires once per queued statement; the first call applies them all, the rest find none.
+        WITH pending AS (
+            DELETE FROM book_stats_pending RETURNING *
+        )
+        SELECT array_agg(author_id ORDER BY author_id, genre), array_agg(genre ORDER BY author_id, genre),
+               array_agg(books ORDER BY author_id, genre), array_agg(copies ORDER BY author_id, genre)
+        INTO delta_authors, delta_genres, delta_books, delta_copies
+        FROM (SELECT c.author_id, c.genre::bookgenre AS genre, sum(c.books) AS books, sum(c.copies) AS copies
+              FROM pending
+              CROSS JOIN unnest(pending.author_ids, pending.genres, pending.books, pending.copies)
+                  AS c(author_id, genre, books, copies)
+              GROUP BY c.author_id, c.genre
+              HAVING sum(c.books) <> 0 OR sum(c.copies) <> 0) d;
+        IF delta_authors IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        -- Rows are upserted in key order, one table after another, so concurrent commits lock
+        -- them in the same order. Authors deleted in the same transaction have lost their
+        -- stats rows already, but their books still count towards genre_stats.
+        INSERT INTO author_genre_stats AS s (author_id, genre, books, copies)
+        SELECT * FROM unnest(delta_authors, delta_genres, delta_books, delta_copies)
+            AS c(author_id, genre, books, copies)
+        WHERE EXISTS (SELECT 1 FROM author WHERE author.id = c.author_id)
+        ORDER BY 1, 2
+        ON CONFLICT (author_id, genre)
+        DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies;
+        INSERT INTO author_stats AS s (author_id, books, copies)
+        SELECT author_id, sum(books), sum(copies)
+        FROM unnest(delta_authors, delta_books, delta_copies) AS c(author_id, books, copies)
+        WHERE EXISTS (SELECT 1 FROM author WHERE author.id = c.author_id)
+        GROUP BY author_id ORDER BY author_id
+        ON CONFLICT (author_id)
+        DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies;
+        INSERT INTO genre_stats AS s (genre, books, copies)
+        SELECT genre, sum(books), sum(copies)
+        FROM unnest(delta_genres, delta_books, delta_copies) AS c(genre, books, copies)
+        GROUP BY genre ORDER BY genre
+        ON CONFLICT (genre)
+        DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies;
+        RETURN NULL;
+    END;
+    $$
+"""
+
+
+def upgrade() -> None:
+    op.execute(FLUSH_FUNCTION)
+
+
+def downgrade() -> None:
+    # The previous revision defines the same function, so there is nothing to restore.
+    pass
@@ -0,0 +1,36 @@
+"""idempotency keys
+
+Revision ID: c7e1f93b2d58
+Revises: a4d8e2f61b37
+Create Date: 2026-10-18 20:41:07.185342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e1f93b2d58'
+down_revision: Union[str, None] = 'a4d8e2f61b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('idempotency_key',
+    sa.Column('scope', sa.String(length=64), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('request_hash', sa.LargeBinary(), nullable=False),
+    sa.Column('status_code', sa.SmallInteger(), nullable=True),
+    sa.Column('response', sa.LargeBinary(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'key')
+    )
+    op.create_index(op.f('ix_idempotency_key_expires_at'), 'idempotency_key', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_idempotency_key_expires_at'), table_name='idempotency_key')
+    op.drop_table('idempotency_key')
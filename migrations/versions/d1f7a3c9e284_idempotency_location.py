@@ -0,0 +1,26 @@
+"""replay the Location header of idempotent responses
+
+Revision ID: d1f7a3c9e284
+Revises: b4c8e1d7a052
+Create Date: 2026-10-19 01:32:15.604927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f7a3c9e284'
+down_revision: Union[str, None] = 'b4c8e1d7a052'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('idempotency_key', sa.Column('location', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_key', 'location')
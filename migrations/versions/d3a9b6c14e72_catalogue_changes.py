@@ -0,0 +1,81 @@
+"""catalogue change feed outbox
+
+Revision ID: d3a9b6c14e72
+Revises: c7e1f93b2d58
+Create Date: 2026-10-18 21:26:44.903517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a9b6c14e72'
+down_revision: Union[str, None] = 'c7e1f93b2d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+WRITE_LOCK_FUNCTION = """
+CREATE OR REPLACE FUNCTION catalogue_write_lock() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('book_stats'));
+    RETURN NULL;
+END;
+$$
+"""
+
+CHANGE_RECORD_FUNCTION = """
+CREATE OR REPLACE FUNCTION catalogue_change_record() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO catalogue_change (entity, entity_id, op, version)
+        SELECT TG_TABLE_NAME, id, 'delete', version FROM old_rows ORDER BY id;
+    ELSE
+        INSERT INTO catalogue_change (entity, entity_id, op, version)
+        SELECT TG_TABLE_NAME, id, lower(TG_OP), version FROM new_rows ORDER BY id;
+    END IF;
+    IF FOUND THEN
+        PERFORM pg_notify('catalogue_change',
+                          currval(pg_get_serial_sequence('catalogue_change', 'seq'))::text);
+    END IF;
+    RETURN NULL;
+END;
+$$
+"""
+
+TRANSITIONS = (("insert", "NEW TABLE AS new_rows"), ("update", "NEW TABLE AS new_rows"),
+               ("delete", "OLD TABLE AS old_rows"))
+
+
+def upgrade() -> None:
+    op.create_table('catalogue_change',
+    sa.Column('seq', sa.BigInteger(), sa.Identity(always=False), nullable=False),
+    sa.Column('entity', sa.String(length=16), nullable=False),
+    sa.Column('entity_id', sa.UUID(), nullable=False),
+    sa.Column('op', sa.String(length=16), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index(op.f('ix_catalogue_change_changed_at'), 'catalogue_change', ['changed_at'], unique=False)
+    op.execute(WRITE_LOCK_FUNCTION)
+    op.execute(CHANGE_RECORD_FUNCTION)
+    for table in ('author', 'book'):
+        op.execute(f"CREATE TRIGGER {table}_write_lock BEFORE INSERT OR UPDATE OR DELETE ON {table} "
+                   f"FOR EACH STATEMENT EXECUTE FUNCTION catalogue_write_lock()")
+        for name, transition in TRANSITIONS:
+            op.execute(f"CREATE TRIGGER {table}_change_{name} AFTER {name.upper()} ON {table} "
+                       f"REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION catalogue_change_record()")
+
+
+def downgrade() -> None:
+    for table in ('book', 'author'):
+        for name, _ in TRANSITIONS:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_change_{name} ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_write_lock ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS catalogue_change_record()")
+    op.execute("DROP FUNCTION IF EXISTS catalogue_write_lock()")
+    op.drop_index(op.f('ix_catalogue_change_changed_at'), table_name='catalogue_change')
+    op.drop_table('catalogue_change')
@@ -0,0 +1,47 @@
+"""background jobs
+
+Revision ID: e8b4c2a7f153
+Revises: d3a9b6c14e72
+Create Date: 2026-10-18 22:14:05.318240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b4c2a7f153'
+down_revision: Union[str, None] = 'd3a9b6c14e72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('job',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('failures', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('locked_by', sa.UUID(), nullable=True),
+    sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_pending', 'job', ['created_at'], unique=False,
+                    postgresql_where=sa.text("status IN ('queued', 'running')"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_pending', table_name='job', postgresql_where=sa.text("status IN ('queued', 'running')"))
+    op.drop_table('job')
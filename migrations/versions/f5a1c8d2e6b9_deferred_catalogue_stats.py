@@ -0,0 +1,201 @@
+"""apply catalogue stats deltas once per transaction
+
+Revision ID: f5a1c8d2e6b9
+Revises: e8b4c2a7f153
+Create Date: 2026-10-18 23:41:17.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a1c8d2e6b9'
+down_revision: Union[str, None] = 'e8b4c2a7f153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# book_stats_apply only queues the statement's deltas; book_stats_flush applies the
+# transaction's deltas at commit, in key order, without the global advisory lock.
+STATS_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION book_stats_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        delta_authors uuid[];
+        delta_genres bookgenre[];
+        delta_books bigint[];
+        delta_copies bigint[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, count(*) AS n, sum(count) AS c
+                  FROM new_rows GROUP BY author_id, genre) d;
+        ELSIF TG_OP = 'DELETE' THEN
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, -count(*) AS n, -sum(count) AS c
+                  FROM old_rows GROUP BY author_id, genre) d;
+        ELSE
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, sum(n) AS n, sum(c) AS c
+                  FROM (SELECT author_id, genre, 1 AS n, count AS c FROM new_rows
+                        UNION ALL
+                        SELECT author_id, genre, -1, -count FROM old_rows) r
+                  GROUP BY author_id, genre
+                  HAVING sum(n) <> 0 OR sum(c) <> 0) d;
+        END IF;
+        IF delta_authors IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        INSERT INTO book_stats_pending (author_ids, genres, books, copies)
+        VALUES (delta_authors, delta_genres::text[], delta_books, delta_copies);
+        RETURN NULL;
+    END;
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION book_stats_flush() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        delta_authors uuid[];
+        delta_genres bookgenre[];
+        delta_books bigint[];
+        delta_copies bigint[];
+    BEGIN
+        -- Fires once per queued statement; the first call applies them all, the rest find none.
+        WITH pending AS (
+            DELETE FROM book_stats_pending RETURNING *
+        )
+        SELECT array_agg(author_id ORDER BY author_id, genre), array_agg(genre ORDER BY author_id, genre),
+               array_agg(books ORDER BY author_id, genre), array_agg(copies ORDER BY author_id, genre)
+        INTO delta_authors, delta_genres, delta_books, delta_copies
+        FROM (SELECT c.author_id, c.genre::bookgenre AS genre, sum(c.books) AS books, sum(c.copies) AS copies
+              FROM pending
+              CROSS JOIN unnest(pending.author_ids, pending.genres, pending.books, pending.copies)
+                  AS c(author_id, genre, books, copies)
+              GROUP BY c.author_id, c.genre
+              HAVING sum(c.books) <> 0 OR sum(c.copies) <> 0) d;
+        IF delta_authors IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        -- Rows are upserted in key order, one table after another, so concurrent commits lock
+        -- them in the same order. Authors deleted in the same transaction have lost their
+        -- stats rows already, but their books still count towards genre_stats.
+        INSERT INTO author_genre_stats AS s (author_id, genre, books, copies)
+        SELECT * FROM unnest(delta_authors, delta_genres, delta_books, delta_copies)
+            AS c(author_id, genre, books, copies)
+        WHERE EXISTS (SELECT 1 FROM author WHERE author.id = c.author_id)
+        ORDER BY 1, 2
+        ON CONFLICT (author_id, genre)
+        DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies;
+        INSERT INTO author_stats AS s (author_id, books, copies)
+        SELECT author_id, sum(books), sum(copies)
+        FROM unnest(delta_authors, delta_books, delta_copies) AS c(author_id, books, copies)
+        WHERE EXISTS (SELECT 1 FROM author WHERE author.id = c.author_id)
+        GROUP BY author_id ORDER BY author_id
+        ON CONFLICT (author_id)
+        DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies;
+        INSERT INTO genre_stats AS s (genre, books, copies)
+        SELECT genre, sum(books), sum(copies)
+        FROM unnest(delta_genres, delta_books, delta_copies) AS c(genre, books, copies)
+        GROUP BY genre ORDER BY genre
+        ON CONFLICT (genre)
+        DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies;
+        RETURN NULL;
+    END;
+    $$
+    """,
+    """
+    CREATE CONSTRAINT TRIGGER book_stats_flush AFTER INSERT ON book_stats_pending
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION book_stats_flush()
+    """,
+]
+
+# book_stats_apply as of 5b7e0c3d9a16, restored on downgrade.
+PREVIOUS_APPLY = """
+    CREATE OR REPLACE FUNCTION book_stats_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        delta_authors uuid[];
+        delta_genres bookgenre[];
+        delta_books bigint[];
+        delta_copies bigint[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, count(*) AS n, sum(count) AS c
+                  FROM new_rows GROUP BY author_id, genre) d;
+        ELSIF TG_OP = 'DELETE' THEN
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, -count(*) AS n, -sum(count) AS c
+                  FROM old_rows GROUP BY author_id, genre) d;
+        ELSE
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, sum(n) AS n, sum(c) AS c
+                  FROM (SELECT author_id, genre, 1 AS n, count AS c FROM new_rows
+                        UNION ALL
+                        SELECT author_id, genre, -1, -count FROM old_rows) r
+                  GROUP BY author_id, genre
+                  HAVING sum(n) <> 0 OR sum(c) <> 0) d;
+        END IF;
+        IF delta_authors IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        -- An upsert fires both the INSERT and the UPDATE trigger, and each call locks its own
+        -- set of stats rows, so key order alone cannot keep two writers from deadlocking across
+        -- calls. Stats writers are serialized per transaction instead: nearly every writer shares
+        -- genre_stats rows anyway.
+        PERFORM pg_advisory_xact_lock(hashtext('book_stats'));
+        -- Rows are upserted in key order so concurrent writers lock them in the same order.
+        WITH changes AS (
+            SELECT * FROM unnest(delta_authors, delta_genres, delta_books, delta_copies)
+            AS c(author_id, genre, books, copies)
+        ), by_author_genre AS (
+            INSERT INTO author_genre_stats AS s (author_id, genre, books, copies)
+            SELECT author_id, genre, books, copies FROM changes ORDER BY author_id, genre
+            ON CONFLICT (author_id, genre)
+            DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies
+        ), by_author AS (
+            INSERT INTO author_stats AS s (author_id, books, copies)
+            SELECT author_id, sum(books), sum(copies) FROM changes GROUP BY author_id ORDER BY author_id
+            ON CONFLICT (author_id)
+            DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies
+        )
+        INSERT INTO genre_stats AS s (genre, books, copies)
+        SELECT genre, sum(books), sum(copies) FROM changes GROUP BY genre ORDER BY genre
+        ON CONFLICT (genre)
+        DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies;
+        RETURN NULL;
+    END;
+    $$
+    """
+
+
+def upgrade() -> None:
+    op.create_table('book_stats_pending',
+    sa.Column('id', sa.BigInteger(), sa.Identity(always=False), nullable=False),
+    sa.Column('author_ids', postgresql.ARRAY(sa.UUID()), nullable=False),
+    sa.Column('genres', postgresql.ARRAY(sa.String()), nullable=False),
+    sa.Column('books', postgresql.ARRAY(sa.BigInteger()), nullable=False),
+    sa.Column('copies', postgresql.ARRAY(sa.BigInteger()), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    prefixes=['UNLOGGED']
+    )
+    for statement in STATS_DDL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_APPLY)
+    op.drop_table('book_stats_pending')
+    op.execute('DROP FUNCTION book_stats_flush()')
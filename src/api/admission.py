@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse
+from starlette import status
+from starlette.datastructures import QueryParams
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config import AdmissionLimit, settings
+from src.database.database import async_engine
+from src.database.pool import pool_saturated
+from src.metrics import admission_rejected
+
+logger = logging.getLogger(__name__)
+
+ADMITTED_PREFIXES = ("/api/books", "/api/authors", "/api/jobs")
+STREAM_VALUES = {"1", "true", "yes", "on"}
+
+
+class Overloaded(Exception):
+    pass
+
+
+class AdmissionGate:
+    # At most limit.concurrency requests of a group run at once and at most limit.queue wait for
+    # a slot, each for up to limit.timeout seconds. Anything beyond fails fast instead of
+    # queueing on the connection pool, where it would slow down every other route as well.
+
+    def __init__(self, name: str, limit: AdmissionLimit):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(limit.concurrency)
+
+    async def acquire(self) -> None:
+        if self._slots.locked():
+            if self.waiting >= self.limit.queue:
+                raise Overloaded("queue_full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.limit.timeout)
+            except asyncio.TimeoutError:
+                raise Overloaded("deadline")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"active": self.active, "waiting": self.waiting, **self.limit.model_dump()}
+
+
+gates = {name: AdmissionGate(name, limit) for name, limit in settings.ADMISSION_LIMITS.items()}
+
+
+def route_group(scope: Scope) -> Optional[str]:
+    # None for routes outside admission control. Otherwise the group by endpoint name
+    # (ADMISSION_ROUTE_GROUPS) or by method; unpaginated NDJSON lists are heavy whatever the route.
+    if not scope["path"].startswith(ADMITTED_PREFIXES):
+        return None
+    name = next((route.name for route in scope["app"].router.routes
+                 if route.matches(scope)[0] == Match.FULL), None)
+    group = settings.ADMISSION_ROUTE_GROUPS.get(name)
+    if group is not None:
+        return group
+    if QueryParams(scope["query_string"]).get("stream", "").lower() in STREAM_VALUES:
+        return "heavy"
+    return "read" if scope["method"] in ("GET", "HEAD") else "write"
+
+
+class AdmissionMiddleware:
+    # Runs before routing and the session dependency, so a shed request never touches the pool,
+    # and holds the slot until the response body (a stream, an export) has been sent. Heavy
+    # requests are also shed outright while the pool is saturated, leaving the connections to
+    # cheap reads and writes.
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        group = route_group(scope) if scope["type"] == "http" and settings.ADMISSION_ENABLED else None
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+        gate = gates[group]
+        try:
+            if group == "heavy" and pool_saturated(async_engine):
+                raise Overloaded("pool_saturated")
+            await gate.acquire()
+        except Overloaded as exc:
+            admission_rejected.inc(group, str(exc))
+            response = JSONResponse({"detail": "Server is overloaded, retry later"},
+                                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
@@ -0,0 +1,89 @@
+import hashlib
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, List, NoReturn, Optional
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from config import settings
+
+VALIDATOR_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+
+def make_etag(*parts: Any) -> str:
+    # Strong validator over the row versions a representation was built from.
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def version_etag(version: int) -> str:
+    # A single row is tagged with its version alone, so If-Match maps straight onto a version check.
+    return f'"{version}"'
+
+
+def if_match_versions(request: Request) -> Optional[List[int]]:
+    # None means no precondition (no If-Match, or "*"). If-Match uses strong comparison, so weak
+    # tags and tags of other representations (e.g. ?expand=...) match no version.
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        return None
+    tags = [tag.strip() for tag in if_match.split(",")]
+    if "*" in tags:
+        return None
+    return [int(tag[1:-1]) for tag in tags if re.fullmatch(r'"\d+"', tag)]
+
+
+def precondition_failed() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED,
+                         detail="Resource was modified: If-Match does not match its current ETag")
+
+
+async def missing_or_modified(session: AsyncSession, model: Any, id: Any, versions: Optional[List[int]],
+                              detail: str) -> NoReturn:
+    # A single-statement write matched no row: 404, or 412 when If-Match was given and the row
+    # exists. The extra lookup only runs on this failure path.
+    if versions is not None and await session.scalar(select(model.id).where(model.id == id)) is not None:
+        raise precondition_failed()
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+
+def cache_control(request: Request) -> str:
+    # Per-route policy by endpoint name, e.g. HTTP_CACHE_CONTROL_ROUTES='{"get_book": "max-age=60"}'.
+    route = request.scope.get("route")
+    return settings.HTTP_CACHE_CONTROL_ROUTES.get(getattr(route, "name", None), settings.HTTP_CACHE_CONTROL)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    # If-None-Match wins over If-Modified-Since (RFC 9110, 13.2.2).
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def set_validators(request: Request, response: Response, etag: str,
+                   last_modified: Optional[datetime] = None) -> None:
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    response.headers["Cache-Control"] = cache_control(request)
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(request, response, etag, last_modified)
+    return response
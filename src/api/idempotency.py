@@ -0,0 +1,52 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Header, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from src.database.idempotency import claim_key, save_response
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class Idempotency:
+    # Per-request handle for the Idempotency-Key header. Usage in a write handler:
+    #   if (replay := await idempotency.replay(session)) is not None: return replay
+    #   ... write, build the response ...
+    #   await idempotency.save(session, response); await session.commit()
+    def __init__(self, scope: str, key: Optional[str], request_hash: bytes):
+        self.scope = scope
+        self.key = key
+        self.request_hash = request_hash
+
+    async def replay(self, session: AsyncSession) -> Optional[Response]:
+        if self.key is None:
+            return None
+        record = await claim_key(session, self.scope, self.key, self.request_hash)
+        if record is None:
+            return None
+        if record.request_hash != self.request_hash:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail="Idempotency-Key was already used with a different request")
+        if record.response is None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="Idempotency-Key is held by a request without a stored response")
+        headers = {REPLAYED_HEADER: "true"}
+        if record.location is not None:
+            headers["Location"] = record.location
+        return Response(record.response, status_code=record.status_code, media_type="application/json",
+                        headers=headers)
+
+    async def save(self, session: AsyncSession, response: Response) -> None:
+        if self.key is not None:
+            await save_response(session, self.scope, self.key, response.status_code, response.body,
+                                response.headers.get("location"))
+
+
+async def get_idempotency(request: Request,
+                          idempotency_key: Optional[str] = Header(None, min_length=1, max_length=255)) -> Idempotency:
+    # The key is scoped to the endpoint; the hash covers the raw body, so a retry must resend it as is.
+    route = request.scope.get("route")
+    request_hash = hashlib.sha256(await request.body()).digest() if idempotency_key is not None else b""
+    return Idempotency(getattr(route, "name", request.url.path), idempotency_key, request_hash)
@@ -0,0 +1,73 @@
+import base64
+import json
+from typing import Any, List, Mapping, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, and_, or_, tuple_
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import ColumnElement, UnaryExpression
+from starlette import status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps([str(value) for value in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[str]]:
+    if cursor is None:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(value, str) for value in values):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def _unwrap(column: ColumnElement) -> Tuple[ColumnElement, bool]:
+    if isinstance(column, UnaryExpression) and column.modifier is operators.desc_op:
+        return column.element, True
+    return column, False
+
+
+def cursor_keys(columns: Sequence[ColumnElement]) -> List[str]:
+    return [_unwrap(column)[0].key for column in columns]
+
+
+def paginate(stmt: Select, columns: Sequence[ColumnElement], cursor: Optional[str],
+             limit: Optional[int] = None) -> Select:
+    # columns may contain column.desc() entries; the cursor holds the last row's values.
+    values = decode_cursor(cursor, len(columns))
+    if values is not None:
+        keys = [_unwrap(column) for column in columns]
+        try:
+            bound = [column.type.python_type(value) for (column, _), value in zip(keys, values)]
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        if not any(descending for _, descending in keys):
+            stmt = stmt.where(tuple_(*columns) > tuple_(*bound))
+        else:
+            stmt = stmt.where(or_(*(
+                and_(*(column == value for (column, _), value in zip(keys[:i], bound[:i])),
+                     column < bound[i] if descending else column > bound[i])
+                for i, (column, descending) in enumerate(keys)
+            )))
+    stmt = stmt.order_by(*columns)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, *keys: str) -> None:
+    if len(rows) < limit:
+        return
+    last = rows[-1]
+    if isinstance(last, Mapping):
+        values = [last[key] for key in keys]
+    else:
+        values = [getattr(last, key) for key in keys]
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*values)
@@ -0,0 +1,28 @@
+from typing import Any, Iterable, List, Mapping, Optional, Sequence, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+
+
+def model_response(adapter: TypeAdapter, value: Any) -> Response:
+    # For shapes picked per request (e.g. ?expand=...) that the route's response_model
+    # does not describe; ORM objects are read through from_attributes.
+    return Response(adapter.dump_json(adapter.validate_python(value, from_attributes=True)),
+                    media_type="application/json")
+
+
+def rows_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    # TypedDict twin of a response model: column rows are serialized with the model's field
+    # types and order, but without building a model instance per row. Keys the row lacks
+    # are skipped and keys the model lacks (versions, sort keys) are dropped.
+    row = TypedDict(f"{model.__name__}Row",
+                    {name: field.annotation for name, field in model.model_fields.items()}, total=False)
+    return TypeAdapter(List[row])
+
+
+def rows_response(adapter: TypeAdapter, rows: Iterable[Mapping[str, Any]],
+                  keys: Optional[Sequence[str]] = None) -> Response:
+    # List fast path; the bytes match what response_model would produce for the same rows.
+    include = None if keys is None else {"__all__": set(keys)}
+    return Response(adapter.dump_json([dict(row) for row in rows], include=include), media_type="application/json")
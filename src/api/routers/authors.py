@@ -1,18 +1,35 @@
 import asyncio
 import logging
-from typing import List
+from datetime import datetime
+from typing import Annotated, List, Literal, Optional
 
-from pydantic import UUID4
+from pydantic import TypeAdapter, UUID4
 from starlette import status
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import select
+from fastapi import APIRouter, Body, HTTPException, Depends, Query, Request, Response
+from sqlalchemy import JSON, delete, func, select, update
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import selectinload
 
-from src.database.models import Author, Book
-from src.database.database import get_async_session
+from src.cache import Cache, author_books_count_key, author_key, get_cache
+from src.database import batch as batch_db
+from src.database.author_names import author_names
+from src.database.batch import BatchStatus
+from src.database.errors import FOREIGN_KEY_VIOLATION, sqlstate
+from src.database.models import Author, AuthorGenreStats, AuthorStats, Book, BookGenre
+from src.database.database import get_async_session, get_read_session, get_read_session_factory
 from src.api.schemas.author import AuthorCreate, AuthorUpdate, AuthorCreateResponse, AuthorBooksCount, \
-    AuthorDeleteResponse, AllAuthorsAllBooksCount
+    AuthorDeleteResponse, AllAuthorsAllBooksCount, AuthorBatchUpdate, AuthorBatchGetResponse
+from src.api.schemas.batch import BatchIds, BatchItemResult
+from src.api.schemas.expand import AuthorWithBooks
+from src.api.idempotency import Idempotency, get_idempotency
+from src.api.conditional import if_match_versions, is_not_modified, make_etag, missing_or_modified, \
+    not_modified, set_validators, version_etag
+from src.api.pagination import cursor_keys, paginate, set_next_cursor
+from src.api.responses import model_response, rows_adapter, rows_response
+from src.api.streaming import export_response, mapping_encoder, model_encoder, ndjson_response
+from src.database.export import ExportFormat, author_export_query
+from config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/authors", tags=["authors"])
@@ -22,114 +39,315 @@ router = APIRouter(prefix="/api/authors", tags=["authors"])
 
 @router.get("/stat",
             response_model=List[AllAuthorsAllBooksCount],
+            response_model_exclude_none=True,
             summary="Получить количетсво книг всех авторов",
-            description="Возвращает количетсво книг всех авторов в виде словаря, где ключ - автор, а значение - количество его книг"
+            description="Возвращает количество книг авторов одной страницей (keyset-пагинация по ID автора). "
+                        "Курсор следующей страницы передается в заголовке X-Next-Cursor. "
+                        "Опционально возвращает суммарное количество экземпляров и разбивку по жанрам"
             )
-async def get_all_authors_books_count(offset: int = 0,
-                                      limit: int = 10,
-                                      session: AsyncSession = Depends(get_async_session)):
-    authors_response = await session.execute(
-        select(Author).limit(limit).offset(offset)
+async def get_all_authors_books_count(response: Response,
+                                      cursor: Optional[str] = None,
+                                      limit: int = Query(10, gt=0, le=settings.MAX_PAGE_SIZE),
+                                      copies: bool = False,
+                                      genres: bool = False,
+                                      session: AsyncSession = Depends(get_read_session)):
+    authors_page = paginate(select(Author.id), (Author.id,), cursor, limit).subquery()
+
+    # Counts come from the trigger-maintained author_stats / author_genre_stats tables,
+    # so a page costs O(limit) no matter how many books there are.
+    stmt = (
+        select(authors_page.c.id.label("author_id"),
+               func.coalesce(AuthorStats.books, 0).label("count"),
+               func.coalesce(AuthorStats.copies, 0).label("copies"))
+        .select_from(authors_page)
+        .outerjoin(AuthorStats, AuthorStats.author_id == authors_page.c.id)
+        .order_by(authors_page.c.id)
     )
-    authors = authors_response.scalars().all()
+    if genres:
+        stmt = stmt.add_columns(
+            select(func.json_object_agg(AuthorGenreStats.genre, AuthorGenreStats.books, type_=JSON))
+            .where(AuthorGenreStats.author_id == authors_page.c.id, AuthorGenreStats.books > 0)
+            .scalar_subquery()
+            .label("genres")
+        )
+    result = await session.execute(stmt)
+
     books_count = []
-    for author in authors:
-        author_books_response = await session.execute(
-            select(Book).where(Book.author_id == author.id))
-
-        books_count.append({
-            "author_id": author.id,
-            "count": len(author_books_response.scalars().all())
-        })
+    for row in result:
+        item = {"author_id": row.author_id, "count": int(row.count)}
+        if copies:
+            item["copies"] = int(row.copies)
+        if genres:
+            item["genres"] = {BookGenre[genre]: value for genre, value in (row.genres or {}).items()}
+        books_count.append(item)
+    set_next_cursor(response, books_count, limit, "author_id")
     return books_count
 
 
+@router.get("/export",
+            summary="Выгрузить всех авторов",
+            description="Отдает всех авторов потоком в CSV (с заголовком) или NDJSON прямо из COPY TO STDOUT. "
+                        "since - только авторы, измененные после этой позиции ленты изменений. Позиция ленты на "
+                        "момент выгрузки - в заголовке X-Next-Cursor. 410 - события после since уже удалены")
+async def export_authors(format: ExportFormat = "csv",
+                         since: Optional[int] = Query(None, ge=0),
+                         session: AsyncSession = Depends(get_read_session),
+                         session_factory: async_sessionmaker[AsyncSession] = Depends(get_read_session_factory)):
+    return await export_response(session, session_factory, author_export_query(since), format, since)
+
+
 @router.get("/{author_id}/stat",
             response_model=AuthorBooksCount,
             summary="Получить количество книг автора",
             description="Возвращает количество книг у автора")
 async def get_author_books_count(author_id: UUID4,
-                                 session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Book).where(Book.author_id == author_id))
-    books = len(result.scalars().all())
-    return {"count": books}
+                                 session: AsyncSession = Depends(get_read_session),
+                                 cache: Cache = Depends(get_cache)):
+    async def load():
+        books = await session.scalar(select(AuthorStats.books).where(AuthorStats.author_id == author_id))
+        return {"count": books or 0}
+
+    return await cache.get_or_load(author_books_count_key(author_id), load)
+
+
+@router.post("/batch-get",
+             response_model=AuthorBatchGetResponse,
+             summary="Получить нескольких авторов по ID",
+             description="Возвращает авторов с указанными ID одним запросом к базе и список ID, которых нет")
+async def batch_get_authors(batch: BatchIds, session: AsyncSession = Depends(get_read_session)):
+    authors = await batch_db.get_authors(session, batch.ids)
+    found = {author.id for author in authors}
+    return {"items": authors,
+            "missing": [author_id for author_id in dict.fromkeys(batch.ids) if author_id not in found]}
+
+
+@router.post("/batch",
+             response_model=List[BatchItemResult],
+             summary="Создать нескольких авторов",
+             description="Создает авторов в одной транзакции и возвращает результат по каждому: "
+                         "created или conflict (автор уже есть)")
+async def batch_create_authors(authors: Annotated[List[AuthorCreate],
+                                                  Body(min_length=1, max_length=settings.MAX_BATCH_SIZE)],
+                               session: AsyncSession = Depends(get_async_session)):
+    outcomes = await batch_db.create_authors(session, [author.model_dump() for author in authors])
+    await session.commit()
+    return outcomes
+
+
+@router.put("/batch",
+            response_model=List[BatchItemResult],
+            summary="Обновить нескольких авторов",
+            description="Обновляет авторов в одной транзакции и возвращает результат по каждому: "
+                        "updated, not_found или conflict")
+async def batch_update_authors(changes: Annotated[List[AuthorBatchUpdate],
+                                                  Body(min_length=1, max_length=settings.MAX_BATCH_SIZE)],
+                               session: AsyncSession = Depends(get_async_session),
+                               cache: Cache = Depends(get_cache)):
+    outcomes = await batch_db.update_authors(session, [change.model_dump(exclude_unset=True) for change in changes])
+    await session.commit()
+    updated = [outcome["id"] for outcome in outcomes if outcome["status"] == BatchStatus.UPDATED]
+    author_names.forget(*updated)
+    await cache.invalidate(*(author_key(author_id) for author_id in updated))
+    return outcomes
+
+
+@router.post("/batch-delete",
+             response_model=List[BatchItemResult],
+             summary="Удалить нескольких авторов",
+             description="Удаляет авторов без книг одним запросом и возвращает результат по каждому: "
+                         "deleted, has_books или not_found")
+async def batch_delete_authors(batch: BatchIds, session: AsyncSession = Depends(get_async_session),
+                               cache: Cache = Depends(get_cache)):
+    outcomes = await batch_db.delete_authors(session, batch.ids)
+    await session.commit()
+    author_names.forget(*batch.ids)
+    await cache.invalidate(*(key for author_id in batch.ids
+                             for key in (author_key(author_id), author_books_count_key(author_id))))
+    return outcomes
 
 
 # -------------------------- CRUD --------------------------
 
+AUTHOR_ORDERINGS = {
+    "id": (Author.id,),
+    "title": (Author.title, Author.id),
+}
+AUTHOR_FIELDS = list(AuthorCreateResponse.model_fields)
+AUTHOR_COLUMNS = [getattr(Author, name) for name in AUTHOR_FIELDS]
+author_adapter = TypeAdapter(AuthorCreateResponse)
+author_rows_adapter = rows_adapter(AuthorCreateResponse)
+author_with_books_adapter = TypeAdapter(AuthorWithBooks)
+authors_with_books_adapter = TypeAdapter(List[AuthorWithBooks])
+
+
+async def cached_author(session: AsyncSession, cache: Cache, author_id: UUID4) -> Optional[dict]:
+    # The entry carries version / updated_at next to the body for the HTTP validators.
+    async def load():
+        author = await session.get(Author, author_id)
+        return None if author is None else {
+            **author_adapter.dump_python(author_adapter.validate_python(author, from_attributes=True), mode="json"),
+            "version": author.version, "updated_at": author.updated_at.isoformat(),
+        }
+
+    return await cache.get_or_load(author_key(author_id), load)
+
+
+def author_versions(authors) -> list:
+    # (id, version, ((book_id, book_version), ...)) per author, books in id order.
+    return [(author_id, version, tuple(books)) for author_id, version, books in authors]
+
+
 @router.get("/",
             response_model=List[AuthorCreateResponse],
             summary="Получить список авторов",
-            description="Возвращает список всех авторов")
-async def get_authors(session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Author))
-    authors = result.scalars().all()
-    if authors is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Author not found")
-    return authors
+            description="Возвращает страницу списка авторов (keyset-пагинация по id или по (title, id)). "
+                        "Курсор следующей страницы передается в заголовке X-Next-Cursor. "
+                        "expand=books добавляет каждому автору список его книг (одним дополнительным запросом "
+                        "на страницу). С stream=true отдает всех авторов после курсора построчно в формате NDJSON")
+async def get_authors(request: Request,
+                      cursor: Optional[str] = None,
+                      limit: int = Query(settings.DEFAULT_PAGE_SIZE, gt=0, le=settings.MAX_PAGE_SIZE),
+                      order_by: Literal["id", "title"] = "id",
+                      expand: Optional[Literal["books"]] = None,
+                      stream: bool = False,
+                      session: AsyncSession = Depends(get_read_session),
+                      session_factory: async_sessionmaker[AsyncSession] = Depends(get_read_session_factory)):
+    columns = AUTHOR_ORDERINGS[order_by]
+    # Without expand the page is selected as plain columns and skips per-row model validation.
+    stmt = select(Author).options(selectinload(Author.books)) if expand else select(*AUTHOR_COLUMNS)
+    if stream:
+        encoder = model_encoder(author_with_books_adapter) if expand else mapping_encoder(AUTHOR_FIELDS)
+        return ndjson_response(session_factory, paginate(stmt, columns, cursor), encoder, scalars=bool(expand))
+
+    # A revalidation is answered from (id, version) pairs alone, without loading the page.
+    if "if-none-match" in request.headers:
+        page = (await session.execute(paginate(select(Author.id, Author.version), columns, cursor, limit))).all()
+        books = {author_id: [] for author_id, _ in page}
+        if expand and books:
+            result = await session.execute(select(Book.author_id, Book.id, Book.version)
+                                           .where(Book.author_id.in_(books)).order_by(Book.author_id, Book.id))
+            for author_id, book_id, version in result:
+                books[author_id].append((book_id, version))
+        etag = make_etag(*author_versions((author_id, version, books[author_id]) for author_id, version in page))
+        if is_not_modified(request, etag):
+            return not_modified(request, etag)
+
+    if expand:
+        authors = (await session.execute(paginate(stmt, columns, cursor, limit))).scalars().all()
+        etag = make_etag(*author_versions(
+            (author.id, author.version, sorted((book.id, book.version) for book in author.books))
+            for author in authors
+        ))
+        response = model_response(authors_with_books_adapter, authors)
+    else:
+        authors = (await session.execute(paginate(stmt.add_columns(Author.version), columns, cursor, limit))
+                   ).mappings().all()
+        etag = make_etag(*author_versions((author["id"], author["version"], []) for author in authors))
+        response = rows_response(author_rows_adapter, authors)
+    set_validators(request, response, etag)
+    set_next_cursor(response, authors, limit, *cursor_keys(columns))
+    return response
 
 
 @router.post("/",
              response_model=AuthorCreateResponse,
              summary="Создать нового автора",
              description="Создает нового автора с заданными параметрами")
-async def create_author(author: AuthorCreate, session: AsyncSession = Depends(get_async_session)):
+async def create_author(author: AuthorCreate, session: AsyncSession = Depends(get_async_session),
+                        idempotency: Idempotency = Depends(get_idempotency)):
+    if (replay := await idempotency.replay(session)) is not None:
+        return replay
     try:
         new_author = Author(**author.model_dump())
         session.add(new_author)
-        await session.commit()
+        await session.flush()
         await session.refresh(new_author)
-        return new_author
+        response = model_response(author_adapter, new_author)
+        await idempotency.save(session, response)
+        await session.commit()
+        return response
     except IntegrityError:
-        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Author already exists")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Author already exists")
 
 
 @router.get("/{author_id}",
             response_model=AuthorCreateResponse,
             summary="Получить автора по ID",
-            description="Возвращает информацию об авторе по его ID")
-async def get_author(author_id: UUID4, session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Author).where(Author.id == author_id))
-    author = result.scalars().first()
+            description="Возвращает информацию об авторе по его ID. expand=books добавляет список его книг")
+async def get_author(request: Request, response: Response, author_id: UUID4,
+                     expand: Optional[Literal["books"]] = None,
+                     session: AsyncSession = Depends(get_read_session),
+                     cache: Cache = Depends(get_cache)):
+    author = await cached_author(session, cache, author_id)
     if author is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Author not found")
-    return author
+    last_modified = datetime.fromisoformat(author["updated_at"])
+    if not expand:
+        etag = version_etag(author["version"])
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(request, etag, last_modified)
+        set_validators(request, response, etag, last_modified)
+        return author
+
+    # The book list is not cached; its versions come from the same single query.
+    books = (await session.scalars(select(Book).where(Book.author_id == author_id).order_by(Book.id))).all()
+    etag = make_etag(*author_versions([(author_id, author["version"], [(book.id, book.version) for book in books])]))
+    last_modified = max([last_modified, *(book.updated_at for book in books)])
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(request, etag, last_modified)
+    response = model_response(author_with_books_adapter, {**author, "books": books})
+    set_validators(request, response, etag, last_modified)
+    return response
 
 
 @router.put("/{author_id}",
             response_model=AuthorCreateResponse,
             summary="Обновить информацию об авторе",
-            description="Обновляет информацию об авторе с заданным ID")
-async def update_author(author_id: UUID4, author_update: AuthorUpdate,
-                        session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Author).where(Author.id == author_id))
-    author = result.scalars().first()
-    if author is None:
-        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Author not found")
-
-    for key, value in author_update.model_dump(exclude_unset=True).items():
-        setattr(author, key, value)
-
+            description="Обновляет информацию об авторе с заданным ID. С заголовком If-Match (ETag автора) "
+                        "обновление выполняется одним условным запросом и возвращает 412, если автора "
+                        "уже изменили")
+async def update_author(request: Request, author_id: UUID4, author_update: AuthorUpdate,
+                        session: AsyncSession = Depends(get_async_session),
+                        cache: Cache = Depends(get_cache)):
+    stmt = (update(Author).where(Author.id == author_id).values(**author_update.model_dump(exclude_unset=True))
+            .returning(*AUTHOR_COLUMNS, Author.version))
+    versions = if_match_versions(request)
+    if versions is not None:
+        stmt = stmt.where(Author.version.in_(versions))
     try:
+        author = (await session.execute(stmt)).mappings().first()
         await session.commit()
-        await session.refresh(author)
     except IntegrityError:
-        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Author already exists")
-    return author
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Author already exists")
+    if author is None:
+        await missing_or_modified(session, Author, author_id, versions, "Author not found")
+    author_names.forget(author_id)
+    await cache.invalidate(author_key(author_id))
+    response = model_response(author_adapter, author)
+    response.headers["ETag"] = version_etag(author["version"])
+    return response
 
 
 @router.delete("/{author_id}",
                response_model=AuthorDeleteResponse,
                summary="Удалить автора",
-               description="Удаляет автора с заданным ID.")
-async def delete_author(author_id: UUID4, session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Author).where(Author.id == author_id))
-    author = result.scalars().first()
-    if author is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Author not found")
+               description="Удаляет автора с заданным ID. С заголовком If-Match (ETag автора) возвращает 412, "
+                           "если автора уже изменили")
+async def delete_author(request: Request, author_id: UUID4, session: AsyncSession = Depends(get_async_session),
+                        cache: Cache = Depends(get_cache)):
+    stmt = delete(Author).where(Author.id == author_id)
+    versions = if_match_versions(request)
+    if versions is not None:
+        stmt = stmt.where(Author.version.in_(versions))
     try:
-        await session.delete(author)
+        deleted = await session.scalar(stmt.returning(Author.id))
         await session.commit()
-    except Exception:
+    except IntegrityError as exc:
+        if sqlstate(exc) != FOREIGN_KEY_VIOLATION:
+            raise
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="This author have books")
+    if deleted is None:
+        await missing_or_modified(session, Author, author_id, versions, "Author not found")
+    author_names.forget(author_id)
+    await cache.invalidate(author_key(author_id), author_books_count_key(author_id))
     return {"detail": "Author deleted"}
@@ -1,17 +1,45 @@
 import logging
-import traceback
-from typing import List, Annotated, Optional
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import List, Annotated, Literal, Optional
+from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Path
-from pydantic import UUID4
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Body, HTTPException, Depends, Query, Path, Request, Response
+from pydantic import TypeAdapter, UUID4
+from sqlalchemy import cast, delete, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION, REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from starlette import status
-from starlette.status import HTTP_400_BAD_REQUEST
 
-from src.database.models import Book, Author
-from src.database.database import get_async_session
-from src.api.schemas.book import BookCreate, BookUpdate, BookCreateResponse, BookDeleteResponse
+from src.cache import Cache, author_books_count_key, book_key, get_cache
+from src.database.models import Book, Author, BookGenre, GenreStats, SEARCH_CONFIG
+from src.database.database import get_async_session, get_read_session, get_read_session_factory
+from src.database import batch as batch_db
+from src.database.batch import BatchStatus
+from src.database.delivery import DeliveryStatus, parse_uuid, upsert_books
+from src.database.jobs import enqueue_job
+from src.database.errors import FOREIGN_KEY_VIOLATION, UNIQUE_VIOLATION, sqlstate
+from src.database.stock import StockStatus, adjust_stock
+from src.api.schemas.book import BookCreate, BookUpdate, BookCreateResponse, BookDeleteResponse, DeliveryResponse, \
+    ImportResponse, StockChange, BatchStockChange, StockResponse, BatchStockResult, BookSearchResult, \
+    GenreStat, BookBatchUpdate, BookBatchGetResponse, DeliveryBook
+from src.api.schemas.batch import BatchIds, BatchItemResult
+from src.api.schemas.job import JobResponse
+from src.api.schemas.expand import BookSearchResultWithAuthor, BookWithAuthor
+from src.api.idempotency import Idempotency, get_idempotency
+from src.api.conditional import if_match_versions, is_not_modified, make_etag, missing_or_modified, \
+    not_modified, set_validators, version_etag
+from src.api.pagination import cursor_keys, paginate, set_next_cursor
+from src.api.responses import model_response, rows_adapter, rows_response
+from src.api.routers.authors import cached_author
+from src.api.streaming import export_response, mapping_encoder, model_encoder, ndjson_response
+from src.database.export import ExportFormat, book_export_query
+from src.importer import import_books
+from src.jobs import DELIVERY_JOB, JobWorker, get_job_worker
+from config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/books", tags=["books"])
@@ -23,119 +51,480 @@ router = APIRouter(prefix="/api/books", tags=["books"])
             summary='Получить топ N книг по количеству экземпляров',
             description='Возвращает список из N книг по количеству их экземпляров.')
 async def get_top_n_books_by_copies(top: int = Query(gt=0),
-                                    session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Book).order_by(Book.count.desc()).limit(top))
-    books = result.scalars().all()
-    if books is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Books not found")
-    return books
+                                    session: AsyncSession = Depends(get_read_session)):
+    # Served straight from the ix_book_count (count DESC, id) index.
+    result = await session.execute(select(*BOOK_COLUMNS).order_by(Book.count.desc(), Book.id).limit(top))
+    return rows_response(book_rows_adapter, result.mappings())
+
+
+@router.get("/export",
+            summary="Выгрузить каталог книг",
+            description="Отдает все книги потоком в CSV (с заголовком) или NDJSON прямо из COPY TO STDOUT, не "
+                        "загружая их в память. Фильтры: жанр; since - только книги, измененные после этой позиции "
+                        "ленты изменений. author_title=true добавляет название автора. Позиция ленты на момент "
+                        "выгрузки - в заголовке X-Next-Cursor (since для следующей выгрузки). 410 - события после "
+                        "since уже удалены")
+async def export_books(format: ExportFormat = "csv",
+                       genre: Optional[BookGenre] = None,
+                       since: Optional[int] = Query(None, ge=0),
+                       author_title: bool = False,
+                       session: AsyncSession = Depends(get_read_session),
+                       session_factory: async_sessionmaker[AsyncSession] = Depends(get_read_session_factory)):
+    return await export_response(session, session_factory, book_export_query(genre, since, author_title),
+                                 format, since)
+
+
+@router.get("/genres/stat",
+            response_model=List[GenreStat],
+            summary="Статистика по жанрам",
+            description="Возвращает количество книг и экземпляров по каждому жанру")
+async def get_genres_stat(session: AsyncSession = Depends(get_read_session)):
+    result = await session.execute(
+        select(GenreStats.genre, GenreStats.books, GenreStats.copies)
+        .where(GenreStats.books > 0)
+        .order_by(GenreStats.genre)
+    )
+    return result.mappings().all()
+
+
+@router.get("/search",
+            response_model=List[BookSearchResult],
+            summary="Поиск книг",
+            description="Полнотекстовый поиск по названию и описанию книги и имени автора с учетом опечаток "
+                        "(триграммы). Слова запроса ищутся по префиксу, что подходит для автодополнения. "
+                        "Результаты отсортированы по релевантности; курсор следующей страницы - в заголовке "
+                        "X-Next-Cursor. expand=author добавляет в каждую книгу объект автора")
+async def search_books(q: str = Query(min_length=1, max_length=200),
+                       genre: Optional[BookGenre] = None,
+                       cursor: Optional[str] = None,
+                       limit: int = Query(settings.DEFAULT_PAGE_SIZE, gt=0, le=settings.MAX_PAGE_SIZE),
+                       expand: Optional[Literal["author"]] = None,
+                       session: AsyncSession = Depends(get_read_session)):
+    words = re.findall(r"\w+", q)
+    if not words:
+        return []
+    tsquery = func.to_tsquery(cast(literal(SEARCH_CONFIG), REGCONFIG), " & ".join(f"{word}:*" for word in words))
+    match = or_(Book.search_vector.op("@@")(tsquery), Author.search_vector.op("@@")(tsquery))
+    rank = func.ts_rank(Book.search_vector, tsquery) + func.ts_rank(Author.search_vector, tsquery)
+    if settings.SEARCH_FUZZY:
+        match = or_(match, Book.title.op("%")(q), Author.title.op("%")(q))
+        rank = rank + func.similarity(Book.title, q) + func.similarity(Author.title, q)
+
+    ranked = (select(Book.id.label("id"), cast(rank, DOUBLE_PRECISION).label("score"))
+              .join(Author, Author.id == Book.author_id)
+              .where(match))
+    if genre is not None:
+        ranked = ranked.where(Book.genre == genre)
+    ranked = ranked.subquery()
+
+    order = (ranked.c.score.desc(), Book.id)
+    if expand:
+        stmt = select(Book, ranked.c.score).join(ranked, ranked.c.id == Book.id).options(selectinload(Book.author))
+        result = await session.execute(paginate(stmt, order, cursor, limit))
+        books = [{**book_adapter.dump_python(book_adapter.validate_python(book, from_attributes=True)),
+                  "score": score, "author": book.author}
+                 for book, score in result]
+        response = model_response(search_with_author_adapter, books)
+    else:
+        stmt = select(*BOOK_COLUMNS, ranked.c.score).join(ranked, ranked.c.id == Book.id)
+        books = (await session.execute(paginate(stmt, order, cursor, limit))).mappings().all()
+        response = rows_response(search_rows_adapter, books)
+    set_next_cursor(response, books, limit, "score", "id")
+    return response
 
 
 @router.post("/delivery",
-             response_model=dict,
+             response_model=DeliveryResponse,
+             responses={status.HTTP_202_ACCEPTED: {"model": JobResponse}},
              summary="Добавить список книг в БД",
-             description="Получает список словарей с данными книг и добавляет их в базу")
-async def bulk_data(data: List[BookCreate], session: AsyncSession = Depends(get_async_session)):
-    for book in data:
-        try:
-            book_response = await session.execute(
-                select(Book).where(
-                    (Book.title == book.title) &
-                    (Book.author_id == book.author_id)
-                )
-            )
-            selected_book: Book | None = book_response.scalars().first()
-            if selected_book is None:
-                is_author_exists = (await session.execute(
-                    select(Author).where(
-                        Author.id == book.author_id))).scalars().first()
-                if is_author_exists is not None:
-                    new_book = Book(**book.model_dump())
-                    session.add(new_book)
-                else:
-                    pass
-            else:
-                selected_book.count = selected_book.count + book.count
-                await session.commit()
-                await session.refresh(selected_book)
-        except Exception:
-            print(traceback.format_exc())
+             description="Получает список словарей с данными книг: новые книги создает, у существующих "
+                         "(тот же автор и название) увеличивает количество. Вместо author_id можно передать "
+                         "author_title: неизвестные авторы создаются. Возвращает результат по каждой книге. "
+                         "Поставка больше DELIVERY_BACKGROUND_THRESHOLD книг (или с background=true) ставится в "
+                         "очередь: ответ 202 с задачей, состояние - GET /api/jobs/{job_id}")
+async def bulk_data(data: List[DeliveryBook], background: Optional[bool] = None,
+                    session: AsyncSession = Depends(get_async_session),
+                    cache: Cache = Depends(get_cache), idempotency: Idempotency = Depends(get_idempotency),
+                    worker: JobWorker = Depends(get_job_worker)):
+    if (replay := await idempotency.replay(session)) is not None:
+        return replay
+    if background if background is not None else len(data) > settings.DELIVERY_BACKGROUND_THRESHOLD:
+        job = await enqueue_job(session, DELIVERY_JOB, [book.model_dump(mode="json") for book in data])
+        response = model_response(job_adapter, job)
+        response.status_code = status.HTTP_202_ACCEPTED
+        response.headers["Location"] = f"/api/jobs/{job.id}"
+        await idempotency.save(session, response)
+        await session.commit()
+        worker.notify()
+        return response
+    outcomes = await upsert_books(session, [book.model_dump() for book in data])
+    items = [{"index": index, "title": book.title, **outcome}
+             for index, (book, outcome) in enumerate(zip(data, outcomes))]
+    totals = Counter(outcome["status"] for outcome in outcomes)
+    response = model_response(delivery_adapter, {
+        "message": "Books added successfully",
+        "created": totals[DeliveryStatus.CREATED],
+        "restocked": totals[DeliveryStatus.RESTOCKED],
+        "rejected": totals[DeliveryStatus.REJECTED_UNKNOWN_AUTHOR],
+        "items": items,
+    })
+    await idempotency.save(session, response)
+    await session.commit()
+    await cache.invalidate(*{
+        key
+        for outcome in outcomes if outcome["book_id"] is not None
+        for key in (book_key(outcome["book_id"]), author_books_count_key(outcome["author_id"]))
+    })
+    return response
+
+
+@router.post("/import",
+             response_model=ImportResponse,
+             summary="Импортировать поставку из CSV или NDJSON",
+             description="Принимает тело запроса потоком (CSV с заголовком или NDJSON), проверяет строки по мере "
+                         "чтения, загружает их через COPY во временную таблицу и одним запросом добавляет в каталог. "
+                         "Возвращает статистику и строки с ошибками")
+async def import_delivery(request: Request,
+                          format: Literal["csv", "ndjson"] = "csv",
+                          session: AsyncSession = Depends(get_async_session),
+                          cache: Cache = Depends(get_cache)):
+    def progress(stats: dict) -> None:
+        logger.info("Delivery import progress: %s", stats)
+
+    result = await import_books(session, request.stream(), format, on_progress=progress)
     await session.commit()
-    return {"message": "Books added successfully"}
+    # An import may touch any number of books, so the whole cache is dropped.
+    await cache.clear()
+    return result
+
+
+@router.post("/stock",
+             response_model=List[BatchStockResult],
+             summary="Изменить остатки нескольких книг",
+             description="Атомарно увеличивает или уменьшает количество экземпляров нескольких книг одним запросом. "
+                         "Количество не может стать отрицательным; результат возвращается по каждой книге")
+async def change_stock_batch(changes: Annotated[List[BatchStockChange],
+                                                Body(min_length=1, max_length=settings.MAX_BATCH_SIZE)],
+                             session: AsyncSession = Depends(get_async_session), cache: Cache = Depends(get_cache)):
+    deltas = defaultdict(int)
+    for change in changes:
+        deltas[change.book_id] += change.delta
+    outcomes = await adjust_stock(session, deltas)
+    await session.commit()
+    await cache.invalidate(*(book_key(book_id) for book_id, (result, _) in outcomes.items()
+                             if result == StockStatus.APPLIED))
+    return [{"book_id": book_id, "status": result, "count": count}
+            for book_id, (result, count) in outcomes.items()]
+
+
+@router.post("/{book_id}/stock",
+             response_model=StockResponse,
+             summary="Изменить остаток книги",
+             description="Атомарно увеличивает (delta > 0) или уменьшает (delta < 0) количество экземпляров книги. "
+                         "Возвращает 409, если экземпляров недостаточно или количество выходит за допустимый предел")
+async def change_stock(book_id: UUID4, change: StockChange, session: AsyncSession = Depends(get_async_session),
+                       cache: Cache = Depends(get_cache)):
+    result, count = (await adjust_stock(session, {book_id: change.delta}))[book_id]
+    await session.commit()
+    if result == StockStatus.NOT_FOUND:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    if result == StockStatus.INSUFFICIENT_STOCK:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Insufficient stock")
+    if result == StockStatus.OUT_OF_RANGE:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Stock count out of range")
+    await cache.invalidate(book_key(book_id))
+    return {"book_id": book_id, "count": count}
+
+
+@router.post("/batch-get",
+             response_model=BookBatchGetResponse,
+             summary="Получить несколько книг по ID",
+             description="Возвращает книги с указанными ID одним запросом к базе и список ID, которых нет")
+async def batch_get_books(batch: BatchIds, session: AsyncSession = Depends(get_read_session)):
+    books = await batch_db.get_books(session, batch.ids)
+    found = {book.id for book in books}
+    return {"items": books, "missing": [book_id for book_id in dict.fromkeys(batch.ids) if book_id not in found]}
+
+
+@router.post("/batch",
+             response_model=List[BatchItemResult],
+             summary="Создать несколько книг",
+             description="Создает книги в одной транзакции и возвращает результат по каждой: "
+                         "created, conflict (книга уже есть) или unknown_author")
+async def batch_create_books(books: Annotated[List[BookCreate], Body(min_length=1, max_length=settings.MAX_BATCH_SIZE)],
+                             session: AsyncSession = Depends(get_async_session),
+                             cache: Cache = Depends(get_cache)):
+    outcomes = await batch_db.create_books(session, [book.model_dump() for book in books])
+    await session.commit()
+    await cache.invalidate(*{author_books_count_key(book.author_id)
+                             for book, outcome in zip(books, outcomes) if outcome["status"] == BatchStatus.CREATED})
+    return outcomes
+
+
+@router.put("/batch",
+            response_model=List[BatchItemResult],
+            summary="Обновить несколько книг",
+            description="Обновляет книги в одной транзакции и возвращает результат по каждой: "
+                        "updated, not_found, conflict или unknown_author")
+async def batch_update_books(changes: Annotated[List[BookBatchUpdate],
+                                                Body(min_length=1, max_length=settings.MAX_BATCH_SIZE)],
+                             session: AsyncSession = Depends(get_async_session),
+                             cache: Cache = Depends(get_cache)):
+    outcomes, authors = await batch_db.update_books(session, [change.model_dump(exclude_unset=True)
+                                                              for change in changes])
+    await session.commit()
+    await cache.invalidate(*(book_key(outcome["id"]) for outcome in outcomes
+                             if outcome["status"] == BatchStatus.UPDATED),
+                           *(author_books_count_key(author_id) for author_id in authors))
+    return outcomes
+
+
+@router.post("/batch-delete",
+             response_model=List[BatchItemResult],
+             summary="Удалить несколько книг",
+             description="Удаляет книги с указанными ID одним запросом и возвращает результат по каждой: "
+                         "deleted или not_found")
+async def batch_delete_books(batch: BatchIds, session: AsyncSession = Depends(get_async_session),
+                             cache: Cache = Depends(get_cache)):
+    outcomes, authors = await batch_db.delete_books(session, batch.ids)
+    await session.commit()
+    await cache.invalidate(*(book_key(book_id) for book_id in batch.ids),
+                           *(author_books_count_key(author_id) for author_id in authors))
+    return outcomes
 
 
 # -------------------------- CRUD --------------------------
+BOOK_ORDERINGS = {
+    "id": (Book.id,),
+    "title": (Book.title, Book.id),
+    "count": (Book.count.desc(), Book.id),
+}
+BOOK_FIELDS = list(BookCreateResponse.model_fields)
+BOOK_COLUMNS = [getattr(Book, name) for name in BOOK_FIELDS]
+book_adapter = TypeAdapter(BookCreateResponse)
+delivery_adapter = TypeAdapter(DeliveryResponse)
+job_adapter = TypeAdapter(JobResponse)
+book_rows_adapter = rows_adapter(BookCreateResponse)
+search_rows_adapter = rows_adapter(BookSearchResult)
+book_with_author_adapter = TypeAdapter(BookWithAuthor)
+books_with_author_adapter = TypeAdapter(List[BookWithAuthor])
+search_with_author_adapter = TypeAdapter(List[BookSearchResultWithAuthor])
+
+
+def book_write_error(exc: IntegrityError) -> HTTPException:
+    code = sqlstate(exc)
+    if code == FOREIGN_KEY_VIOLATION:
+        detail = "Author not found"
+    elif code == UNIQUE_VIOLATION:
+        detail = "Book already exists"
+    else:
+        detail = "Invalid book data"
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
 @router.get("/",
             response_model=List[BookCreateResponse],
             summary="Получить список книг",
-            description="Возвращает список всех книг")
-async def get_books(session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Book))
-    books = result.scalars().all()
-    if books is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Books not found")
-    return books
+            description="Возвращает страницу списка книг (keyset-пагинация по id, по (title, id) или по убыванию "
+                        "количества экземпляров). Курсор следующей страницы передается в заголовке X-Next-Cursor. "
+                        "Фильтры: жанр, автор, наличие и диапазон количества. fields=title,count возвращает только "
+                        "перечисленные поля (и id). expand=author добавляет в каждую книгу объект автора (одним "
+                        "дополнительным запросом на страницу). С stream=true отдает все книги после курсора построчно "
+                        "в формате NDJSON")
+async def get_books(request: Request,
+                    cursor: Optional[str] = None,
+                    limit: int = Query(settings.DEFAULT_PAGE_SIZE, gt=0, le=settings.MAX_PAGE_SIZE),
+                    order_by: Literal["id", "title", "count"] = "id",
+                    genre: Optional[BookGenre] = None,
+                    author_id: Optional[UUID4] = None,
+                    in_stock: Optional[bool] = None,
+                    min_count: Optional[int] = Query(None, ge=0),
+                    max_count: Optional[int] = Query(None, ge=0),
+                    fields: Optional[str] = None,
+                    expand: Optional[Literal["author"]] = None,
+                    stream: bool = False,
+                    session: AsyncSession = Depends(get_read_session),
+                    session_factory: async_sessionmaker[AsyncSession] = Depends(get_read_session_factory)):
+    columns = BOOK_ORDERINGS[order_by]
+    filters = []
+    if genre is not None:
+        filters.append(Book.genre == genre)
+    if author_id is not None:
+        filters.append(Book.author_id == author_id)
+    if in_stock is not None:
+        filters.append(Book.count > 0 if in_stock else Book.count == 0)
+    if min_count is not None:
+        filters.append(Book.count >= min_count)
+    if max_count is not None:
+        filters.append(Book.count <= max_count)
+
+    if fields is not None and expand:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="expand cannot be combined with fields")
+
+    # A revalidation is answered from (id, version) pairs alone, without loading the page.
+    if not stream and "if-none-match" in request.headers:
+        versions = select(Book.id, Book.version).where(*filters)
+        if expand:
+            versions = versions.join(Author, Author.id == Book.author_id).add_columns(Author.version)
+        result = await session.execute(paginate(versions, columns, cursor, limit))
+        etag = make_etag(*(tuple(row) for row in result))
+        if is_not_modified(request, etag):
+            return not_modified(request, etag)
+
+    if expand:
+        stmt = select(Book).where(*filters).options(selectinload(Book.author))
+        if stream:
+            return ndjson_response(session_factory, paginate(stmt, columns, cursor),
+                                   model_encoder(book_with_author_adapter))
+        result = await session.execute(paginate(stmt, columns, cursor, limit))
+        books = result.scalars().all()
+        response = model_response(books_with_author_adapter, books)
+        set_validators(request, response, make_etag(*((book.id, book.version, book.author.version)
+                                                       for book in books)))
+        set_next_cursor(response, books, limit, *cursor_keys(columns))
+        return response
+
+    # Plain and sparse pages select columns only and skip per-row model validation;
+    # fields=title,count narrows the columns to the requested ones (plus id).
+    keys = BOOK_FIELDS
+    if fields is not None:
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested - set(BOOK_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        keys = [name for name in BOOK_FIELDS if name in requested or name == "id"]
+    selected = keys + [key for key in cursor_keys(columns) if key not in keys]
+    stmt = select(*(getattr(Book, name) for name in selected)).where(*filters)
+    if stream:
+        return ndjson_response(session_factory, paginate(stmt, columns, cursor), mapping_encoder(keys),
+                               scalars=False)
+    result = await session.execute(paginate(stmt.add_columns(Book.version), columns, cursor, limit))
+    rows = result.mappings().all()
+    response = rows_response(book_rows_adapter, rows, None if fields is None else keys)
+    set_validators(request, response, make_etag(*((row["id"], row["version"]) for row in rows)))
+    set_next_cursor(response, rows, limit, *cursor_keys(columns))
+    return response
 
 
 @router.post("/",
              response_model=BookCreateResponse,
              summary="Создать новую книгу",
              description="Создает новую книгу с заданными параметрами")
-async def create_book(book: BookCreate, session: AsyncSession = Depends(get_async_session)):
+async def create_book(book: BookCreate, session: AsyncSession = Depends(get_async_session),
+                      cache: Cache = Depends(get_cache), idempotency: Idempotency = Depends(get_idempotency)):
+    if (replay := await idempotency.replay(session)) is not None:
+        return replay
+    values = book.model_dump()
+    values["author_id"] = parse_uuid(values["author_id"])
+    if values["author_id"] is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Author not found")
+    new_book = Book(**values)
+    session.add(new_book)
     try:
-        new_book = Book(**book.model_dump())
-        session.add(new_book)
-        await session.commit()
-        await session.refresh(new_book)
-        return new_book
-    except Exception:
-        print(traceback.format_exc())
-        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Book already exists")
+        await session.flush()
+    except IntegrityError as exc:
+        raise book_write_error(exc)
+    await session.refresh(new_book)
+    response = model_response(book_adapter, new_book)
+    await idempotency.save(session, response)
+    await session.commit()
+    await cache.invalidate(author_books_count_key(new_book.author_id))
+    return response
 
 
 @router.get("/{book_id}",
             response_model=BookCreateResponse,
             summary="Получить книгу по ID",
-            description="Возвращает информацию о книге по ее ID")
-async def get_book(book_id: UUID4, session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Book).where(Book.id == book_id))
-    book = result.scalars().first()
+            description="Возвращает информацию о книге по ее ID. expand=author добавляет объект автора")
+async def get_book(request: Request, response: Response, book_id: UUID4,
+                   expand: Optional[Literal["author"]] = None,
+                   session: AsyncSession = Depends(get_read_session),
+                   cache: Cache = Depends(get_cache)):
+    # Cached entries carry version / updated_at next to the body, so a revalidation
+    # is answered from the cache without touching the database.
+    async def load():
+        result = await session.execute(select(Book).where(Book.id == book_id))
+        book = result.scalars().first()
+        return None if book is None else {
+            **book_adapter.dump_python(book_adapter.validate_python(book, from_attributes=True), mode="json"),
+            "version": book.version, "updated_at": book.updated_at.isoformat(),
+        }
+
+    book = await cache.get_or_load(book_key(book_id), load)
     if book is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
-    return book
+    versions = [book["version"]]
+    last_modified = datetime.fromisoformat(book["updated_at"])
+
+    if expand:
+        # The book and its author are cached separately, so author edits need no book invalidation.
+        author = await cached_author(session, cache, UUID(book["author_id"]))
+        versions.append(author["version"])
+        last_modified = max(last_modified, datetime.fromisoformat(author["updated_at"]))
+
+    etag = make_etag(*versions) if expand else version_etag(book["version"])
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(request, etag, last_modified)
+    if expand:
+        response = model_response(book_with_author_adapter, {**book, "author": author})
+    set_validators(request, response, etag, last_modified)
+    return response if expand else book
 
 
 @router.put("/{book_id}",
             response_model=BookCreateResponse,
             summary="Обновить информацию о книге",
-            description="Обновляет информацию о книге с заданным ID")
-async def update_book(book_id: int, book_update: BookUpdate, session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Book).where(Book.id == book_id))
-    book = result.scalars().first()
-    if book is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
-
-    for key, value in book_update.model_dump(exclude_unset=True).items():
-        setattr(book, key, value)
+            description="Обновляет информацию о книге с заданным ID. С заголовком If-Match (ETag книги) "
+                        "обновление выполняется одним условным запросом и возвращает 412, если книгу "
+                        "уже изменили")
+async def update_book(request: Request, book_id: UUID4, book_update: BookUpdate,
+                      session: AsyncSession = Depends(get_async_session),
+                      cache: Cache = Depends(get_cache)):
+    changes = book_update.model_dump(exclude_unset=True)
+    if "author_id" in changes:
+        changes["author_id"] = parse_uuid(changes["author_id"])
+        if changes["author_id"] is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Author not found")
+    # One UPDATE ... RETURNING; the self-join reads the row as it was before the update,
+    # for the previous author. With If-Match the version is part of the WHERE clause.
+    previous = Book.__table__.alias("previous")
+    columns = (*BOOK_COLUMNS, Book.version, previous.c.author_id.label("previous_author_id"))
+    matched = [Book.id == book_id, previous.c.id == Book.id]
+    versions = if_match_versions(request)
+    if versions is not None:
+        matched.append(Book.version.in_(versions))
+    stmt = (update(Book.__table__).where(*matched).values(**changes).returning(*columns) if changes
+            else select(*columns).where(*matched))
     try:
+        book = (await session.execute(stmt)).mappings().first()
         await session.commit()
-        await session.refresh(book)
-    except:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Book already exists")
+    except IntegrityError as exc:
+        raise book_write_error(exc)
+    if book is None:
+        await missing_or_modified(session, Book, book_id, versions, "Book not found")
 
-    return book
+    await cache.invalidate(book_key(book_id), author_books_count_key(book["previous_author_id"]),
+                           author_books_count_key(book["author_id"]))
+    response = model_response(book_adapter, book)
+    response.headers["ETag"] = version_etag(book["version"])
+    return response
 
 
 @router.delete("/{book_id}",
                response_model=BookDeleteResponse,
                summary="Удалить книгу",
-               description="Удаляет книгу с заданным ID")
-async def delete_book(book_id: UUID4, session: AsyncSession = Depends(get_async_session)):
-    result = await session.execute(select(Book).where(Book.id == book_id))
-    book = result.scalars().first()
-    if book is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
-
-    await session.delete(book)
+               description="Удаляет книгу с заданным ID. С заголовком If-Match (ETag книги) возвращает 412, "
+                           "если книгу уже изменили")
+async def delete_book(request: Request, book_id: UUID4, session: AsyncSession = Depends(get_async_session),
+                      cache: Cache = Depends(get_cache)):
+    stmt = delete(Book).where(Book.id == book_id)
+    versions = if_match_versions(request)
+    if versions is not None:
+        stmt = stmt.where(Book.version.in_(versions))
+    author_id = await session.scalar(stmt.returning(Book.author_id))
     await session.commit()
+    if author_id is None:
+        await missing_or_modified(session, Book, book_id, versions, "Book not found")
+    await cache.invalidate(book_key(book_id), author_books_count_key(author_id))
     return {"detail": "Book deleted"}
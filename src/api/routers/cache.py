@@ -0,0 +1,17 @@
+import logging
+
+from fastapi import APIRouter, Depends
+
+from src.cache import Cache, get_cache
+from src.api.schemas.cache import CacheStats
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/cache", tags=["cache"])
+
+
+@router.get("/stats",
+            response_model=CacheStats,
+            summary="Статистика кэша",
+            description="Возвращает размер кэша и счетчики попаданий, промахов и вытеснений")
+async def get_cache_stats(cache: Cache = Depends(get_cache)):
+    return await cache.stats()
@@ -0,0 +1,77 @@
+import logging
+import time
+from typing import AsyncIterator, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from starlette import status
+
+from src.api.pagination import NEXT_CURSOR_HEADER
+from src.api.responses import model_response
+from src.api.schemas.change import ChangeEvent
+from src.database.changes import ChangeFeed, ChangesExpired, get_change_feed
+from config import settings
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/changes", tags=["changes"])
+
+SSE_MEDIA_TYPE = "text/event-stream"
+change_adapter = TypeAdapter(ChangeEvent)
+changes_adapter = TypeAdapter(List[ChangeEvent])
+
+
+async def _events(feed: ChangeFeed, cursor: int, limit: int) -> list:
+    try:
+        return await feed.events_after(cursor, limit)
+    except ChangesExpired:
+        raise HTTPException(status_code=status.HTTP_410_GONE,
+                            detail="Cursor is older than the retained changes; reload the catalogue")
+
+
+async def _sse(feed: ChangeFeed, cursor: int, limit: int, timeout: float) -> AsyncIterator[bytes]:
+    # Ends after timeout; EventSource reconnects with Last-Event-ID and resumes from there.
+    deadline = time.monotonic() + timeout
+    yield b"retry: 1000\n\n"
+    while (remaining := deadline - time.monotonic()) > 0:
+        try:
+            events = await feed.events_after(cursor, limit)
+        except ChangesExpired:
+            return
+        for event in events:
+            yield (f"id: {event['seq']}\nevent: {event['entity']}.{event['op']}\n".encode()
+                   + b"data: " + change_adapter.dump_json(change_adapter.validate_python(event)) + b"\n\n")
+        if events:
+            cursor = events[-1]["seq"]
+        elif not await feed.wait(cursor, min(remaining, settings.CHANGES_KEEPALIVE)):
+            yield b": keepalive\n\n"
+
+
+@router.get("",
+            response_model=List[ChangeEvent],
+            summary="Лента изменений каталога",
+            description="События создания, изменения и удаления книг и авторов по возрастанию seq. Без cursor "
+                        "лента начинается с текущего момента. С Accept: text/event-stream отдает Server-Sent "
+                        "Events (id события - seq, продолжение после разрыва - по Last-Event-ID) в течение "
+                        "timeout секунд; иначе - long-poll: ждет до timeout секунд первые события после cursor. "
+                        "Курсор для следующего запроса - в заголовке X-Next-Cursor. 410 - события после cursor "
+                        "уже удалены")
+async def get_changes(request: Request,
+                      cursor: Optional[int] = Query(None, ge=0),
+                      limit: int = Query(settings.DEFAULT_PAGE_SIZE, gt=0, le=settings.MAX_PAGE_SIZE),
+                      timeout: float = Query(settings.CHANGES_TIMEOUT, ge=0, le=settings.CHANGES_MAX_TIMEOUT),
+                      last_event_id: Optional[int] = Header(None, ge=0),
+                      feed: ChangeFeed = Depends(get_change_feed)):
+    await feed.start()
+    cursor = next((value for value in (cursor, last_event_id, feed.latest) if value is not None))
+    if SSE_MEDIA_TYPE in request.headers.get("accept", ""):
+        await _events(feed, cursor, 1)
+        return StreamingResponse(_sse(feed, cursor, limit, timeout), media_type=SSE_MEDIA_TYPE,
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    events = await _events(feed, cursor, limit)
+    if not events and await feed.wait(cursor, timeout):
+        events = await _events(feed, cursor, limit)
+    response = model_response(changes_adapter, events)
+    response.headers[NEXT_CURSOR_HEADER] = str(events[-1]["seq"] if events else cursor)
+    return response
@@ -0,0 +1,22 @@
+import logging
+
+from fastapi import APIRouter
+
+from src.database.database import async_engine, async_replica_engine
+from src.database.pool import pool_stats
+from src.api.schemas.database import DatabasePoolStats
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/database", tags=["database"])
+
+
+@router.get("/pool",
+            response_model=DatabasePoolStats,
+            summary="Статистика пула соединений",
+            description="Возвращает занятые и свободные соединения, переполнение пула и время ожидания соединения "
+                        "для основной базы и реплики (если она настроена)")
+async def get_pool_stats():
+    return {
+        "primary": pool_stats(async_engine),
+        "replica": pool_stats(async_replica_engine) if async_replica_engine is not None else None,
+    }
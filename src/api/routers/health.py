@@ -0,0 +1,55 @@
+import asyncio
+import logging
+
+from fastapi import APIRouter, Response
+from sqlalchemy import text
+from starlette import status
+
+from src.api.admission import gates
+from src.api.schemas.health import Liveness, Readiness
+from src.database.database import async_engine
+from src.database.pool import pool_saturated, pool_stats
+from config import settings
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+async def _ping() -> None:
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def ping_database() -> bool:
+    try:
+        await asyncio.wait_for(_ping(), settings.HEALTH_TIMEOUT)
+        return True
+    except Exception:
+        logger.warning("Readiness check could not reach the database", exc_info=True)
+        return False
+
+
+@router.get("/live",
+            response_model=Liveness,
+            summary="Проверка живости",
+            description="Отвечает, пока процесс обслуживает запросы; базу данных не проверяет")
+async def liveness():
+    return {"status": "alive"}
+
+
+@router.get("/ready",
+            response_model=Readiness,
+            summary="Проверка готовности",
+            description="503, если пул соединений исчерпан или база недоступна, чтобы балансировщик направил "
+                        "запросы на другие экземпляры. Возвращает состояние пула и очередей admission control")
+async def readiness(response: Response):
+    # A saturated pool is reported without pinging: the ping would only queue behind the requests.
+    if pool_saturated(async_engine):
+        state, database = "saturated", None
+    else:
+        database = await ping_database()
+        state = "ready" if database else "unavailable"
+    if state != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": state, "database": database, "pool": pool_stats(async_engine),
+            "admission": {name: gate.stats() for name, gate in gates.items()}}
@@ -0,0 +1,26 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import UUID4
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from src.database.database import get_async_session
+from src.database.models import Job
+from src.api.schemas.job import JobResponse
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}",
+            response_model=JobResponse,
+            summary="Состояние фоновой задачи",
+            description="Возвращает статус задачи (queued, running, succeeded, failed), число обработанных "
+                        "элементов из total, итоговые счетчики и отклоненные элементы")
+async def get_job(job_id: UUID4, session: AsyncSession = Depends(get_async_session)):
+    # Read from the primary: a replica may lag behind the worker's progress.
+    job = await session.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
@@ -0,0 +1,28 @@
+import logging
+
+from fastapi import APIRouter, Response
+
+from src.database.database import async_engine, async_replica_engine
+from src.database.pool import pool_stats
+from src.metrics import PROMETHEUS_CONTENT_TYPE, db_pool_connections, db_pool_wait, registry
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics",
+            summary="Метрики в формате Prometheus",
+            description="Гистограммы времени ответа по маршрутам, число SQL-запросов и время в базе на запрос, "
+                        "медленные запросы, подозрения на N+1 и состояние пулов соединений",
+            response_class=Response)
+async def get_metrics():
+    engines = {"primary": async_engine}
+    if async_replica_engine is not None:
+        engines["replica"] = async_replica_engine
+    for name, engine in engines.items():
+        stats = pool_stats(engine)
+        for state in ("checked_in", "checked_out", "overflow"):
+            db_pool_connections.set(name, state, value=stats[state])
+        if "wait_seconds_total" in stats:
+            db_pool_wait.set_total(name, value=stats["wait_seconds_total"])
+    return Response(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,7 +1,9 @@
-from typing import List
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, UUID4
 
+from src.database.models import BookGenre
+
 
 class AuthorCreateResponse(BaseModel):
     id: UUID4|str
@@ -13,6 +15,13 @@ class AuthorCreate(BaseModel):
 class AuthorUpdate(BaseModel):
     title: str
 
+class AuthorBatchUpdate(AuthorUpdate):
+    id: UUID4
+
+class AuthorBatchGetResponse(BaseModel):
+    items: List[AuthorCreateResponse]
+    missing: List[UUID4]
+
 class AuthorBooksCount(BaseModel):
     count: int
 
@@ -21,4 +30,6 @@ class AuthorDeleteResponse(BaseModel):
 
 class AllAuthorsAllBooksCount(BaseModel):
     author_id: UUID4
-    count: int
\ No newline at end of file
+    count: int
+    copies: Optional[int] = None
+    genres: Optional[Dict[BookGenre, int]] = None
@@ -0,0 +1,16 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, UUID4
+
+from config import settings
+from src.database.batch import BatchStatus
+
+
+class BatchIds(BaseModel):
+    ids: List[UUID4] = Field(min_length=1, max_length=settings.MAX_BATCH_SIZE)
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[UUID4] = None
+    status: BatchStatus
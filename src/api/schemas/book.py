@@ -1,17 +1,23 @@
-from typing import Optional
-from pydantic import BaseModel, PositiveInt, UUID4
+from typing import Annotated, List, Optional
+from pydantic import AfterValidator, BaseModel, Field, NonNegativeInt, PositiveInt, UUID4, model_validator
 from src.database.models import BookGenre
+from src.database.delivery import DeliveryStatus
+from src.database.stock import MAX_COUNT, StockStatus
 
 
 class BookCreateResponse(BaseModel):
     id: UUID4
     title: str
     genre: BookGenre
-    count: PositiveInt
+    count: NonNegativeInt
     author_id: UUID4 | str
     description: Optional[str] = None
 
 
+class BookSearchResult(BookCreateResponse):
+    score: float
+
+
 class BookCreate(BaseModel):
     title: str
     genre: BookGenre
@@ -20,6 +26,19 @@ class BookCreate(BaseModel):
     description: Optional[str] = None
 
 
+class DeliveryBook(BookCreate):
+    # Supplier feeds may name the author instead: unknown titles create the author.
+    # author_id wins when both are given.
+    author_id: Optional[UUID4 | str] = None
+    author_title: Optional[str] = Field(None, min_length=1)
+
+    @model_validator(mode="after")
+    def author_required(self) -> "DeliveryBook":
+        if self.author_id is None and self.author_title is None:
+            raise ValueError("author_id or author_title is required")
+        return self
+
+
 class BookUpdate(BaseModel):
     title: Optional[str] = None
     genre: Optional[BookGenre] = None
@@ -27,5 +46,89 @@ class BookUpdate(BaseModel):
     author_id: Optional[UUID4 | str] = None
     description: Optional[str] = None
 
+    @model_validator(mode="after")
+    def required_not_null(self) -> "BookUpdate":
+        # Fields may be left out, but only description can be cleared.
+        nulls = [name for name in ("title", "genre", "count", "author_id")
+                 if name in self.model_fields_set and getattr(self, name) is None]
+        if nulls:
+            raise ValueError(f"{', '.join(nulls)} cannot be null")
+        return self
+
+class BookBatchUpdate(BookUpdate):
+    id: UUID4
+
+
+class BookBatchGetResponse(BaseModel):
+    items: List[BookCreateResponse]
+    missing: List[UUID4]
+
+
 class BookDeleteResponse(BaseModel):
     detail: str
+
+
+class DeliveryItemResult(BaseModel):
+    index: int
+    title: str
+    author_id: UUID4 | str
+    status: DeliveryStatus
+    book_id: Optional[UUID4] = None
+
+
+class DeliveryResponse(BaseModel):
+    message: str
+    created: int
+    restocked: int
+    rejected: int
+    items: List[DeliveryItemResult]
+
+
+class ImportRowError(BaseModel):
+    line: int
+    detail: str
+
+
+class ImportResponse(BaseModel):
+    rows: int
+    loaded: int
+    invalid: int
+    created: int
+    restocked: int
+    rejected: int
+    errors: List[ImportRowError]
+
+
+def _non_zero(delta: int) -> int:
+    if delta == 0:
+        raise ValueError("delta must not be zero")
+    return delta
+
+
+StockDelta = Annotated[int, Field(ge=-MAX_COUNT, le=MAX_COUNT), AfterValidator(_non_zero)]
+
+
+class StockChange(BaseModel):
+    delta: StockDelta
+
+
+class BatchStockChange(BaseModel):
+    book_id: UUID4
+    delta: StockDelta
+
+
+class StockResponse(BaseModel):
+    book_id: UUID4
+    count: NonNegativeInt
+
+
+class BatchStockResult(BaseModel):
+    book_id: UUID4
+    status: StockStatus
+    count: Optional[NonNegativeInt] = None
+
+
+class GenreStat(BaseModel):
+    genre: BookGenre
+    books: int
+    copies: int
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    backend: str
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
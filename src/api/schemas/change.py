@@ -0,0 +1,13 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, UUID4
+
+
+class ChangeEvent(BaseModel):
+    seq: int
+    entity: Literal["book", "author"]
+    entity_id: UUID4
+    op: Literal["insert", "update", "delete"]
+    version: int
+    changed_at: datetime
@@ -0,0 +1,21 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class PoolStats(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    checkouts: Optional[int] = None
+    waiting: Optional[int] = None
+    wait_seconds_total: Optional[float] = None
+    wait_seconds_avg: Optional[float] = None
+    wait_seconds_max: Optional[float] = None
+
+
+class DatabasePoolStats(BaseModel):
+    primary: PoolStats
+    replica: Optional[PoolStats] = None
@@ -0,0 +1,16 @@
+from typing import List
+
+from src.api.schemas.author import AuthorCreateResponse
+from src.api.schemas.book import BookCreateResponse, BookSearchResult
+
+
+class BookWithAuthor(BookCreateResponse):
+    author: AuthorCreateResponse
+
+
+class BookSearchResultWithAuthor(BookSearchResult):
+    author: AuthorCreateResponse
+
+
+class AuthorWithBooks(AuthorCreateResponse):
+    books: List[BookCreateResponse]
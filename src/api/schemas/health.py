@@ -0,0 +1,24 @@
+from typing import Dict, Literal, Optional
+
+from pydantic import BaseModel
+
+from src.api.schemas.database import PoolStats
+
+
+class Liveness(BaseModel):
+    status: Literal["alive"]
+
+
+class AdmissionGroupStats(BaseModel):
+    active: int
+    waiting: int
+    concurrency: int
+    queue: int
+    timeout: float
+
+
+class Readiness(BaseModel):
+    status: Literal["ready", "saturated", "unavailable"]
+    database: Optional[bool] = None
+    pool: PoolStats
+    admission: Dict[str, AdmissionGroupStats]
@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, UUID4
+
+from src.database.models import JobStatus
+
+
+class JobResponse(BaseModel):
+    id: UUID4
+    kind: str
+    status: JobStatus
+    total: int
+    processed: int
+    result: Dict[str, int]
+    failures: List[Dict[str, Any]]
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,57 @@
+from typing import Any, AsyncIterator, Callable, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette import status
+
+from src.api.pagination import NEXT_CURSOR_HEADER
+from src.database.changes import change_bounds, is_expired
+from src.database.export import ExportFormat, copy_out
+from config import settings
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+
+
+Encoder = Callable[[Any], bytes]
+
+
+def model_encoder(adapter: TypeAdapter) -> Encoder:
+    return lambda row: adapter.dump_json(adapter.validate_python(row, from_attributes=True))
+
+
+def mapping_encoder(keys: list) -> Encoder:
+    return lambda row: to_json({key: row[key] for key in keys})
+
+
+async def _ndjson_chunks(session_factory: async_sessionmaker[AsyncSession], stmt: Select,
+                         encode: Encoder, scalars: bool) -> AsyncIterator[bytes]:
+    # The request-scoped session is already closed while the body is being sent,
+    # so the stream owns a session (and a server-side cursor) of its own.
+    async with session_factory() as session:
+        result = await session.stream(stmt.execution_options(yield_per=settings.STREAM_CHUNK_SIZE))
+        result = result.scalars() if scalars else result.mappings()
+        async for partition in result.partitions():
+            yield b"".join(encode(row) + b"\n" for row in partition)
+
+
+def ndjson_response(session_factory: async_sessionmaker[AsyncSession], stmt: Select,
+                    encode: Encoder, scalars: bool = True) -> StreamingResponse:
+    return StreamingResponse(_ndjson_chunks(session_factory, stmt, encode, scalars), media_type=NDJSON_MEDIA_TYPE)
+
+
+async def export_response(session: AsyncSession, session_factory: async_sessionmaker[AsyncSession], stmt: Select,
+                          fmt: ExportFormat, since: Optional[int] = None) -> StreamingResponse:
+    # X-Next-Cursor is the change feed position read before the export starts, so passing it as
+    # since next time re-exports rather than misses the rows changed while this one ran.
+    oldest, latest = await change_bounds(session)
+    if since is not None and is_expired(oldest, since):
+        raise HTTPException(status_code=status.HTTP_410_GONE,
+                            detail="since is older than the retained changes; run a full export")
+    return StreamingResponse(copy_out(session_factory, stmt, fmt),
+                             media_type=CSV_MEDIA_TYPE if fmt == "csv" else NDJSON_MEDIA_TYPE,
+                             headers={NEXT_CURSOR_HEADER: str(latest)})
@@ -0,0 +1,73 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import settings
+from src.cache.backends import CacheBackend, MemoryBackend, RedisBackend
+
+
+
+class Cache:
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        # Values must be JSON-compatible; None (not found) is never cached.
+        if self.backend is None:
+            return await loader()
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = await loader()
+        if value is not None:
+            await self.backend.set(key, value)
+        return value
+
+    async def invalidate(self, *keys: str) -> None:
+        if self.backend is not None:
+            await self.backend.delete(*keys)
+
+    async def clear(self) -> None:
+        if self.backend is not None:
+            await self.backend.clear()
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name if self.backend is not None else "none",
+            "size": await self.backend.size() if self.backend is not None else 0,
+            "max_size": settings.CACHE_MAX_SIZE,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions if self.backend is not None else 0,
+        }
+
+
+def book_key(book_id: Any) -> str:
+    return f"book:{book_id}"
+
+
+def author_key(author_id: Any) -> str:
+    return f"author:{author_id}"
+
+
+def author_books_count_key(author_id: Any) -> str:
+    return f"author_books_count:{author_id}"
+
+
+def create_cache() -> Cache:
+    if settings.CACHE_BACKEND == "none":
+        return Cache(None)
+    if settings.CACHE_BACKEND == "redis":
+        from redis.asyncio import Redis
+
+        return Cache(RedisBackend(Redis.from_url(settings.CACHE_REDIS_URL), ttl=settings.CACHE_TTL))
+    return Cache(MemoryBackend(max_size=settings.CACHE_MAX_SIZE, ttl=settings.CACHE_TTL))
+
+
+cache = create_cache()
+
+
+def get_cache() -> Cache:
+    return cache
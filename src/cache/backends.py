@@ -0,0 +1,98 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+
+class CacheBackend(ABC):
+    name: str
+    evictions: int = 0
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    async def size(self) -> int:
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    name = "memory"
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend(CacheBackend):
+    # Works with any client exposing the redis.asyncio get/set/delete/scan_iter API.
+    # Eviction is left to the server (TTL and maxmemory policy).
+    name = "redis"
+
+    def __init__(self, client: Any, ttl: float, prefix: str = "book_shop:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.client.set(self.prefix + key, json.dumps(value), px=int(self.ttl * 1000))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def clear(self) -> None:
+        keys = [key async for key in self.client.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def size(self) -> int:
+        return len([key async for key in self.client.scan_iter(match=self.prefix + "*")])
@@ -0,0 +1,93 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import String, any_, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from src.database.models import Author
+
+
+class AuthorNames:
+    # Bounded LRU title -> id map for supplier feeds that name authors instead of passing ids.
+    # Only authors read back from the table are remembered, never ids inserted by a transaction
+    # that may still roll back. Renames and deletions in this process evict their entries; other
+    # processes' changes are picked up after AUTHOR_NAME_CACHE_TTL.
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, UUID]]" = OrderedDict()
+
+    def get(self, title: str) -> Optional[UUID]:
+        entry = self._entries.get(title)
+        if entry is None:
+            return None
+        expires_at, author_id = entry
+        if expires_at <= self._clock():
+            del self._entries[title]
+            return None
+        self._entries.move_to_end(title)
+        return author_id
+
+    def remember(self, title: str, author_id: UUID) -> None:
+        self._entries[title] = (self._clock() + self.ttl, author_id)
+        self._entries.move_to_end(title)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def forget(self, *author_ids: UUID) -> None:
+        author_ids = set(author_ids)
+        for title in [title for title, (_, author_id) in self._entries.items() if author_id in author_ids]:
+            del self._entries[title]
+
+    def forget_titles(self, titles: Iterable[str]) -> None:
+        for title in titles:
+            self._entries.pop(title, None)
+
+
+author_names = AuthorNames(settings.AUTHOR_NAME_CACHE_SIZE, settings.AUTHOR_NAME_CACHE_TTL)
+
+
+async def _find(session: AsyncSession, titles: Iterable[str]) -> Dict[str, UUID]:
+    result = await session.execute(select(Author.title, Author.id)
+                                   .where(Author.title == any_(literal(list(titles), ARRAY(String)))))
+    found = {}
+    for title, author_id in result:
+        found[title] = author_id
+        author_names.remember(title, author_id)
+    return found
+
+
+async def resolve_author_titles(session: AsyncSession, titles: Iterable[str]) -> Dict[str, UUID]:
+    # Ids for all given titles, creating the missing authors: cache first, then one lookup and
+    # one INSERT ... ON CONFLICT (title) DO NOTHING for the rest. Does not commit.
+    resolved: Dict[str, UUID] = {}
+    missing = set()
+    for title in set(titles):
+        if (author_id := author_names.get(title)) is not None:
+            resolved[title] = author_id
+        else:
+            missing.add(title)
+    if not missing:
+        return resolved
+    resolved.update(await _find(session, missing))
+    missing -= resolved.keys()
+    if not missing:
+        return resolved
+    # Sorted, so concurrent feeds naming the same new authors take their locks in the same order.
+    result = await session.execute(
+        insert(Author).values([{"title": title} for title in sorted(missing)])
+        .on_conflict_do_nothing(index_elements=[Author.title])
+        .returning(Author.title, Author.id)
+    )
+    resolved.update({title: author_id for title, author_id in result})
+    missing -= resolved.keys()
+    if missing:
+        # Created by a concurrent transaction, which ON CONFLICT has waited for to commit.
+        resolved.update(await _find(session, missing))
+    return resolved
@@ -0,0 +1,227 @@
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import any_, bindparam, column, delete, exists, select, update, values
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.delivery import parse_uuid
+from src.database.errors import FOREIGN_KEY_VIOLATION, sqlstate
+from src.database.models import Author, Book
+
+BOOK_FIELDS = ("title", "genre", "count", "author_id", "description")
+AUTHOR_FIELDS = ("title",)
+
+# Batch writes run inside the caller's transaction and never commit; every
+# function returns one {"index", "id", "status"} outcome per input item.
+
+
+class BatchStatus(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    NOT_FOUND = "not_found"
+    CONFLICT = "conflict"
+    UNKNOWN_AUTHOR = "unknown_author"
+    HAS_BOOKS = "has_books"
+
+
+def _ids(ids: Sequence[UUID]):
+    return any_(bindparam("ids", list(ids), type_=ARRAY(Book.id.type)))
+
+
+def _outcome(index: int, id: Any, status: BatchStatus) -> Dict[str, Any]:
+    return {"index": index, "id": id, "status": status}
+
+
+def _sets_null(model, values: Dict[str, Any]) -> bool:
+    return any(value is None and not model.__table__.c[name].nullable for name, value in values.items())
+
+
+async def _lock_rows(session: AsyncSession, model, fields: Sequence[str],
+                     ids: Iterable[UUID]) -> Dict[UUID, Dict[str, Any]]:
+    # Current values of the rows to update, locked in key order.
+    result = await session.execute(
+        select(model.id, *(getattr(model, name) for name in fields))
+        .where(model.id == _ids(ids)).order_by(model.id).with_for_update()
+    )
+    return {row.id: row._asdict() for row in result}
+
+
+async def _apply_updates(session: AsyncSession, model, fields: Sequence[str],
+                         items: Sequence[Tuple[int, UUID, Dict[str, Any]]],
+                         rows: Dict[UUID, Dict[str, Any]]) -> Dict[int, BatchStatus]:
+    # Applies validated (index, id, values) items to the locked rows, updating rows to what was
+    # written. Rows whose values do not change are not written at all (no version bump, no change
+    # event). Everything else goes in one UPDATE ... FROM (VALUES ...); only if that hits a
+    # constraint are the items replayed one by one, each in a savepoint, to find the failing ones.
+    final = {row_id: dict(row) for row_id, row in rows.items()}
+    for _, row_id, item_values in items:
+        final[row_id].update(item_values)
+    changed = [row for row_id, row in final.items() if row != rows[row_id]]
+    statuses = {index: BatchStatus.UPDATED for index, _, _ in items}
+    if not changed:
+        return statuses
+    columns = ("id", *fields)
+    data = values(*(column(name, model.__table__.c[name].type) for name in columns), name="changes") \
+        .data([tuple(row[name] for name in columns) for row in changed])
+    try:
+        async with session.begin_nested():
+            await session.execute(
+                update(model).where(model.id == data.c.id).values(**{name: data.c[name] for name in fields})
+                .execution_options(synchronize_session=False)
+            )
+    except IntegrityError:
+        pass
+    else:
+        rows.update((row["id"], row) for row in changed)
+        return statuses
+
+    for index, row_id, item_values in items:
+        item_values = {name: value for name, value in item_values.items() if rows[row_id][name] != value}
+        if not item_values:
+            continue
+        try:
+            async with session.begin_nested():
+                await session.execute(update(model).where(model.id == row_id).values(**item_values)
+                                      .execution_options(synchronize_session=False))
+        except IntegrityError as exc:
+            statuses[index] = BatchStatus.UNKNOWN_AUTHOR if sqlstate(exc) == FOREIGN_KEY_VIOLATION \
+                else BatchStatus.CONFLICT
+            continue
+        rows[row_id].update(item_values)
+    return statuses
+
+
+async def get_books(session: AsyncSession, ids: Sequence[UUID]) -> List[Book]:
+    return list((await session.scalars(select(Book).where(Book.id == _ids(ids)))).all())
+
+
+async def get_authors(session: AsyncSession, ids: Sequence[UUID]) -> List[Author]:
+    return list((await session.scalars(select(Author).where(Author.id == _ids(ids)))).all())
+
+
+async def create_books(session: AsyncSession, books: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    author_ids = {parse_uuid(book["author_id"]) for book in books} - {None}
+    known_authors = set()
+    if author_ids:
+        known_authors = set((await session.scalars(select(Author.id).where(Author.id == _ids(author_ids)))).all())
+
+    rows = {}
+    for index, book in enumerate(books):
+        author_id = parse_uuid(book["author_id"])
+        if author_id in known_authors:
+            rows[index] = {**book, "id": uuid4(), "author_id": author_id}
+    created = set()
+    if rows:
+        created = set((await session.scalars(
+            insert(Book).values(list(rows.values()))
+            .on_conflict_do_nothing(constraint="uq_author_title")
+            .returning(Book.id)
+        )).all())
+
+    outcomes = []
+    for index in range(len(books)):
+        if index not in rows:
+            outcomes.append(_outcome(index, None, BatchStatus.UNKNOWN_AUTHOR))
+        elif rows[index]["id"] in created:
+            outcomes.append(_outcome(index, rows[index]["id"], BatchStatus.CREATED))
+        else:
+            outcomes.append(_outcome(index, None, BatchStatus.CONFLICT))
+    return outcomes
+
+
+async def update_books(session: AsyncSession,
+                       changes: Sequence[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], set]:
+    # Also returns the author ids whose book counts changed (old and new authors).
+    rows = await _lock_rows(session, Book, BOOK_FIELDS, {change["id"] for change in changes})
+    new_authors = {parse_uuid(change["author_id"]) for change in changes if "author_id" in change} - {None}
+    known_authors = set()
+    if new_authors:
+        known_authors = set((await session.scalars(select(Author.id).where(Author.id == _ids(new_authors)))).all())
+
+    statuses, items = {}, []
+    for index, change in enumerate(changes):
+        book_id, values = change["id"], {key: value for key, value in change.items() if key != "id"}
+        if "author_id" in values:
+            values["author_id"] = parse_uuid(values["author_id"])
+            if values["author_id"] is None:
+                statuses[index] = BatchStatus.UNKNOWN_AUTHOR
+                continue
+        if _sets_null(Book, values):
+            statuses[index] = BatchStatus.CONFLICT
+        elif book_id not in rows:
+            statuses[index] = BatchStatus.NOT_FOUND
+        elif values.get("author_id", rows[book_id]["author_id"]) not in known_authors | {rows[book_id]["author_id"]}:
+            statuses[index] = BatchStatus.UNKNOWN_AUTHOR
+        else:
+            items.append((index, book_id, values))
+
+    previous = {book_id: dict(row) for book_id, row in rows.items()}
+    statuses.update(await _apply_updates(session, Book, BOOK_FIELDS, items, rows))
+    touched_authors = {
+        author_id
+        for book_id, row in rows.items() if row != previous[book_id]
+        for author_id in (row["author_id"], previous[book_id]["author_id"])
+    }
+    return [_outcome(index, change["id"], statuses[index]) for index, change in enumerate(changes)], touched_authors
+
+
+async def delete_books(session: AsyncSession, ids: Sequence[UUID]) -> Tuple[List[Dict[str, Any]], set]:
+    deleted = {row.id: row.author_id for row in await session.execute(
+        delete(Book).where(Book.id == _ids(ids)).returning(Book.id, Book.author_id)
+    )}
+    outcomes = [_outcome(index, book_id, BatchStatus.DELETED if book_id in deleted else BatchStatus.NOT_FOUND)
+                for index, book_id in enumerate(ids)]
+    return outcomes, set(deleted.values())
+
+
+async def create_authors(session: AsyncSession, authors: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = [{**author, "id": uuid4()} for author in authors]
+    created = {row.title: row.id for row in await session.execute(
+        insert(Author).values(rows).on_conflict_do_nothing(index_elements=["title"])
+        .returning(Author.id, Author.title)
+    )} if rows else {}
+    outcomes = []
+    for index, row in enumerate(rows):
+        if created.get(row["title"]) == row["id"]:
+            outcomes.append(_outcome(index, row["id"], BatchStatus.CREATED))
+        else:
+            outcomes.append(_outcome(index, None, BatchStatus.CONFLICT))
+    return outcomes
+
+
+async def update_authors(session: AsyncSession, changes: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = await _lock_rows(session, Author, AUTHOR_FIELDS, {change["id"] for change in changes})
+    statuses, items = {}, []
+    for index, change in enumerate(changes):
+        author_id, values = change["id"], {key: value for key, value in change.items() if key != "id"}
+        if _sets_null(Author, values):
+            statuses[index] = BatchStatus.CONFLICT
+        elif author_id not in rows:
+            statuses[index] = BatchStatus.NOT_FOUND
+        else:
+            items.append((index, author_id, values))
+    statuses.update(await _apply_updates(session, Author, AUTHOR_FIELDS, items, rows))
+    return [_outcome(index, change["id"], statuses[index]) for index, change in enumerate(changes)]
+
+
+async def delete_authors(session: AsyncSession, ids: Sequence[UUID]) -> List[Dict[str, Any]]:
+    deleted = set((await session.scalars(
+        delete(Author)
+        .where(Author.id == _ids(ids), ~exists().where(Book.author_id == Author.id))
+        .returning(Author.id)
+    )).all())
+    remaining = [author_id for author_id in ids if author_id not in deleted]
+    existing = set()
+    if remaining:
+        existing = set((await session.scalars(select(Author.id).where(Author.id == _ids(remaining)))).all())
+    return [
+        _outcome(index, author_id,
+                 BatchStatus.DELETED if author_id in deleted
+                 else BatchStatus.HAS_BOOKS if author_id in existing
+                 else BatchStatus.NOT_FOUND)
+        for index, author_id in enumerate(ids)
+    ]
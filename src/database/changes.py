@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import bisect
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from config import settings
+from src.database.database import async_engine, async_session
+from src.database.models import CHANGES_CHANNEL, CatalogueChange, PendingChange
+
+logger = logging.getLogger(__name__)
+
+# Held by the relay for its transaction, so feed order is assigned by one relay at a time.
+RELAY_LOCK_ID = 0x63686e67  # "chng"
+RELAYED_COLUMNS = ("entity", "entity_id", "op", "version", "changed_at")
+CHANGE_COLUMNS = [CatalogueChange.seq, CatalogueChange.entity, CatalogueChange.entity_id, CatalogueChange.op,
+                  CatalogueChange.version, CatalogueChange.changed_at]
+
+
+class ChangesExpired(Exception):
+    # The cursor points before the oldest retained event: the consumer has to resync.
+    pass
+
+
+async def relay_changes(session: AsyncSession) -> int:
+    # Moves the committed pending events into catalogue_change, assigning seq, and notifies
+    # CHANGES_CHANNEL with the latest one. Events still uncommitted are invisible here and get a
+    # larger seq from a later run, after everything relayed now. Returns the number of events
+    # moved, 0 if another relay is running. Does not commit; the lock is held until commit.
+    if not await session.scalar(select(func.pg_try_advisory_xact_lock(RELAY_LOCK_ID))):
+        return 0
+    moved = delete(PendingChange).returning(PendingChange.id, *(getattr(PendingChange, name)
+                                                                for name in RELAYED_COLUMNS)).cte("moved")
+    seqs = (await session.scalars(
+        insert(CatalogueChange)
+        .from_select(RELAYED_COLUMNS, select(*(moved.c[name] for name in RELAYED_COLUMNS)).order_by(moved.c.id))
+        .add_cte(moved)
+        .returning(CatalogueChange.seq)
+    )).all()
+    if seqs:
+        await session.execute(select(func.pg_notify(CHANGES_CHANNEL, str(max(seqs)))))
+    return len(seqs)
+
+
+async def read_changes(session: AsyncSession, after: int, limit: int) -> List[Dict[str, Any]]:
+    result = await session.execute(select(*CHANGE_COLUMNS).where(CatalogueChange.seq > after)
+                                   .order_by(CatalogueChange.seq).limit(limit))
+    return [dict(row) for row in result.mappings()]
+
+
+async def change_bounds(session: AsyncSession) -> Tuple[Optional[int], int]:
+    # Oldest retained and latest seq; the oldest is None when no events are retained.
+    row = (await session.execute(select(func.min(CatalogueChange.seq),
+                                        func.coalesce(func.max(CatalogueChange.seq), 0)))).one()
+    return row[0], row[1]
+
+
+def is_expired(oldest: Optional[int], after: int) -> bool:
+    return oldest is not None and after < oldest - 1
+
+
+async def purge_changes(session: AsyncSession) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.CHANGES_RETENTION)
+    result = await session.execute(delete(CatalogueChange).where(CatalogueChange.changed_at < cutoff))
+    return result.rowcount
+
+
+class ChangeFeed:
+    # One LISTEN connection per process fans catalogue changes out to every subscriber. On each
+    # notification (or every CHANGES_POLL_INTERVAL, in case one was missed while reconnecting)
+    # pending events are relayed, then new events are read once into a bounded in-memory buffer;
+    # subscribers wait on a condition and read from the buffer. Only cursors older than the
+    # buffer go to the database.
+
+    def __init__(self, engine: AsyncEngine, session_factory: async_sessionmaker[AsyncSession]):
+        self.engine = engine
+        self.session_factory = session_factory
+        self.latest: Optional[int] = None
+        self.recent: List[Dict[str, Any]] = []
+        self._changed = asyncio.Condition()
+        self._notified = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._started = asyncio.Event()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+        await self._started.wait()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._started.clear()
+
+    async def _listen(self) -> None:
+        dsn = self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                await connection.add_listener(CHANGES_CHANNEL, lambda *args: self._notified.set())
+                if self.latest is None:
+                    # New subscribers without a cursor start from here, after every committed event.
+                    async with self.session_factory() as session:
+                        await relay_changes(session)
+                        await session.commit()
+                        self.latest = await session.scalar(select(func.coalesce(func.max(CatalogueChange.seq), 0)))
+                self._started.set()
+                await self._fetch()
+                while not connection.is_closed():
+                    try:
+                        await asyncio.wait_for(self._notified.wait(), settings.CHANGES_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._notified.clear()
+                    await self._fetch()
+            except Exception:
+                logger.exception("Change feed listener failed, reconnecting")
+                await asyncio.sleep(settings.CHANGES_POLL_INTERVAL)
+            finally:
+                if connection is not None:
+                    await connection.close(timeout=1)
+
+    async def _fetch(self) -> None:
+        async with self.session_factory() as session:
+            await relay_changes(session)
+            await session.commit()
+            while events := await read_changes(session, self.latest, settings.MAX_PAGE_SIZE):
+                self.recent.extend(events)
+                self.latest = events[-1]["seq"]
+        if len(self.recent) > 2 * settings.CHANGES_BUFFER_SIZE:
+            del self.recent[:-settings.CHANGES_BUFFER_SIZE]
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def wait(self, after: int, timeout: float) -> bool:
+        # True once an event past the cursor is available, False on timeout.
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.latest > after), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def events_after(self, after: int, limit: int) -> List[Dict[str, Any]]:
+        if after >= self.latest:
+            return []
+        if self.recent and after >= self.recent[0]["seq"] - 1:
+            start = bisect.bisect_right(self.recent, after, key=lambda event: event["seq"])
+            return self.recent[start:start + limit]
+        async with self.session_factory() as session:
+            oldest, _ = await change_bounds(session)
+            if is_expired(oldest, after):
+                raise ChangesExpired()
+            return await read_changes(session, after, limit)
+
+
+change_feed = ChangeFeed(async_engine, async_session)
+
+
+def get_change_feed() -> ChangeFeed:
+    return change_feed
+
+
+async def main() -> int:
+    async with async_session() as session:
+        purged = await purge_changes(session)
+        await session.commit()
+    return purged
+
+
+if __name__ == '__main__':
+    argparse.ArgumentParser(description="Delete change feed events older than CHANGES_RETENTION").parse_args()
+    print(f"purged: {asyncio.run(main())}")
@@ -1,29 +1,59 @@
 import logging
-import traceback
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
-from src.database.models import Base
+from src.database.pool import TimedQueuePool
+from src.metrics.sql import instrument_engine
 from config import settings
 
 logger = logging.getLogger(__name__)
 
-async_engine: AsyncEngine = create_async_engine(
-    url=settings.DATABASE_URL,
-)
 
+def create_engine(url: str) -> AsyncEngine:
+    connect_args = {"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE}
+    if settings.DB_STATEMENT_TIMEOUT_MS is not None:
+        connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    engine = create_async_engine(
+        url=url,
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    instrument_engine(engine)
+    return engine
+
+
+async_engine: AsyncEngine = create_engine(settings.DATABASE_URL)
 async_session = async_sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
 
+# GET handlers read through the replica when one is configured, otherwise through the primary.
+async_replica_engine: Optional[AsyncEngine] = (
+    create_engine(settings.REPLICA_DATABASE_URL) if settings.REPLICA_DATABASE_URL else None
+)
+async_read_session = (
+    async_sessionmaker(async_replica_engine, expire_on_commit=False, class_=AsyncSession)
+    if async_replica_engine is not None else async_session
+)
+
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
 
 
-async def create_tables():
-    async with async_engine.begin() as connection:
-        try:
-            await connection.run_sync(Base.metadata.create_all)
-            await connection.commit()
-        except:
-            print(traceback.format_exc())
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_read_session() as session:
+        yield session
+
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    return async_session
+
+
+def get_read_session_factory() -> async_sessionmaker[AsyncSession]:
+    return async_read_session
+
@@ -0,0 +1,88 @@
+from collections import defaultdict
+from enum import Enum
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from src.database.author_names import author_names, resolve_author_titles
+from src.database.models import Author, Book
+
+BOOK_VALUES = ("title", "genre", "count", "description")
+
+
+class DeliveryStatus(str, Enum):
+    CREATED = "created"
+    RESTOCKED = "restocked"
+    REJECTED_UNKNOWN_AUTHOR = "rejected_unknown_author"
+
+
+def parse_uuid(value: Any) -> Optional[UUID]:
+    if isinstance(value, UUID):
+        return value
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+async def upsert_books(session: AsyncSession, books: Sequence[Dict[str, Any]],
+                       batch_size: int = settings.DELIVERY_BATCH_SIZE) -> List[Dict[str, Any]]:
+    # One outcome per input item; does not commit, the caller owns the transaction.
+    # Books may name their author by author_title instead of author_id: titles are resolved
+    # (and missing authors created) once per distinct title.
+    titles = {book["author_title"] for book in books if book.get("author_id") is None}
+    resolved = await resolve_author_titles(session, titles) if titles else {}
+    author_ids = [resolved[book["author_title"]] if book.get("author_id") is None else parse_uuid(book["author_id"])
+                  for book in books]
+
+    known_authors = set()
+    if set(author_ids) - {None}:
+        known_authors = set((await session.scalars(
+            select(Author.id).where(Author.id.in_(set(author_ids) - {None}))
+        )).all())
+    stale = {title for title, author_id in resolved.items() if author_id not in known_authors}
+    if stale:
+        # Cached ids of authors deleted since: look the titles up again.
+        author_names.forget_titles(stale)
+        resolved.update(await resolve_author_titles(session, stale))
+        known_authors.update(resolved[title] for title in stale)
+        author_ids = [resolved[book["author_title"]] if book.get("author_id") is None else author_id
+                      for book, author_id in zip(books, author_ids)]
+
+    outcomes = [{"status": DeliveryStatus.REJECTED_UNKNOWN_AUTHOR, "book_id": None,
+                 "author_id": book["author_id"] if author_id is None else author_id}
+                for book, author_id in zip(books, author_ids)]
+    # Repeated (author_id, title) pairs are merged up front: a single
+    # INSERT ... ON CONFLICT statement cannot touch the same row twice.
+    rows: Dict[Tuple[UUID, str], Dict[str, Any]] = {}
+    positions: Dict[Tuple[UUID, str], List[int]] = defaultdict(list)
+    for index, (book, author_id) in enumerate(zip(books, author_ids)):
+        if author_id not in known_authors:
+            continue
+        key = (author_id, book["title"])
+        if key in rows:
+            rows[key]["count"] += book["count"]
+        else:
+            rows[key] = {**{name: book[name] for name in BOOK_VALUES if name in book}, "id": uuid4(),
+                         "author_id": author_id}
+        positions[key].append(index)
+
+    # Rows go in key order so that concurrent deliveries lock the same books in the same order.
+    values = [rows[key] for key in sorted(rows)]
+    for start in range(0, len(values), batch_size):
+        stmt = insert(Book).values(values[start:start + batch_size])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_author_title",
+            set_={"count": Book.count + stmt.excluded.count},
+        ).returning(Book.id, Book.author_id, Book.title, literal_column("xmax = 0").label("inserted"))
+        for row in await session.execute(stmt):
+            first, *rest = positions[(row.author_id, row.title)]
+            outcomes[first] = {"status": DeliveryStatus.CREATED if row.inserted else DeliveryStatus.RESTOCKED,
+                               "book_id": row.id, "author_id": row.author_id}
+            for index in rest:
+                outcomes[index] = {"status": DeliveryStatus.RESTOCKED, "book_id": row.id, "author_id": row.author_id}
+    return outcomes
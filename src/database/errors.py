@@ -0,0 +1,10 @@
+from typing import Optional
+
+from sqlalchemy.exc import DBAPIError
+
+UNIQUE_VIOLATION = "23505"
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def sqlstate(exc: DBAPIError) -> Optional[str]:
+    return getattr(exc.orig, "sqlstate", None)
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Literal, Optional
+
+from sqlalchemy import CompoundSelect, Select, case, func, select, union_all
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import settings
+from src.database.models import Author, Book, BookGenre, CatalogueChange, PendingChange
+
+logger = logging.getLogger(__name__)
+
+ExportFormat = Literal["csv", "ndjson"]
+
+# Genres are exported by value, as the API and the importer spell them.
+GENRE_VALUE = case(*((Book.genre == genre, genre.value) for genre in BookGenre))
+
+COPY_OPTIONS = {
+    "csv": {"format": "csv", "header": True},
+    # One JSON document per line: row_to_json escapes control characters, so a CSV "column" with
+    # delimiter and quote characters that never occur in the text passes the JSON through as is.
+    "ndjson": {"format": "csv", "delimiter": "\x02", "quote": "\x01"},
+}
+
+
+def book_export_query(genre: Optional[BookGenre] = None, since: Optional[int] = None,
+                      author_title: bool = False) -> Select:
+    columns = [Book.id, Book.title, GENRE_VALUE.label("genre"), Book.count, Book.author_id, Book.description,
+               Book.version]
+    stmt = select(*columns)
+    if author_title:
+        stmt = stmt.join(Author, Author.id == Book.author_id).add_columns(Author.title.label("author_title"))
+    if genre is not None:
+        stmt = stmt.where(Book.genre == genre)
+    if since is not None:
+        stmt = stmt.where(Book.id.in_(changed_since("book", since)))
+    return stmt
+
+
+def author_export_query(since: Optional[int] = None) -> Select:
+    stmt = select(Author.id, Author.title, Author.version)
+    if since is not None:
+        stmt = stmt.where(Author.id.in_(changed_since("author", since)))
+    return stmt
+
+
+def changed_since(entity: str, since: int) -> CompoundSelect:
+    # Rows with a change feed event after the given seq; deletions are only in the feed itself.
+    # Events not relayed yet will get a larger seq than any cursor handed out so far.
+    return union_all(
+        select(CatalogueChange.entity_id).where(CatalogueChange.entity == entity, CatalogueChange.seq > since),
+        select(PendingChange.entity_id).where(PendingChange.entity == entity),
+    )
+
+
+def copy_query(stmt: Select, fmt: ExportFormat) -> str:
+    # Filters are typed values validated by the route, so they are rendered as literals:
+    # COPY does not take bind parameters.
+    if fmt == "ndjson":
+        rows = stmt.subquery("export")
+        stmt = select(func.row_to_json(rows.table_valued()).label("export")).select_from(rows)
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+async def copy_out(session_factory: async_sessionmaker[AsyncSession], stmt: Select,
+                   fmt: ExportFormat) -> AsyncIterator[bytes]:
+    # COPY ... TO STDOUT hands out chunks Postgres has already formatted, so no row passes through
+    # the ORM or a Python serializer. At most EXPORT_QUEUE_SIZE chunks are buffered: when the
+    # client reads slower, the queue blocks asyncpg, which stops reading the socket, which
+    # stalls Postgres - memory stays constant and throughput follows the network.
+    queue: asyncio.Queue = asyncio.Queue(settings.EXPORT_QUEUE_SIZE)
+    done = object()
+    async with session_factory() as session:
+        connection = await session.connection()
+        # A slow client must not run into the statement timeout meant for API queries.
+        await connection.exec_driver_sql("SET LOCAL statement_timeout = 0")
+        raw_connection = (await connection.get_raw_connection()).driver_connection
+
+        async def copy() -> None:
+            try:
+                await raw_connection.copy_from_query(copy_query(stmt, fmt), output=queue.put,
+                                                     **COPY_OPTIONS[fmt])
+            finally:
+                await queue.put(done)
+
+        task = asyncio.create_task(copy())
+        try:
+            while (chunk := await queue.get()) is not done:
+                yield bytes(chunk)
+            await task
+        finally:
+            if not task.done():
+                # The client went away mid-copy: the connection is in an unknown protocol state.
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await connection.invalidate()
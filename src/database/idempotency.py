@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from src.database.database import async_session
+from src.database.models import IdempotencyKey
+
+
+async def claim_key(session: AsyncSession, scope: str, key: str, request_hash: bytes) -> Optional[IdempotencyKey]:
+    # Returns None when this request owns the key and should run the write, or the live record
+    # of an earlier request. A concurrent request with the same key waits on the primary key
+    # until the first one commits (and then replays it) or rolls back (and then claims the key).
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.IDEMPOTENCY_TTL)
+    stmt = insert(IdempotencyKey).values(scope=scope, key=key, request_hash=request_hash, expires_at=expires_at)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.scope, IdempotencyKey.key],
+        set_={"request_hash": stmt.excluded.request_hash, "status_code": None, "response": None, "location": None,
+              "expires_at": stmt.excluded.expires_at},
+        where=IdempotencyKey.expires_at <= func.now(),
+    ).returning(IdempotencyKey.key)
+    if (await session.execute(stmt)).first() is not None:
+        return None
+    return (await session.execute(
+        select(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+    )).scalar_one()
+
+
+async def save_response(session: AsyncSession, scope: str, key: str, status_code: int, response: bytes,
+                        location: Optional[str] = None) -> None:
+    # Does not commit: the record must land in the same transaction as the write itself.
+    await session.execute(update(IdempotencyKey)
+                          .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+                          .values(status_code=status_code, response=response, location=location))
+
+
+async def purge_expired(session: AsyncSession) -> int:
+    result = await session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= func.now()))
+    return result.rowcount
+
+
+async def main() -> int:
+    async with async_session() as session:
+        purged = await purge_expired(session)
+        await session.commit()
+    return purged
+
+
+if __name__ == '__main__':
+    argparse.ArgumentParser(description="Delete expired idempotency keys").parse_args()
+    print(f"purged: {asyncio.run(main())}")
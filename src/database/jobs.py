@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from src.database.models import Job, JobStatus
+
+
+def lease_until() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=settings.JOB_LEASE)
+
+
+async def enqueue_job(session: AsyncSession, kind: str, payload: List[Any]) -> Job:
+    # Does not commit: the job is queued together with the caller's transaction (and idempotency key).
+    return await session.scalar(insert(Job).values(
+        kind=kind, status=JobStatus.QUEUED.value, payload=payload, total=len(payload), processed=0, result={},
+        failures=[], attempts=0).returning(Job))
+
+
+async def claim_job(session: AsyncSession, worker_id: UUID) -> Optional[Job]:
+    # The oldest queued job, or a running one whose worker let its lease expire. SKIP LOCKED lets
+    # concurrent workers pass over rows another worker is claiming instead of queueing behind it.
+    # Jobs that already used up their attempts are failed on the way. Does not commit.
+    while True:
+        job = (await session.execute(
+            select(Job)
+            .where(or_(Job.status == JobStatus.QUEUED.value,
+                       and_(Job.status == JobStatus.RUNNING.value, Job.locked_until < func.now())))
+            .order_by(Job.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )).scalar_one_or_none()
+        if job is None:
+            return None
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            await finish_job(session, job.id, JobStatus.FAILED, error="Job lease expired too many times")
+            continue
+        values = {"status": JobStatus.RUNNING.value, "locked_by": worker_id, "locked_until": lease_until(),
+                  "attempts": Job.attempts + 1, "started_at": func.coalesce(Job.started_at, func.now())}
+        return (await session.execute(
+            update(Job).where(Job.id == job.id).values(**values).returning(Job)
+            .execution_options(populate_existing=True)
+        )).scalar_one()
+
+
+async def lock_job(session: AsyncSession, job_id: UUID, worker_id: UUID) -> Optional[int]:
+    # Locks a claimed job for one chunk of work and returns how far it got, or None when the
+    # lease has been taken over by another worker.
+    return await session.scalar(select(Job.processed)
+                                .where(Job.id == job_id, Job.locked_by == worker_id)
+                                .with_for_update())
+
+
+async def save_progress(session: AsyncSession, job_id: UUID, processed: int, result: Dict[str, Any],
+                        failures: List[Dict[str, Any]]) -> None:
+    # Does not commit: progress must land in the same transaction as the chunk it covers.
+    await session.execute(update(Job).where(Job.id == job_id).values(
+        processed=processed, result=result, failures=failures, locked_until=lease_until()))
+
+
+async def finish_job(session: AsyncSession, job_id: UUID, status: JobStatus, error: Optional[str] = None) -> None:
+    await session.execute(update(Job).where(Job.id == job_id).values(
+        status=status.value, error=error, payload=None, locked_by=None, locked_until=None, finished_at=func.now()))
+
+
+async def release_job(session: AsyncSession, job_id: UUID, worker_id: UUID, error: str, retry: bool) -> None:
+    # After a failed chunk: back to the queue (committed chunks are not repeated), or failed for
+    # good once its attempts are used up. A job another worker has taken over is left alone.
+    values = {"status": JobStatus.QUEUED.value} if retry else \
+        {"status": JobStatus.FAILED.value, "payload": None, "finished_at": func.now()}
+    await session.execute(update(Job).where(Job.id == job_id, Job.locked_by == worker_id).values(
+        **values, error=error, locked_by=None, locked_until=None))
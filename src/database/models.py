@@ -1,14 +1,19 @@
 import logging
-from typing import Optional
-from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase
-from sqlalchemy import ForeignKey, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.orm import Mapped, mapped_column, relationship, DeclarativeBase
+from sqlalchemy import BigInteger, Computed, DDL, DateTime, ForeignKey, Identity, Index, LargeBinary, SmallInteger, \
+    String, UniqueConstraint, event, func, text
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR, UUID
 from uuid import uuid4
 
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+SEARCH_CONFIG = "russian"
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -39,13 +44,364 @@ class Book(Base):
     author_id: Mapped[UUID] = mapped_column(ForeignKey("author.id"), nullable=False)
     count: Mapped[int] = mapped_column()
     description: Mapped[Optional[str]] = mapped_column()
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{SEARCH_CONFIG}'::regconfig, title || ' ' || coalesce(description, ''))",
+                 persisted=True),
+        deferred=True,
+    )
+    # Bumped by the row_version trigger on every UPDATE, including bulk SQL ones. ORM flushes
+    # also check it (version_id_col), so a stale object fails instead of overwriting a newer row.
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # Related rows are only loaded explicitly (selectinload) so a forgotten option fails
+    # loudly instead of issuing one query per row.
+    author: Mapped["Author"] = relationship(back_populates="books", lazy="raise")
 
     __table_args__ = (
         UniqueConstraint('author_id', 'title', name='uq_author_title'),
+        Index('ix_book_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_book_genre', 'genre', 'id'),
+        Index('ix_book_author_id', 'author_id', 'id'),
     )
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
+
+Index('ix_book_count', Book.count.desc(), Book.id)
+
 
 class Author(Base):
     __tablename__ = 'author'
 
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
-    title: Mapped[str] = mapped_column(nullable=False, unique=True)
\ No newline at end of file
+    title: Mapped[str] = mapped_column(nullable=False, unique=True)
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{SEARCH_CONFIG}'::regconfig, title)", persisted=True),
+        deferred=True,
+    )
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # passive_deletes="all": deleting an author with books must fail on the foreign key,
+    # not load and orphan the books.
+    books: Mapped[List["Book"]] = relationship(back_populates="author", lazy="raise", passive_deletes="all")
+
+    __table_args__ = (
+        Index('ix_author_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
+
+# -------------------------- Idempotency keys --------------------------
+# One row per Idempotency-Key and endpoint, written in the same transaction as the write it
+# guards; the stored response is replayed to retries until expires_at.
+
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_key'
+
+    scope: Mapped[str] = mapped_column(String(64), primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    request_hash: Mapped[bytes] = mapped_column(LargeBinary)
+    status_code: Mapped[Optional[int]] = mapped_column(SmallInteger)
+    response: Mapped[Optional[bytes]] = mapped_column(LargeBinary)
+    # Replayed along with the body, e.g. the job URL of a queued delivery.
+    location: Mapped[Optional[str]] = mapped_column(String)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+
+
+# -------------------------- Background jobs --------------------------
+# Work too large for a request (big deliveries) is queued here and run by src.jobs workers,
+# which claim rows with FOR UPDATE SKIP LOCKED and hold them under a lease (locked_until) that
+# another worker may take over once it expires. Progress is committed together with each chunk
+# of work, so a job resumes after a crash without repeating committed chunks.
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job(Base):
+    __tablename__ = 'job'
+
+    id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    kind: Mapped[str] = mapped_column(String(32))
+    status: Mapped[str] = mapped_column(String(16), default=JobStatus.QUEUED.value)
+    # Cleared once the job has finished.
+    payload: Mapped[Optional[list]] = mapped_column(JSONB)
+    total: Mapped[int] = mapped_column()
+    processed: Mapped[int] = mapped_column(default=0)
+    # Counters and the first JOB_MAX_REPORTED_FAILURES rejected items, per job kind.
+    result: Mapped[dict] = mapped_column(JSONB, default=dict)
+    failures: Mapped[list] = mapped_column(JSONB, default=list)
+    error: Mapped[Optional[str]] = mapped_column()
+    attempts: Mapped[int] = mapped_column(default=0)
+    locked_by: Mapped[Optional[UUID]] = mapped_column(UUID(as_uuid=True))
+    locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index('ix_job_pending', 'created_at', postgresql_where=text("status IN ('queued', 'running')")),
+    )
+
+
+# -------------------------- Catalogue statistics --------------------------
+# Maintained by statement-level triggers on book (see BOOK_STATS_DDL), so they change in
+# the same transaction as the books themselves and bulk statements are applied in one step.
+# The triggers only queue each statement's deltas in book_stats_pending; a deferred trigger
+# adds up the whole transaction's deltas at commit and upserts them in key order. Every writer
+# thus locks stats rows once, in the same order, and only for the moment before its commit.
+
+class AuthorStats(Base):
+    __tablename__ = 'author_stats'
+
+    author_id: Mapped[UUID] = mapped_column(ForeignKey("author.id", ondelete="CASCADE"), primary_key=True)
+    books: Mapped[int] = mapped_column(BigInteger, default=0)
+    copies: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class AuthorGenreStats(Base):
+    __tablename__ = 'author_genre_stats'
+
+    author_id: Mapped[UUID] = mapped_column(ForeignKey("author.id", ondelete="CASCADE"), primary_key=True)
+    genre: Mapped[BookGenre] = mapped_column(primary_key=True)
+    books: Mapped[int] = mapped_column(BigInteger, default=0)
+    copies: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class GenreStats(Base):
+    __tablename__ = 'genre_stats'
+
+    genre: Mapped[BookGenre] = mapped_column(primary_key=True)
+    books: Mapped[int] = mapped_column(BigInteger, default=0)
+    copies: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class BookStatsPending(Base):
+    # Rows live only inside the transaction that wrote them: book_stats_flush deletes them
+    # before commit, so other transactions never see any.
+    __tablename__ = 'book_stats_pending'
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    author_ids: Mapped[List[UUID]] = mapped_column(ARRAY(UUID(as_uuid=True)))
+    genres: Mapped[List[str]] = mapped_column(ARRAY(String))
+    books: Mapped[List[int]] = mapped_column(ARRAY(BigInteger))
+    copies: Mapped[List[int]] = mapped_column(ARRAY(BigInteger))
+
+
+BOOK_STATS_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION book_stats_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        delta_authors uuid[];
+        delta_genres bookgenre[];
+        delta_books bigint[];
+        delta_copies bigint[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, count(*) AS n, sum(count) AS c
+                  FROM new_rows GROUP BY author_id, genre) d;
+        ELSIF TG_OP = 'DELETE' THEN
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, -count(*) AS n, -sum(count) AS c
+                  FROM old_rows GROUP BY author_id, genre) d;
+        ELSE
+            SELECT array_agg(author_id), array_agg(genre), array_agg(n), array_agg(c)
+            INTO delta_authors, delta_genres, delta_books, delta_copies
+            FROM (SELECT author_id, genre, sum(n) AS n, sum(c) AS c
+                  FROM (SELECT author_id, genre, 1 AS n, count AS c FROM new_rows
+                        UNION ALL
+                        SELECT author_id, genre, -1, -count FROM old_rows) r
+                  GROUP BY author_id, genre
+                  HAVING sum(n) <> 0 OR sum(c) <> 0) d;
+        END IF;
+        IF delta_authors IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        INSERT INTO book_stats_pending (author_ids, genres, books, copies)
+        VALUES (delta_authors, delta_genres::text[], delta_books, delta_copies);
+        RETURN NULL;
+    END;
+    $$
+    """,
+    """
+    CREATE TRIGGER book_stats_insert AFTER INSERT ON book
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_stats_apply()
+    """,
+    """
+    CREATE TRIGGER book_stats_update AFTER UPDATE ON book
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_stats_apply()
+    """,
+    """
+    CREATE TRIGGER book_stats_delete AFTER DELETE ON book
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION book_stats_apply()
+    """,
+]
+
+BOOK_STATS_FLUSH_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION book_stats_flush() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        delta_authors uuid[];
+        delta_genres bookgenre[];
+        delta_books bigint[];
+        delta_copies bigint[];
+    BEGIN
+        -- Fires once per queued statement; the first call applies them all, the rest find none.
+        WITH pending AS (
+            DELETE FROM book_stats_pending RETURNING *
+        )
+        SELECT array_agg(author_id ORDER BY author_id, genre), array_agg(genre ORDER BY author_id, genre),
+               array_agg(books ORDER BY author_id, genre), array_agg(copies ORDER BY author_id, genre)
+        INTO delta_authors, delta_genres, delta_books, delta_copies
+        FROM (SELECT c.author_id, c.genre::bookgenre AS genre, sum(c.books) AS books, sum(c.copies) AS copies
+              FROM pending
+              CROSS JOIN unnest(pending.author_ids, pending.genres, pending.books, pending.copies)
+                  AS c(author_id, genre, books, copies)
+              GROUP BY c.author_id, c.genre
+              HAVING sum(c.books) <> 0 OR sum(c.copies) <> 0) d;
+        IF delta_authors IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        -- Rows are upserted in key order, one table after another, so concurrent commits lock
+        -- them in the same order. Authors deleted in the same transaction have lost their
+        -- stats rows already, but their books still count towards genre_stats.
+        INSERT INTO author_genre_stats AS s (author_id, genre, books, copies)
+        SELECT * FROM unnest(delta_authors, delta_genres, delta_books, delta_copies)
+            AS c(author_id, genre, books, copies)
+        WHERE EXISTS (SELECT 1 FROM author WHERE author.id = c.author_id)
+        ORDER BY 1, 2
+        ON CONFLICT (author_id, genre)
+        DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies;
+        INSERT INTO author_stats AS s (author_id, books, copies)
+        SELECT author_id, sum(books), sum(copies)
+        FROM unnest(delta_authors, delta_books, delta_copies) AS c(author_id, books, copies)
+        WHERE EXISTS (SELECT 1 FROM author WHERE author.id = c.author_id)
+        GROUP BY author_id ORDER BY author_id
+        ON CONFLICT (author_id)
+        DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies;
+        INSERT INTO genre_stats AS s (genre, books, copies)
+        SELECT genre, sum(books), sum(copies)
+        FROM unnest(delta_genres, delta_books, delta_copies) AS c(genre, books, copies)
+        GROUP BY genre ORDER BY genre
+        ON CONFLICT (genre)
+        DO UPDATE SET books = s.books + EXCLUDED.books, copies = s.copies + EXCLUDED.copies;
+        RETURN NULL;
+    END;
+    $$
+    """,
+    """
+    CREATE CONSTRAINT TRIGGER book_stats_flush AFTER INSERT ON book_stats_pending
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION book_stats_flush()
+    """,
+]
+
+for statement in BOOK_STATS_DDL:
+    event.listen(Book.__table__, "after_create", DDL(statement))
+for statement in BOOK_STATS_FLUSH_DDL:
+    event.listen(BookStatsPending.__table__, "after_create", DDL(statement))
+
+
+# -------------------------- Row versions --------------------------
+# version / updated_at back the ETag and Last-Modified headers. A trigger (rather than an
+# ORM onupdate) keeps them right for the raw SQL writers too: stock, delivery, import.
+
+ROW_VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION row_version_bump() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    NEW.updated_at := now();
+    RETURN NEW;
+END;
+$$
+"""
+
+event.listen(Base.metadata, "before_create", DDL(ROW_VERSION_FUNCTION))
+for table in (Book.__table__, Author.__table__):
+    event.listen(table, "after_create", DDL(
+        f"CREATE TRIGGER {table.name}_row_version BEFORE UPDATE ON {table.name} "
+        f"FOR EACH ROW EXECUTE FUNCTION row_version_bump()"
+    ))
+
+
+# -------------------------- Change feed --------------------------
+# Every write to book or author queues one row per changed record in catalogue_change_pending
+# (the transactional outbox) and notifies CHANGES_CHANNEL, from statement-level triggers, so raw
+# SQL writers are covered as well. Writers take no shared lock: feed order is assigned by a
+# relay (src.database.changes.relay_changes), one at a time, which moves the committed pending
+# rows into catalogue_change. seq therefore grows in the order events become visible, and a
+# consumer reading "seq > cursor" never skips an event that committed late.
+
+CHANGES_CHANNEL = "catalogue_change"
+
+
+class CatalogueChange(Base):
+    __tablename__ = 'catalogue_change'
+
+    seq: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    entity: Mapped[str] = mapped_column(String(16))
+    entity_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True))
+    op: Mapped[str] = mapped_column(String(16))
+    version: Mapped[int] = mapped_column()
+    changed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class PendingChange(Base):
+    __tablename__ = 'catalogue_change_pending'
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    entity: Mapped[str] = mapped_column(String(16))
+    entity_id: Mapped[UUID] = mapped_column(UUID(as_uuid=True))
+    op: Mapped[str] = mapped_column(String(16))
+    version: Mapped[int] = mapped_column()
+    changed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+CATALOGUE_CHANGE_FUNCTIONS = [
+    f"""
+    CREATE OR REPLACE FUNCTION catalogue_change_record() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO catalogue_change_pending (entity, entity_id, op, version)
+            SELECT TG_TABLE_NAME, id, 'delete', version FROM old_rows ORDER BY id;
+        ELSE
+            INSERT INTO catalogue_change_pending (entity, entity_id, op, version)
+            SELECT TG_TABLE_NAME, id, lower(TG_OP), version FROM new_rows ORDER BY id;
+        END IF;
+        IF FOUND THEN
+            PERFORM pg_notify('{CHANGES_CHANNEL}', '');
+        END IF;
+        RETURN NULL;
+    END;
+    $$
+    """,
+]
+
+
+def catalogue_change_triggers(table: str) -> List[str]:
+    statements = []
+    for op, transition in (("INSERT", "NEW TABLE AS new_rows"), ("UPDATE", "NEW TABLE AS new_rows"),
+                           ("DELETE", "OLD TABLE AS old_rows")):
+        statements.append(f"CREATE TRIGGER {table}_change_{op.lower()} AFTER {op} ON {table} "
+                          f"REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION catalogue_change_record()")
+    return statements
+
+
+for statement in CATALOGUE_CHANGE_FUNCTIONS:
+    event.listen(Base.metadata, "before_create", DDL(statement))
+for table in (Book.__table__, Author.__table__):
+    for statement in catalogue_change_triggers(table.name):
+        event.listen(table, "after_create", DDL(statement))
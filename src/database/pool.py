@@ -0,0 +1,64 @@
+import time
+from typing import Any, Dict
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # Records how long checkouts wait for a free connection (including connect time) and how
+    # many are blocked on an exhausted pool right now; opening a new connection is not waiting.
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.waiting = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        blocked = self._max_overflow >= 0 and self.checkedout() >= self.size() + self._max_overflow
+        self.waiting += blocked
+        try:
+            return super()._do_get()
+        finally:
+            self.waiting -= blocked
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.checkouts, pool.wait_total, pool.wait_max = self.checkouts, self.wait_total, self.wait_max
+        return pool
+
+
+def pool_stats(engine: AsyncEngine) -> Dict[str, Any]:
+    pool = engine.pool
+    stats = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
+    if isinstance(pool, TimedQueuePool):
+        stats.update({
+            "checkouts": pool.checkouts,
+            "waiting": pool.waiting,
+            "wait_seconds_total": round(pool.wait_total, 6),
+            "wait_seconds_avg": round(pool.wait_total / pool.checkouts, 6) if pool.checkouts else 0.0,
+            "wait_seconds_max": round(pool.wait_max, 6),
+        })
+    return stats
+
+
+def pool_saturated(engine: AsyncEngine) -> bool:
+    # Every connection is checked out (or being opened) and no more may be opened.
+    pool = engine.pool
+    waiting = pool.waiting if isinstance(pool, TimedQueuePool) else 0
+    if waiting > 0:
+        return True
+    return pool._max_overflow >= 0 and pool.checkedout() >= pool.size() + pool._max_overflow
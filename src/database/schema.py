@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import os
+from contextlib import AsyncExitStack
+from typing import Optional, Set
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config import settings
+from src.database.models import Base
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                               "migrations")
+# Held by migrations/env.py while migrating and by every worker while checking or creating the
+# schema, so workers wait for a running migration instead of seeing it half applied.
+SCHEMA_LOCK_ID = 0x626f6f6b  # "book"
+
+
+class SchemaError(RuntimeError):
+    pass
+
+
+def migration_heads() -> Set[str]:
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_PATH)
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+async def current_revision(connection: AsyncConnection) -> Optional[str]:
+    if await connection.scalar(text("SELECT to_regclass('alembic_version')")) is None:
+        return None
+    return await connection.scalar(text("SELECT version_num FROM alembic_version"))
+
+
+async def has_extension(connection: AsyncConnection, name: str) -> bool:
+    return await connection.scalar(text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = :name)"),
+                                   {"name": name})
+
+
+async def ensure_schema(engine: AsyncEngine, create_all: bool = False) -> None:
+    # One cheap lookup of alembic_version per worker; create_all is for development only.
+    async with engine.begin() as connection:
+        await connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": SCHEMA_LOCK_ID})
+        # The migration skips pg_trgm where the server lacks it, so fuzzy search is switched off
+        # here instead of failing every search request.
+        if settings.SEARCH_FUZZY and not await has_extension(connection, "pg_trgm"):
+            logger.warning("pg_trgm is not installed: fuzzy search is disabled")
+            settings.SEARCH_FUZZY = False
+        if create_all:
+            await connection.run_sync(Base.metadata.create_all)
+            return
+        revision = await current_revision(connection)
+    heads = migration_heads()
+    if revision not in heads:
+        raise SchemaError(f"database schema is at revision {revision}, expected {', '.join(sorted(heads))}: "
+                          f"run 'alembic upgrade head' (or set DB_CREATE_ALL=true for development)")
+
+
+async def warm_up(engine: AsyncEngine, connections: int = settings.DB_POOL_WARMUP) -> None:
+    # Opens the connections at once so that they all stay in the pool for the first requests.
+    connections = min(connections, engine.pool.size())
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(*(stack.enter_async_context(engine.connect()) for _ in range(connections)))
+    logger.info("opened %d database connections", connections)
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.database import async_session
+
+# Each check compares a summary table with the same aggregate computed from book.
+CHECKS = {
+    "author_genre_stats": """
+        SELECT coalesce(a.author_id, s.author_id)::text || '/' || coalesce(a.genre, s.genre)::text AS key,
+               coalesce(a.books, 0) AS expected_books, coalesce(s.books, 0) AS actual_books,
+               coalesce(a.copies, 0) AS expected_copies, coalesce(s.copies, 0) AS actual_copies
+        FROM (SELECT author_id, genre, count(*) AS books, sum(count) AS copies
+              FROM book GROUP BY author_id, genre) a
+        FULL JOIN author_genre_stats s ON s.author_id = a.author_id AND s.genre = a.genre
+        WHERE coalesce(a.books, 0) <> coalesce(s.books, 0) OR coalesce(a.copies, 0) <> coalesce(s.copies, 0)
+    """,
+    "author_stats": """
+        SELECT coalesce(a.author_id, s.author_id)::text AS key,
+               coalesce(a.books, 0) AS expected_books, coalesce(s.books, 0) AS actual_books,
+               coalesce(a.copies, 0) AS expected_copies, coalesce(s.copies, 0) AS actual_copies
+        FROM (SELECT author_id, count(*) AS books, sum(count) AS copies FROM book GROUP BY author_id) a
+        FULL JOIN author_stats s ON s.author_id = a.author_id
+        WHERE coalesce(a.books, 0) <> coalesce(s.books, 0) OR coalesce(a.copies, 0) <> coalesce(s.copies, 0)
+    """,
+    "genre_stats": """
+        SELECT coalesce(a.genre, s.genre)::text AS key,
+               coalesce(a.books, 0) AS expected_books, coalesce(s.books, 0) AS actual_books,
+               coalesce(a.copies, 0) AS expected_copies, coalesce(s.copies, 0) AS actual_copies
+        FROM (SELECT genre, count(*) AS books, sum(count) AS copies FROM book GROUP BY genre) a
+        FULL JOIN genre_stats s ON s.genre = a.genre
+        WHERE coalesce(a.books, 0) <> coalesce(s.books, 0) OR coalesce(a.copies, 0) <> coalesce(s.copies, 0)
+    """,
+}
+
+REBUILD = [
+    "LOCK TABLE book IN SHARE MODE",
+    "DELETE FROM author_genre_stats",
+    "DELETE FROM author_stats",
+    "DELETE FROM genre_stats",
+    """
+    INSERT INTO author_genre_stats (author_id, genre, books, copies)
+    SELECT author_id, genre, count(*), sum(count) FROM book GROUP BY author_id, genre
+    """,
+    """
+    INSERT INTO author_stats (author_id, books, copies)
+    SELECT author_id, count(*), sum(count) FROM book GROUP BY author_id
+    """,
+    """
+    INSERT INTO genre_stats (genre, books, copies)
+    SELECT genre, count(*), sum(count) FROM book GROUP BY genre
+    """,
+]
+
+
+async def check_stats(session: AsyncSession) -> List[Dict[str, Any]]:
+    mismatches = []
+    for table, query in CHECKS.items():
+        for row in await session.execute(text(query)):
+            mismatches.append({"table": table, **row._asdict()})
+    return mismatches
+
+
+async def rebuild_stats(session: AsyncSession) -> None:
+    # Does not commit: the caller owns the transaction (and the SHARE lock on book).
+    for statement in REBUILD:
+        await session.execute(text(statement))
+
+
+async def main(repair: bool) -> List[Dict[str, Any]]:
+    async with async_session() as session:
+        mismatches = await check_stats(session)
+        if mismatches and repair:
+            await rebuild_stats(session)
+            await session.commit()
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare catalogue statistics with the book table")
+    parser.add_argument("--repair", action="store_true", help="rebuild the statistics if they differ")
+    args = parser.parse_args()
+    found = asyncio.run(main(args.repair))
+    print(json.dumps(found, ensure_ascii=False, indent=2))
+    raise SystemExit(1 if found and not args.repair else 0)
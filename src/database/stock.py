@@ -0,0 +1,55 @@
+from enum import Enum
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import BigInteger, bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import Book
+
+
+class StockStatus(str, Enum):
+    APPLIED = "applied"
+    NOT_FOUND = "not_found"
+    INSUFFICIENT_STOCK = "insufficient_stock"
+    OUT_OF_RANGE = "out_of_range"
+
+
+# book.count is an int4 column.
+MAX_COUNT = 2 ** 31 - 1
+
+
+async def adjust_stock(session: AsyncSession,
+                       deltas: Dict[UUID, int]) -> Dict[UUID, Tuple[StockStatus, Optional[int]]]:
+    # All changes are applied by one UPDATE ... FROM unnest(...) statement; the
+    # count never goes below zero or past MAX_COUNT, and zero deltas are not written at
+    # all. Does not commit: the caller owns the transaction.
+    changes = select(
+        func.unnest(bindparam("ids", list(deltas), type_=ARRAY(Book.id.type))).label("id"),
+        func.unnest(bindparam("deltas", list(deltas.values()), type_=ARRAY(BigInteger))).label("delta"),
+    ).subquery("changes")
+    result = await session.execute(
+        update(Book)
+        .where(Book.id == changes.c.id, changes.c.delta != 0,
+               (Book.count + changes.c.delta).between(0, MAX_COUNT))
+        .values(count=Book.count + changes.c.delta)
+        .returning(Book.id, Book.count)
+        .execution_options(synchronize_session=False)
+    )
+    outcomes = {row.id: (StockStatus.APPLIED, row.count) for row in result}
+
+    # Only skipped changes need a second look to tell a missing book from a short one.
+    rejected = [book_id for book_id in deltas if book_id not in outcomes]
+    if rejected:
+        for row in await session.execute(select(Book.id, Book.count).where(Book.id.in_(rejected))):
+            delta = deltas[row.id]
+            if delta == 0:
+                outcomes[row.id] = (StockStatus.APPLIED, row.count)
+            elif row.count + delta < 0:
+                outcomes[row.id] = (StockStatus.INSUFFICIENT_STOCK, row.count)
+            else:
+                outcomes[row.id] = (StockStatus.OUT_OF_RANGE, row.count)
+        for book_id in rejected:
+            outcomes.setdefault(book_id, (StockStatus.NOT_FOUND, None))
+    return outcomes
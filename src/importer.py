@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import sys
+from typing import Any, AsyncIterator, Callable, Dict, List, Literal, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from src.api.schemas.book import DeliveryBook
+from src.database.database import async_session
+from src.database.author_names import resolve_author_titles
+from src.database.delivery import parse_uuid
+
+logger = logging.getLogger(__name__)
+
+ImportFormat = Literal["csv", "ndjson"]
+STAGING_TABLE = "book_import"
+STAGING_COLUMNS = ["line", "title", "genre", "author_id", "count", "description"]
+READ_CHUNK_SIZE = 64 * 1024
+# Yielded as the record of a line that is not valid UTF-8.
+UNDECODABLE = object()
+
+CREATE_STAGING = f"""
+CREATE TEMP TABLE {STAGING_TABLE} (
+    line integer NOT NULL,
+    title text NOT NULL,
+    genre text NOT NULL,
+    author_id uuid NOT NULL,
+    count integer NOT NULL,
+    description text
+) ON COMMIT DROP
+"""
+
+UNKNOWN_AUTHOR_ROWS = f"""
+SELECT s.line, s.author_id, count(*) OVER () AS total FROM {STAGING_TABLE} s
+WHERE NOT EXISTS (SELECT 1 FROM author a WHERE a.id = s.author_id)
+ORDER BY s.line
+LIMIT :limit
+"""
+
+MERGE_STAGING = f"""
+WITH merged AS (
+    INSERT INTO book (id, title, genre, author_id, count, description)
+    SELECT gen_random_uuid(), s.title, min(s.genre)::bookgenre, s.author_id, sum(s.count), max(s.description)
+    FROM {STAGING_TABLE} s
+    JOIN author a ON a.id = s.author_id
+    GROUP BY s.author_id, s.title
+    ORDER BY s.author_id, s.title
+    ON CONFLICT ON CONSTRAINT uq_author_title DO UPDATE SET count = book.count + EXCLUDED.count
+    RETURNING xmax = 0 AS inserted
+)
+SELECT count(*) FILTER (WHERE inserted) AS created, count(*) FILTER (WHERE NOT inserted) AS restocked
+FROM merged
+"""
+
+
+def _decode(line: bytes) -> Optional[str]:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError:
+        return None
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    # None stands for a line that is not valid UTF-8.
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *complete, buffer = buffer.split(b"\n")
+        for line in complete:
+            yield _decode(line)
+    if buffer:
+        yield _decode(buffer)
+
+
+async def _csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    line_number = start = 0
+    async for line in _lines(chunks):
+        line_number += 1
+        if not pending:
+            start = line_number
+        if line is None:
+            # The record the line belongs to is rejected as a whole.
+            pending = []
+            yield start, UNDECODABLE
+            continue
+        pending.append(line)
+        # A quoted field may contain newlines: the record is complete once its quotes are balanced.
+        if sum(part.count('"') for part in pending) % 2:
+            continue
+        record = "\n".join(pending)
+        pending = []
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield start, {name: value or None for name, value in zip(header, values)}
+    if pending:
+        yield start, {}
+
+
+async def _ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    line_number = 0
+    async for line in _lines(chunks):
+        line_number += 1
+        if line is None:
+            yield line_number, UNDECODABLE
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def _error_detail(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors())
+
+
+async def import_books(session: AsyncSession, chunks: AsyncIterator[bytes], fmt: ImportFormat = "csv",
+                       on_progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, Any]:
+    # Rows are validated as they arrive and copied into a temporary staging table in
+    # IMPORT_BATCH_SIZE batches, so memory does not grow with the size of the input.
+    # Does not commit: the caller owns the transaction.
+    connection = await session.connection()
+    await connection.exec_driver_sql(CREATE_STAGING)
+    raw_connection = (await connection.get_raw_connection()).driver_connection
+
+    stats = {"rows": 0, "loaded": 0, "invalid": 0}
+    errors: List[Dict[str, Any]] = []
+
+    def report_error(line: int, detail: str) -> None:
+        if len(errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            errors.append({"line": line, "detail": detail})
+
+    # Authors named by title are resolved once per distinct title for the whole import.
+    author_ids: Dict[str, Any] = {}
+
+    async def flush(batch: List[tuple]) -> None:
+        titles = {row[3] for row in batch if isinstance(row[3], str)} - author_ids.keys()
+        if titles:
+            author_ids.update(await resolve_author_titles(session, titles))
+        batch[:] = [row if not isinstance(row[3], str) else (*row[:3], author_ids[row[3]], *row[4:])
+                    for row in batch]
+        await raw_connection.copy_records_to_table(STAGING_TABLE, records=batch, columns=STAGING_COLUMNS)
+        stats["loaded"] += len(batch)
+        batch.clear()
+        if on_progress is not None:
+            on_progress(dict(stats))
+
+    records = _csv_records(chunks) if fmt == "csv" else _ndjson_records(chunks)
+    batch: List[tuple] = []
+    async for line, record in records:
+        stats["rows"] += 1
+        if record is UNDECODABLE:
+            stats["invalid"] += 1
+            report_error(line, "line is not valid UTF-8")
+            continue
+        try:
+            book = DeliveryBook.model_validate(record)
+        except ValidationError as exc:
+            stats["invalid"] += 1
+            report_error(line, _error_detail(exc))
+            continue
+        # Until flush, a title stands in for the id it resolves to.
+        author_id = book.author_title if book.author_id is None else parse_uuid(book.author_id)
+        if author_id is None:
+            stats["invalid"] += 1
+            report_error(line, "author_id: Input should be a valid UUID")
+            continue
+        batch.append((line, book.title, book.genre.name, author_id, book.count, book.description))
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            await flush(batch)
+    if batch:
+        await flush(batch)
+
+    unknown_authors = 0
+    for row in await connection.execute(text(UNKNOWN_AUTHOR_ROWS), {"limit": settings.IMPORT_MAX_REPORTED_ERRORS}):
+        unknown_authors = row.total
+        report_error(row.line, f"author_id: author {row.author_id} not found")
+    merged = (await connection.execute(text(MERGE_STAGING))).one()
+
+    return {
+        **stats,
+        "created": merged.created,
+        "restocked": merged.restocked,
+        "rejected": stats["invalid"] + unknown_authors,
+        "errors": sorted(errors, key=lambda error: error["line"]),
+    }
+
+
+async def _read_file(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as file:
+        while chunk := await asyncio.to_thread(file.read, READ_CHUNK_SIZE):
+            yield chunk
+
+
+async def main(path: str, fmt: ImportFormat) -> Dict[str, Any]:
+    def progress(stats: Dict[str, int]) -> None:
+        print(f"rows: {stats['rows']}, loaded: {stats['loaded']}, invalid: {stats['invalid']}", file=sys.stderr)
+
+    async with async_session() as session:
+        result = await import_books(session, _read_file(path), fmt, on_progress=progress)
+        await session.commit()
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import a CSV or NDJSON book delivery")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None)
+    args = parser.parse_args()
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    print(json.dumps(asyncio.run(main(args.path, fmt)), ensure_ascii=False, indent=2))
@@ -0,0 +1,150 @@
+import argparse
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import settings
+from src.api.schemas.book import DeliveryBook
+from src.cache import Cache, author_books_count_key, book_key, get_cache
+from src.database.database import async_session
+from src.database.delivery import DeliveryStatus, upsert_books
+from src.database.jobs import claim_job, finish_job, lock_job, release_job, save_progress
+from src.database.models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_JOB = "delivery"
+
+# A handler runs one chunk of a job's payload inside the chunk's transaction and returns the
+# counters to add, the rejected items and the cache keys to drop after commit.
+ChunkResult = Tuple[Dict[str, int], List[Dict[str, Any]], Set[str]]
+JobHandler = Callable[[AsyncSession, List[Any], int], Awaitable[ChunkResult]]
+
+
+async def delivery_chunk(session: AsyncSession, items: List[Any], offset: int) -> ChunkResult:
+    books = [DeliveryBook.model_validate(item).model_dump() for item in items]
+    outcomes = await upsert_books(session, books)
+    totals = Counter(outcome["status"] for outcome in outcomes)
+    counts = {"created": totals[DeliveryStatus.CREATED], "restocked": totals[DeliveryStatus.RESTOCKED],
+              "rejected": totals[DeliveryStatus.REJECTED_UNKNOWN_AUTHOR]}
+    failures = [
+        {"index": offset + index, "title": book["title"], "author_id": str(outcome["author_id"]),
+         "status": outcome["status"].value}
+        for index, (book, outcome) in enumerate(zip(books, outcomes)) if outcome["book_id"] is None
+    ]
+    keys = {
+        key
+        for outcome in outcomes if outcome["book_id"] is not None
+        for key in (book_key(outcome["book_id"]), author_books_count_key(outcome["author_id"]))
+    }
+    return counts, failures, keys
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {DELIVERY_JOB: delivery_chunk}
+
+
+class JobWorker:
+    # JOB_WORKERS tasks per process claim queued jobs and run them in JOB_CHUNK_SIZE chunks, one
+    # transaction per chunk, so a job holds one pooled connection for a chunk at a time and the
+    # pool is shared fairly with request handlers. Enqueuing in this process wakes the workers
+    # at once; jobs queued elsewhere are picked up within JOB_POLL_INTERVAL.
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], concurrency: int = settings.JOB_WORKERS,
+                 cache: Optional[Cache] = None):
+        self.id = uuid4()
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.cache = cache or get_cache()
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        # A chunk cut short rolls back; the lease expires and the job resumes from its last commit.
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self) -> None:
+        await asyncio.gather(*self._tasks)
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                async with self.session_factory() as session:
+                    job = await claim_job(session, self.id)
+                    await session.commit()
+                if job is not None:
+                    await self.run(job)
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            except Exception:
+                logger.exception("Job worker failed")
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+
+    async def run(self, job: Job) -> None:
+        handler = JOB_HANDLERS[job.kind]
+        result = Counter(job.result)
+        failures = list(job.failures)
+        processed = job.processed
+        while True:
+            try:
+                async with self.session_factory() as session:
+                    processed = await lock_job(session, job.id, self.id)
+                    if processed is None:
+                        logger.warning("Job %s was taken over by another worker", job.id)
+                        return
+                    chunk = job.payload[processed:processed + settings.JOB_CHUNK_SIZE]
+                    counts, rejected, keys = await handler(session, chunk, processed)
+                    result.update(counts)
+                    failures.extend(rejected[:settings.JOB_MAX_REPORTED_FAILURES - len(failures)])
+                    processed += len(chunk)
+                    await save_progress(session, job.id, processed, dict(result), failures)
+                    if processed >= job.total:
+                        await finish_job(session, job.id, JobStatus.SUCCEEDED)
+                    await session.commit()
+            except Exception as exc:
+                logger.exception("Job %s failed at item %s", job.id, processed)
+                async with self.session_factory() as session:
+                    await release_job(session, job.id, self.id, repr(exc),
+                                      retry=job.attempts < settings.JOB_MAX_ATTEMPTS)
+                    await session.commit()
+                return
+            await self.cache.invalidate(*keys)
+            if processed >= job.total:
+                return
+
+
+job_worker = JobWorker(async_session)
+
+
+def get_job_worker() -> JobWorker:
+    return job_worker
+
+
+async def main(concurrency: int) -> None:
+    worker = JobWorker(async_session, concurrency)
+    worker.start()
+    await worker.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--concurrency", type=int, default=max(settings.JOB_WORKERS, 1))
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parser.parse_args().concurrency))
@@ -3,23 +3,54 @@ import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from src.api.admission import AdmissionMiddleware
 from src.api.routers.authors import router as author_router
 from src.api.routers.books import router as book_router
-from src.database.database import create_tables
+from src.api.routers.cache import router as cache_router
+from src.api.routers.changes import router as changes_router
+from src.api.routers.database import router as database_router
+from src.api.routers.health import router as health_router
+from src.api.routers.jobs import router as jobs_router
+from src.api.routers.metrics import router as metrics_router
+from src.database.changes import change_feed
+from src.database.database import async_engine, async_replica_engine
+from src.database.schema import ensure_schema, warm_up
+from src.jobs import job_worker
+from src.metrics.middleware import MetricsMiddleware
+from config import settings
 
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await create_tables()
+    await ensure_schema(async_engine, create_all=settings.DB_CREATE_ALL)
+    engines = [engine for engine in (async_engine, async_replica_engine) if engine is not None]
+    await asyncio.gather(*(warm_up(engine) for engine in engines))
+    # With JOB_WORKERS=0 jobs are left to separate `python -m src.jobs` processes.
+    job_worker.start()
+    # The feed also relays pending change events, so every process keeps the feed moving.
+    await change_feed.start()
     yield
+    await job_worker.stop()
+    await change_feed.stop()
+    for engine in engines:
+        await engine.dispose()
 app = FastAPI(title="Book Shop", lifespan=lifespan)
+# Added first, so it runs inside MetricsMiddleware and shed requests are still measured.
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(author_router)
 app.include_router(book_router)
+app.include_router(cache_router)
+app.include_router(changes_router)
+app.include_router(database_router)
+app.include_router(health_router)
+app.include_router(jobs_router)
+app.include_router(metrics_router)
 
 
 
 
 if __name__ == '__main__':
-    asyncio.run(create_tables())
+    asyncio.run(ensure_schema(async_engine, create_all=True))
@@ -0,0 +1,136 @@
+from collections import defaultdict
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from config import settings
+
+# Minimal in-process metrics rendered in the Prometheus text format (version 0.0.4).
+# Values live in this process only; with several workers every worker is scraped on its own.
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Labels, float] = defaultdict(float)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] += amount
+
+    def set_total(self, *labels: str, value: float) -> None:
+        # For totals kept elsewhere (e.g. pool counters), copied in at scrape time.
+        self.values[labels] = value
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, *labels: str, value: float) -> None:
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = ()):
+        super().__init__(name, documentation, labels)
+        self.buckets = sorted(buckets)
+        self.counts: Dict[Labels, List[int]] = {}
+        self.sums: Dict[Labels, float] = defaultdict(float)
+
+    def observe(self, *labels: str, value: float) -> None:
+        counts = self.counts.setdefault(labels, [0] * (len(self.buckets) + 1))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self.sums[labels] += value
+
+    def samples(self) -> Iterator[str]:
+        names = self.labels + ("le",)
+        for labels, counts in sorted(self.counts.items()):
+            total = 0
+            for bound, count in zip([*self.buckets, float("inf")], counts):
+                total += count
+                yield f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {total}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(self.sums[labels])}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {total}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"),
+    settings.METRICS_LATENCY_BUCKETS))
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request.", ("route",),
+    (1, 2, 3, 5, 10, 20, 50, 100)))
+db_time_per_request = registry.register(Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL statements per HTTP request.", ("route",),
+    settings.METRICS_LATENCY_BUCKETS))
+db_slow_queries = registry.register(Counter(
+    "db_slow_queries_total", "Statements slower than SLOW_QUERY_MS by fingerprint.", ("fingerprint",)))
+db_n_plus_one = registry.register(Counter(
+    "db_n_plus_one_total", "Requests that repeated one SELECT N_PLUS_ONE_THRESHOLD times or more.", ("route",)))
+db_pool_connections = registry.register(Gauge(
+    "db_pool_connections", "Connections in the pool by state.", ("engine", "state")))
+db_pool_wait = registry.register(Counter(
+    "db_pool_wait_seconds_total", "Time spent waiting for a pooled connection.", ("engine",)))
+admission_rejected = registry.register(Counter(
+    "admission_rejected_total", "Requests shed with 503 by admission control.", ("group", "reason")))
@@ -0,0 +1,55 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from src.metrics import db_n_plus_one, db_queries_per_request, db_time_per_request, http_request_duration, \
+    http_requests
+from src.metrics.sql import RequestStats, current_request
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware (no BaseHTTPMiddleware task per request). Latency is recorded per
+    # route template, so /api/books/{book_id} is one series rather than one per id.
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(f"{scope['method']} {scope['path']}")
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.SERVER_TIMING:
+                    MutableHeaders(scope=message).append("Server-Timing", server_timing(stats, started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            template = route.path if route is not None else "unmatched"
+            http_requests.inc(scope["method"], template, str(status_code))
+            http_request_duration.observe(scope["method"], template, value=elapsed)
+            db_queries_per_request.observe(template, value=stats.queries)
+            db_time_per_request.observe(template, value=stats.db_time)
+            if stats.n_plus_one_reported:
+                db_n_plus_one.inc(template)
+
+
+def server_timing(stats: RequestStats, started: float) -> str:
+    # Time to the first response byte; a streamed body keeps querying after this header is sent.
+    total = (time.perf_counter() - started) * 1000
+    return f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", app;dur={total:.1f}'
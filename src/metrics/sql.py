@@ -0,0 +1,83 @@
+import hashlib
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings
+from src.metrics import db_slow_queries
+
+logger = logging.getLogger(__name__)
+
+_NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                  # string literals
+    (re.compile(r"\$\d+(?:::[\w\[\]]+)?"), "?"),           # asyncpg parameters with casts
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),                # numbers, savepoint / anon suffixes
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?)"),     # expanded IN lists
+    (re.compile(r"\s+"), " "),
+]
+
+
+def normalize(statement: str) -> str:
+    for pattern, replacement in _NORMALIZE:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def fingerprint(statement: str) -> str:
+    # Statements that differ only in literals and parameters share a fingerprint.
+    return hashlib.md5(normalize(statement).encode()).hexdigest()[:12]
+
+
+class RequestStats:
+    # SQL activity of one HTTP request; set by MetricsMiddleware for the request's task.
+
+    def __init__(self, request: str = "request"):
+        self.request = request
+        self.queries = 0
+        self.db_time = 0.0
+        self.selects: Counter = Counter()
+        self.n_plus_one_reported = False
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.db_time += elapsed
+        if statement.lstrip()[:6].upper() != "SELECT":
+            return
+        key = fingerprint(statement)
+        self.selects[key] += 1
+        if self.selects[key] == settings.N_PLUS_ONE_THRESHOLD and not self.n_plus_one_reported:
+            self.n_plus_one_reported = True
+            logger.warning("possible N+1: %s ran %d times in one request [%s]: %s",
+                           self.request, self.selects[key], key, normalize(statement)[:500])
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    stats = current_request.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if settings.SLOW_QUERY_MS is not None and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        key = fingerprint(statement)
+        db_slow_queries.inc(key)
+        logger.warning("slow query %.1f ms [%s]: %s", elapsed * 1000, key, normalize(statement)[:1000])
+
+
+def instrument_engine(engine: AsyncEngine | Engine) -> None:
+    engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette import status
+
+from config import AdmissionLimit, settings
+from src.api import admission
+from src.api.admission import AdmissionGate, Overloaded
+from src.api.routers import health
+from src.database.pool import TimedQueuePool
+from src.main import app
+
+
+@pytest.mark.asyncio
+async def test_gate_bounds_queue_and_wait():
+    gate = AdmissionGate("read", AdmissionLimit(concurrency=1, queue=1, timeout=0.1))
+    await gate.acquire()
+    waiter = asyncio.create_task(gate.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded, match="queue_full"):
+        await gate.acquire()
+    with pytest.raises(Overloaded, match="deadline"):
+        await waiter
+    gate.release()
+    await gate.acquire()
+    assert gate.stats()["active"] == 1
+
+
+@pytest.mark.asyncio
+async def test_heavy_routes_are_shed_first(monkeypatch):
+    engine = create_async_engine(settings.TEST_DATABASE_URL, poolclass=TimedQueuePool, pool_size=1, max_overflow=0)
+    monkeypatch.setattr(admission, "async_engine", engine)
+    monkeypatch.setattr(health, "async_engine", engine)
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            assert (await ac.get("/health/live")).json() == {"status": "alive"}
+            ready = await ac.get("/health/ready")
+            assert ready.status_code == status.HTTP_200_OK
+            assert ready.json()["status"] == "ready"
+
+            # While every connection is taken, heavy routes fail fast; cheap reads still go through.
+            async with engine.connect():
+                for path in ("/api/books/export", "/api/books/?stream=true", "/api/authors/stat"):
+                    shed = await ac.get(path)
+                    assert shed.status_code == status.HTTP_503_SERVICE_UNAVAILABLE, path
+                    assert shed.headers["Retry-After"] == str(settings.ADMISSION_RETRY_AFTER)
+                assert (await ac.get("/api/books/", params={"limit": 1})).status_code == status.HTTP_200_OK
+                saturated = await ac.get("/health/ready")
+                assert saturated.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+                assert saturated.json()["status"] == "saturated"
+
+            # A group with no free slot and no queue rejects at once.
+            monkeypatch.setitem(admission.gates, "read",
+                                AdmissionGate("read", AdmissionLimit(concurrency=0, queue=0, timeout=1)))
+            assert (await ac.get("/api/books/", params={"limit": 1})).status_code == \
+                status.HTTP_503_SERVICE_UNAVAILABLE
+            assert (await ac.get("/health/ready")).json()["admission"]["read"]["concurrency"] == 0
+    finally:
+        await engine.dispose()
@@ -0,0 +1,62 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from src.database.author_names import AuthorNames, author_names
+from src.database.models import BookGenre
+from src.main import app
+
+
+@pytest.mark.asyncio
+async def test_delivery_and_import_resolve_authors_by_title():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        known_id = (await ac.post("/api/authors", json={"title": "Named Known"})).json()["id"]
+        delivery = [
+            {"title": "Named 1", "author_title": "Named Known", "genre": BookGenre.HORROR, "count": 1},
+            {"title": "Named 2", "author_title": "Named New", "genre": BookGenre.HORROR, "count": 1},
+            {"title": "Named 3", "author_title": "Named New", "genre": BookGenre.HORROR, "count": 2},
+            {"title": "Named 4", "genre": BookGenre.HORROR, "count": 1},
+        ]
+        assert (await ac.post("/api/books/delivery", json=delivery)).status_code == \
+            status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        response = await ac.post("/api/books/delivery", json=delivery[:3])
+        assert response.status_code == status.HTTP_200_OK
+        items = response.json()["items"]
+        assert items[0]["author_id"] == known_id
+        new_id = items[1]["author_id"]
+        assert items[2]["author_id"] == new_id and new_id != known_id
+        assert (await ac.get(f"/api/authors/{new_id}")).json()["title"] == "Named New"
+
+        # Authors found in the table are cached; the one created by the delivery is cached once read back.
+        assert str(author_names.get("Named Known")) == known_id
+        again = await ac.post("/api/books/delivery", json=delivery[1:2])
+        assert again.json()["items"][0]["status"] == "restocked"
+        assert str(author_names.get("Named New")) == new_id
+
+        payload = ("title,genre,count,author_title\n"
+                   f"Named 2,{BookGenre.HORROR.value},5,Named New\n"
+                   f"Named 5,{BookGenre.HORROR.value},1,Named Imported\n").encode()
+        imported = (await ac.post("/api/books/import", params={"format": "csv"}, content=payload)).json()
+        assert (imported["created"], imported["restocked"], imported["rejected"]) == (1, 1, 0)
+
+        # A deleted author is recreated by title instead of being served from the cache.
+        await ac.delete(f"/api/books/{items[0]['book_id']}")
+        await ac.delete(f"/api/authors/{known_id}")
+        assert author_names.get("Named Known") is None
+        recreated = (await ac.post("/api/books/delivery", json=delivery[:1])).json()["items"][0]
+        assert recreated["status"] == "created" and recreated["author_id"] != known_id
+
+
+def test_author_names_is_bounded_and_expires():
+    now = [0.0]
+    names = AuthorNames(max_size=2, ttl=10, clock=lambda: now[0])
+    names.remember("a", 1)
+    names.remember("b", 2)
+    names.get("a")
+    names.remember("c", 3)
+    assert (names.get("a"), names.get("b"), names.get("c")) == (1, None, 3)
+    names.forget(3)
+    assert names.get("c") is None
+    now[0] = 11
+    assert names.get("a") is None
@@ -0,0 +1,74 @@
+import uuid
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from src.database.models import BookGenre
+from src.main import app
+
+
+@pytest.mark.asyncio
+async def test_book_batch_crud_reports_per_item_outcomes():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Batch Author"})).json()["id"]
+        unknown = str(uuid.uuid4())
+
+        created = await ac.post("/api/books/batch", json=[
+            {"title": "Batch One", "author_id": author_id, "genre": BookGenre.CHILDREN, "count": 1},
+            {"title": "Batch Two", "author_id": author_id, "genre": BookGenre.CHILDREN, "count": 2},
+            {"title": "Batch One", "author_id": author_id, "genre": BookGenre.CHILDREN, "count": 3},
+            {"title": "Batch Three", "author_id": unknown, "genre": BookGenre.CHILDREN, "count": 1},
+        ])
+        assert created.status_code == status.HTTP_200_OK
+        assert [item["status"] for item in created.json()] == ["created", "created", "conflict", "unknown_author"]
+        first, second = created.json()[0]["id"], created.json()[1]["id"]
+
+        fetched = (await ac.post("/api/books/batch-get", json={"ids": [first, second, unknown]})).json()
+        assert {book["id"] for book in fetched["items"]} == {first, second}
+        assert fetched["missing"] == [unknown]
+
+        updated = await ac.put("/api/books/batch", json=[
+            {"id": first, "count": 10},
+            {"id": second, "title": "Batch One"},
+            {"id": unknown, "count": 1},
+            {"id": second, "author_id": unknown},
+        ])
+        assert [item["status"] for item in updated.json()] == ["updated", "conflict", "not_found", "unknown_author"]
+        assert (await ac.get(f"/api/books/{first}")).json()["count"] == 10
+        assert (await ac.get(f"/api/books/{second}")).json()["title"] == "Batch Two"
+
+        # Items that change nothing are not written: the version (ETag) stays the same.
+        etag = (await ac.get(f"/api/books/{first}")).headers["ETag"]
+        unchanged = await ac.put("/api/books/batch", json=[{"id": first}, {"id": first, "count": 10}])
+        assert [item["status"] for item in unchanged.json()] == ["updated", "updated"]
+        assert (await ac.get(f"/api/books/{first}")).headers["ETag"] == etag
+
+        deleted = await ac.post("/api/books/batch-delete", json={"ids": [first, unknown]})
+        assert [item["status"] for item in deleted.json()] == ["deleted", "not_found"]
+        assert (await ac.get(f"/api/books/{first}")).status_code == status.HTTP_404_NOT_FOUND
+        assert (await ac.get(f"/api/authors/{author_id}/stat")).json()["count"] == 1
+
+        too_many = await ac.post("/api/books/batch-get", json={"ids": [unknown] * 501})
+        assert too_many.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_author_batch_crud_reports_per_item_outcomes():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        created = await ac.post("/api/authors/batch", json=[{"title": "Batch A"}, {"title": "Batch B"},
+                                                            {"title": "Batch A"}])
+        assert [item["status"] for item in created.json()] == ["created", "created", "conflict"]
+        first, second = created.json()[0]["id"], created.json()[1]["id"]
+        await ac.post("/api/books", json={"title": "Kept", "author_id": second,
+                                          "genre": BookGenre.CHILDREN, "count": 1})
+
+        updated = await ac.put("/api/authors/batch", json=[{"id": first, "title": "Batch C"},
+                                                           {"id": second, "title": "Batch C"}])
+        assert [item["status"] for item in updated.json()] == ["updated", "conflict"]
+        fetched = (await ac.post("/api/authors/batch-get", json={"ids": [first, second]})).json()
+        assert sorted(author["title"] for author in fetched["items"]) == ["Batch B", "Batch C"]
+
+        missing = str(uuid.uuid4())
+        deleted = await ac.post("/api/authors/batch-delete", json={"ids": [first, second, missing]})
+        assert [item["status"] for item in deleted.json()] == ["deleted", "has_books", "not_found"]
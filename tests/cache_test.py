@@ -0,0 +1,88 @@
+import fnmatch
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from src.cache import Cache
+from src.cache.backends import MemoryBackend, RedisBackend
+from src.database.models import BookGenre
+from src.main import app
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, px=None):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def scan_iter(self, match):
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_lru_and_ttl():
+    now = [0.0]
+    backend = MemoryBackend(max_size=2, ttl=10, clock=lambda: now[0])
+    await backend.set("a", 1)
+    await backend.set("b", 2)
+    assert await backend.get("a") == 1
+    await backend.set("c", 3)
+    assert await backend.get("b") is None
+    assert backend.evictions == 1
+    now[0] = 11
+    assert await backend.get("a") is None
+    assert await backend.size() == 1
+
+
+@pytest.mark.asyncio
+async def test_read_through_with_redis_backend():
+    cache = Cache(RedisBackend(FakeRedis(), ttl=10))
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return {"count": 3}
+
+    assert await cache.get_or_load("author_books_count:1", load) == {"count": 3}
+    assert await cache.get_or_load("author_books_count:1", load) == {"count": 3}
+    assert len(loads) == 1
+    await cache.invalidate("author_books_count:1")
+    await cache.get_or_load("author_books_count:1", load)
+    assert len(loads) == 2
+    stats = await cache.stats()
+    assert (stats["backend"], stats["hits"], stats["misses"], stats["size"]) == ("redis", 1, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_cached_reads():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Cached Author"})).json()["id"]
+        book = {"title": "Cached Book", "author_id": author_id, "genre": BookGenre.ROMANCE, "count": 1}
+        book_id = (await ac.post("/api/books", json=book)).json()["id"]
+
+        before = (await ac.get("/api/cache/stats")).json()
+        assert (await ac.get(f"/api/books/{book_id}")).json()["count"] == 1
+        assert (await ac.get(f"/api/books/{book_id}")).json()["count"] == 1
+        assert (await ac.get(f"/api/authors/{author_id}/stat")).json() == {"count": 1}
+        after = (await ac.get("/api/cache/stats")).json()
+        assert after["hits"] - before["hits"] == 1
+        assert after["misses"] - before["misses"] == 2
+
+        await ac.post("/api/books/delivery", json=[{**book, "count": 4}, {**book, "title": "Cached Second"}])
+        assert (await ac.get(f"/api/books/{book_id}")).json()["count"] == 5
+        assert (await ac.get(f"/api/authors/{author_id}/stat")).json() == {"count": 2}
+
+        await ac.delete(f"/api/books/{book_id}")
+        assert (await ac.get(f"/api/books/{book_id}")).status_code == status.HTTP_404_NOT_FOUND
+        assert (await ac.get(f"/api/authors/{author_id}/stat")).json() == {"count": 1}
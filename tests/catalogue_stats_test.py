@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import delete, insert, text
+
+from src.database.models import Author, Book, BookGenre
+from src.database.stats import check_stats, rebuild_stats
+from src.main import app
+from tests.conftest import async_session_test
+
+
+@pytest.mark.asyncio
+async def test_statistics_follow_every_write_path():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Stats Author"})).json()["id"]
+        book = {"title": "Stats One", "author_id": author_id, "genre": BookGenre.FANTASY, "count": 2}
+        first_id = (await ac.post("/api/books", json=book)).json()["id"]
+        await ac.post("/api/books/delivery", json=[{**book, "count": 3},
+                                                   {**book, "title": "Stats Two", "genre": BookGenre.POETRY}])
+        await ac.post("/api/books/import", params={"format": "csv"},
+                      content=f"title,genre,count,author_id\nStats Three,{BookGenre.POETRY.value},4,{author_id}\n")
+        await ac.post(f"/api/books/{first_id}/stock", json={"delta": -1})
+        second_id = next(book["id"] for book in (await ac.get("/api/books", params={"author_id": author_id})).json()
+                         if book["title"] == "Stats Two")
+        await ac.delete(f"/api/books/{second_id}")
+
+        assert (await ac.get(f"/api/authors/{author_id}/stat")).json() == {"count": 2}
+        page = (await ac.get("/api/authors/stat", params={"limit": 500, "copies": True, "genres": True})).json()
+        assert next(item for item in page if item["author_id"] == author_id) == {
+            "author_id": author_id, "count": 2, "copies": 8,
+            "genres": {BookGenre.FANTASY: 1, BookGenre.POETRY: 1}}
+        genres = {item["genre"]: item for item in (await ac.get("/api/books/genres/stat")).json()}
+        assert genres[BookGenre.FANTASY]["books"] >= 1
+
+    async with async_session_test() as session:
+        assert await check_stats(session) == []
+        await session.execute(text("UPDATE genre_stats SET copies = copies + 100 WHERE genre = 'FANTASY'"))
+        assert [(item["table"], item["key"]) for item in await check_stats(session)] == [("genre_stats", "FANTASY")]
+        await rebuild_stats(session)
+        assert await check_stats(session) == []
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writers_touch_shared_stats_rows_in_any_order():
+    async with async_session_test() as session:
+        author_id = await session.scalar(insert(Author).values(title="Stats Concurrent").returning(Author.id))
+        await session.commit()
+
+    def book(title, genre):
+        return insert(Book).values(title=title, author_id=author_id, genre=genre, count=1)
+
+    # Each writer touches both genres' stats rows, in opposite orders; neither waits for the other
+    # before commit, and neither deadlocks.
+    first, second = async_session_test(), async_session_test()
+    async with first, second:
+        await asyncio.wait_for(first.execute(book("Stats C1", BookGenre.THRILLER)), 1)
+        await asyncio.wait_for(second.execute(book("Stats C2", BookGenre.ROMANCE)), 1)
+        await asyncio.wait_for(first.execute(book("Stats C3", BookGenre.ROMANCE)), 1)
+        await asyncio.wait_for(second.execute(book("Stats C4", BookGenre.THRILLER)), 1)
+        await asyncio.gather(first.commit(), second.commit())
+
+    async with async_session_test() as session:
+        assert await check_stats(session) == []
+
+
+@pytest.mark.asyncio
+async def test_deleting_an_author_with_their_books_keeps_genre_stats():
+    async with async_session_test() as session:
+        author_id = await session.scalar(insert(Author).values(title="Stats Deleted").returning(Author.id))
+        await session.execute(insert(Book).values(title="Stats D1", author_id=author_id,
+                                                  genre=BookGenre.HORROR, count=3))
+        await session.commit()
+
+    async with async_session_test() as session:
+        await session.execute(delete(Book).where(Book.author_id == author_id))
+        await session.execute(delete(Author).where(Author.id == author_id))
+        await session.commit()
+        assert await check_stats(session) == []
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import insert, select
+from starlette import status
+
+from src.database.changes import ChangeFeed, change_bounds, get_change_feed, read_changes, relay_changes
+from src.database.models import Author, BookGenre
+from src.main import app
+from tests.conftest import async_engine_test, async_session_test
+
+
+@pytest_asyncio.fixture
+async def feed():
+    feed = ChangeFeed(async_engine_test, async_session_test)
+    app.dependency_overrides[get_change_feed] = lambda: feed
+    yield feed
+    await feed.stop()
+    del app.dependency_overrides[get_change_feed]
+
+
+@pytest.mark.asyncio
+async def test_change_feed_long_poll_and_sse(feed):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        now = await ac.get("/api/changes", params={"timeout": 0})
+        assert now.json() == []
+        cursor = now.headers["X-Next-Cursor"]
+
+        # A waiting long-poll is woken by the NOTIFY of a write.
+        waiting = asyncio.create_task(ac.get("/api/changes", params={"cursor": cursor, "timeout": 10}))
+        await asyncio.sleep(0.2)
+        author_id = (await ac.post("/api/authors", json={"title": "Feed Author"})).json()["id"]
+        woken = await waiting
+        assert [(event["entity"], event["entity_id"], event["op"]) for event in woken.json()] == [
+            ("author", author_id, "insert")]
+
+        book = {"title": "Feed Book", "author_id": author_id, "genre": BookGenre.POETRY, "count": 1}
+        book_id = (await ac.post("/api/books", json=book)).json()["id"]
+        await ac.post("/api/books/delivery", json=[{**book, "count": 2}])
+        await ac.delete(f"/api/books/{book_id}")
+
+        events = (await ac.get("/api/changes", params={"cursor": cursor, "timeout": 5})).json()
+        while len(events) < 4:
+            await asyncio.sleep(0.05)
+            events = (await ac.get("/api/changes", params={"cursor": cursor, "timeout": 5})).json()
+        assert [(event["entity"], event["op"], event["version"]) for event in events] == [
+            ("author", "insert", 1), ("book", "insert", 1), ("book", "update", 2), ("book", "delete", 2)]
+        assert [event["seq"] for event in events] == sorted(event["seq"] for event in events)
+
+        page = await ac.get("/api/changes", params={"cursor": cursor, "limit": 2})
+        assert [event["seq"] for event in page.json()] == [event["seq"] for event in events[:2]]
+        assert page.headers["X-Next-Cursor"] == str(events[1]["seq"])
+
+        # SSE resumes from Last-Event-ID and ends after timeout.
+        stream = await ac.get("/api/changes", params={"timeout": 0.3},
+                              headers={"Accept": "text/event-stream", "Last-Event-ID": str(events[1]["seq"])})
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        ids = [line.split(": ")[1] for line in stream.text.splitlines() if line.startswith("id: ")]
+        assert ids == [str(event["seq"]) for event in events[2:]]
+        assert "event: book.delete" in stream.text
+
+        assert (await ac.get("/api/changes", params={"cursor": 0, "timeout": 0})).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_late_commits_are_not_skipped():
+    # Writers do not wait for each other; the event of the transaction that commits last gets
+    # the larger seq, so a cursor taken in between still sees it.
+    first, second = async_session_test(), async_session_test()
+    async with first, second, async_session_test() as relay:
+        await asyncio.wait_for(first.execute(insert(Author).values(title="Feed Late")), 1)
+        await asyncio.wait_for(second.execute(insert(Author).values(title="Feed Early")), 1)
+        await second.commit()
+        await relay_changes(relay)
+        await relay.commit()
+        _, cursor = await change_bounds(relay)
+        await first.commit()
+        await relay_changes(relay)
+        await relay.commit()
+        late = await relay.scalar(select(Author.id).where(Author.title == "Feed Late"))
+        assert [event["entity_id"] for event in await read_changes(relay, cursor, 10)] == [late]
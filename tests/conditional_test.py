@@ -0,0 +1,118 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from config import settings
+from src.database.models import BookGenre
+from src.main import app
+
+
+@pytest.mark.asyncio
+async def test_single_resources_revalidate_with_etag_and_last_modified(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_CACHE_CONTROL_ROUTES", {"get_book": "public, max-age=30"})
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Etag Author"})).json()["id"]
+        book_id = (await ac.post("/api/books", json={"title": "Etag Book", "author_id": author_id,
+                                                     "genre": BookGenre.HORROR, "count": 1})).json()["id"]
+
+        first = await ac.get(f"/api/books/{book_id}")
+        etag = first.headers["ETag"]
+        assert first.headers["Cache-Control"] == "public, max-age=30"
+        assert "version" not in first.json()
+
+        cached = await ac.get(f"/api/books/{book_id}", headers={"If-None-Match": etag})
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        assert cached.content == b""
+        assert cached.headers["ETag"] == etag
+        since = await ac.get(f"/api/books/{book_id}", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+        assert since.status_code == status.HTTP_304_NOT_MODIFIED
+
+        await ac.post(f"/api/books/{book_id}/stock", json={"delta": 1})
+        changed = await ac.get(f"/api/books/{book_id}", headers={"If-None-Match": etag})
+        assert changed.status_code == status.HTTP_200_OK
+        assert changed.headers["ETag"] != etag
+
+        expanded = await ac.get(f"/api/books/{book_id}", params={"expand": "author"})
+        await ac.put(f"/api/authors/{author_id}", json={"title": "Etag Author Renamed"})
+        stale = await ac.get(f"/api/books/{book_id}", params={"expand": "author"},
+                             headers={"If-None-Match": expanded.headers["ETag"]})
+        assert stale.status_code == status.HTTP_200_OK
+        assert stale.json()["author"]["title"] == "Etag Author Renamed"
+
+        author = await ac.get(f"/api/authors/{author_id}")
+        assert author.headers["Cache-Control"] == settings.HTTP_CACHE_CONTROL
+        assert (await ac.get(f"/api/authors/{author_id}", headers={"If-None-Match": author.headers["ETag"]})
+                ).status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.asyncio
+async def test_list_etag_follows_row_versions():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Etag List Author"})).json()["id"]
+        book_ids = [(await ac.post("/api/books", json={"title": f"Etag List {i}", "author_id": author_id,
+                                                       "genre": BookGenre.HORROR, "count": 1})).json()["id"]
+                    for i in range(3)]
+
+        for params in ({}, {"expand": "author"}, {"fields": "title"}):
+            params = {"author_id": author_id, **params}
+            page = await ac.get("/api/books", params=params)
+            etag = page.headers["ETag"]
+            assert (await ac.get("/api/books", params=params, headers={"If-None-Match": etag})
+                    ).status_code == status.HTTP_304_NOT_MODIFIED
+
+        etag = (await ac.get("/api/books", params={"author_id": author_id})).headers["ETag"]
+        await ac.put("/api/books/batch", json=[{"id": book_ids[1], "count": 5}])
+        changed = await ac.get("/api/books", params={"author_id": author_id}, headers={"If-None-Match": etag})
+        assert changed.status_code == status.HTTP_200_OK
+
+        for params in ({"limit": 500}, {"limit": 500, "expand": "books"}):
+            page = await ac.get("/api/authors", params=params)
+            assert (await ac.get("/api/authors", params=params, headers={"If-None-Match": page.headers["ETag"]})
+                    ).status_code == status.HTTP_304_NOT_MODIFIED
+        expanded = await ac.get("/api/authors", params={"limit": 500, "expand": "books"})
+        await ac.post("/api/books/batch-delete", json={"ids": [book_ids[0]]})
+        assert (await ac.get("/api/authors", params={"limit": 500, "expand": "books"},
+                             headers={"If-None-Match": expanded.headers["ETag"]})).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_if_match_guards_updates_and_deletes():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Match Author"})).json()["id"]
+        other_id = (await ac.post("/api/authors", json={"title": "Match Other"})).json()["id"]
+        book_id = (await ac.post("/api/books", json={"title": "Match Book", "author_id": author_id,
+                                                     "genre": BookGenre.HORROR, "count": 1})).json()["id"]
+        etag = (await ac.get(f"/api/books/{book_id}")).headers["ETag"]
+
+        updated = await ac.put(f"/api/books/{book_id}", json={"count": 4, "author_id": other_id},
+                               headers={"If-Match": etag})
+        assert updated.status_code == status.HTTP_200_OK
+        assert updated.json()["count"] == 4
+        assert updated.headers["ETag"] != etag
+        assert (await ac.get(f"/api/authors/{author_id}/stat")).json()["count"] == 0
+        assert (await ac.get(f"/api/authors/{other_id}/stat")).json()["count"] == 1
+
+        stale = await ac.put(f"/api/books/{book_id}", json={"count": 9}, headers={"If-Match": etag})
+        assert stale.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert (await ac.get(f"/api/books/{book_id}")).json()["count"] == 4
+        assert (await ac.put(f"/api/books/{book_id}", json={}, headers={"If-Match": updated.headers["ETag"]})
+                ).status_code == status.HTTP_200_OK
+        missing = "00000000-0000-4000-8000-000000000000"
+        assert (await ac.put(f"/api/books/{missing}", json={"count": 1}, headers={"If-Match": etag})
+                ).status_code == status.HTTP_404_NOT_FOUND
+
+        assert (await ac.delete(f"/api/books/{book_id}", headers={"If-Match": etag})
+                ).status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert (await ac.delete(f"/api/books/{book_id}", headers={"If-Match": updated.headers["ETag"]})
+                ).status_code == status.HTTP_200_OK
+
+        author_etag = (await ac.get(f"/api/authors/{author_id}")).headers["ETag"]
+        renamed = await ac.put(f"/api/authors/{author_id}", json={"title": "Match Renamed"},
+                               headers={"If-Match": author_etag})
+        assert renamed.json()["title"] == "Match Renamed"
+        assert (await ac.put(f"/api/authors/{author_id}", json={"title": "Match Lost"},
+                             headers={"If-Match": author_etag})).status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert (await ac.delete(f"/api/authors/{author_id}", headers={"If-Match": f'W/{renamed.headers["ETag"]}'})
+                ).status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert (await ac.delete(f"/api/authors/{author_id}", headers={"If-Match": renamed.headers["ETag"]})
+                ).status_code == status.HTTP_200_OK
@@ -9,12 +9,15 @@ from sqlalchemy.pool import NullPool
 from starlette.testclient import TestClient
 
 from src.main import app
-from src.database.database import get_async_session
+from src.database.database import get_async_session, get_read_session, get_session_factory, \
+    get_read_session_factory
 from src.database.models import Base
+from src.metrics.sql import instrument_engine
 from config import settings
 
 async_engine_test = create_async_engine(settings.TEST_DATABASE_URL, poolclass=NullPool)
 async_session_test = async_sessionmaker(async_engine_test, class_=AsyncSession, expire_on_commit=False)
+instrument_engine(async_engine_test)
 
 
 async def override_get_async_session() -> AsyncGenerator[AsyncSession, None]:
@@ -22,6 +25,9 @@ async def override_get_async_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 app.dependency_overrides[get_async_session] = override_get_async_session
+app.dependency_overrides[get_read_session] = override_get_async_session
+app.dependency_overrides[get_session_factory] = lambda: async_session_test
+app.dependency_overrides[get_read_session_factory] = lambda: async_session_test
 
 @pytest_asyncio.fixture(autouse=True, scope='session')
 async def prepare_database():
@@ -0,0 +1,40 @@
+import uuid
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from src.database.models import BookGenre
+from src.main import app
+
+
+@pytest.mark.asyncio
+async def test_delivery_reports_outcome_per_item():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Delivery Author"})).json()["id"]
+        existing = (await ac.post("/api/books", json={"title": "Delivered Old", "author_id": author_id,
+                                                      "genre": BookGenre.THRILLER, "count": 5})).json()
+
+        def item(title, count, author=author_id):
+            return {"title": title, "author_id": author, "genre": BookGenre.THRILLER, "count": count}
+
+        response = await ac.post("/api/books/delivery", json=[
+            item("Delivered Old", 2),
+            item("Delivered New", 3),
+            item("Delivered New", 4),
+            item("Orphan", 1, str(uuid.uuid4())),
+            item("Broken", 1, "not-a-uuid"),
+        ])
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        assert (body["created"], body["restocked"], body["rejected"]) == (1, 2, 2)
+        assert [entry["status"] for entry in body["items"]] == [
+            "restocked", "created", "restocked", "rejected_unknown_author", "rejected_unknown_author"]
+        assert body["items"][0]["book_id"] == existing["id"]
+        assert body["items"][1]["book_id"] == body["items"][2]["book_id"]
+        assert body["items"][3]["book_id"] is None
+
+        old = (await ac.get(f"/api/books/{existing['id']}")).json()
+        new = (await ac.get(f"/api/books/{body['items'][1]['book_id']}")).json()
+        assert old["count"] == 7
+        assert new["count"] == 7
@@ -0,0 +1,70 @@
+import json
+from contextlib import contextmanager
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from starlette import status
+
+from src.database.models import BookGenre
+from src.main import app
+from tests.conftest import async_engine_test
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine_test.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine_test.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.mark.asyncio
+async def test_expand_loads_related_rows_with_constant_queries():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_ids = [(await ac.post("/api/authors", json={"title": f"Expand Author {i}"})).json()["id"]
+                      for i in range(4)]
+        for i, author_id in enumerate(author_ids):
+            for j in range(3):
+                await ac.post("/api/books", json={"title": f"Expand Book {i}-{j}", "author_id": author_id,
+                                                  "genre": BookGenre.POETRY, "count": 1})
+
+        counts = {}
+        for limit in (2, 12):
+            with count_statements() as statements:
+                response = await ac.get("/api/books", params={"genre": BookGenre.POETRY.value, "limit": limit,
+                                                              "expand": "author"})
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.json()) == limit
+            assert all(book["author"]["id"] == book["author_id"] for book in response.json())
+            counts[limit] = len(statements)
+        assert counts[2] == counts[12] == 2
+
+        counts = {}
+        for limit in (1, 4):
+            with count_statements() as statements:
+                response = await ac.get("/api/authors", params={"limit": limit, "expand": "books"})
+            assert all(len(author["books"]) == 3 for author in response.json()
+                       if author["id"] in author_ids)
+            counts[limit] = len(statements)
+        assert counts[1] == counts[4] == 2
+
+        book = (await ac.get("/api/books", params={"author_id": author_ids[0], "limit": 1})).json()[0]
+        expanded = (await ac.get(f"/api/books/{book['id']}", params={"expand": "author"})).json()
+        assert expanded == {**book, "author": {"id": author_ids[0], "title": "Expand Author 0"}}
+        assert "author" not in (await ac.get(f"/api/books/{book['id']}")).json()
+
+        author = (await ac.get(f"/api/authors/{author_ids[1]}", params={"expand": "books"})).json()
+        assert sorted(book["title"] for book in author["books"]) == [f"Expand Book 1-{j}" for j in range(3)]
+
+        streamed = await ac.get("/api/books", params={"author_id": author_ids[2], "stream": True, "expand": "author"})
+        assert [json.loads(line)["author"]["title"] for line in streamed.text.splitlines()] == ["Expand Author 2"] * 3
+
+        rejected = await ac.get("/api/books", params={"fields": "title", "expand": "author"})
+        assert rejected.status_code == status.HTTP_400_BAD_REQUEST
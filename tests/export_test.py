@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from src.database.changes import relay_changes
+from src.database.models import BookGenre
+from src.main import app
+from tests.conftest import async_session_test
+
+
+async def relay():
+    # The change feed relays pending events in the running app; the test client has no lifespan.
+    async with async_session_test() as session:
+        await relay_changes(session)
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_export_streams_copy_output():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author = (await ac.post("/api/authors", json={"title": "Export Author"})).json()
+        books = [{"title": f"Export Book {i}", "author_id": author["id"], "genre": BookGenre.CLASSICS, "count": i + 1,
+                  "description": 'with "quotes",\ncommas and \\ backslashes' if i == 0 else None} for i in range(3)]
+        ids = [(await ac.post("/api/books", json=book)).json()["id"] for book in books]
+
+        await relay()
+        exported = await ac.get("/api/books/export", params={"genre": BookGenre.CLASSICS.value})
+        assert exported.status_code == status.HTTP_200_OK
+        assert exported.headers["content-type"].startswith("text/csv")
+        rows = {row["id"]: row for row in csv.DictReader(io.StringIO(exported.text))}
+        assert set(rows) == set(ids)
+        assert rows[ids[0]]["genre"] == BookGenre.CLASSICS.value
+        assert rows[ids[0]]["description"] == books[0]["description"]
+        assert rows[ids[2]]["count"] == "3"
+        cursor = exported.headers["X-Next-Cursor"]
+
+        ndjson = await ac.get("/api/books/export", params={"format": "ndjson", "author_title": True,
+                                                           "genre": BookGenre.CLASSICS.value})
+        lines = {line["id"]: line for line in map(json.loads, ndjson.text.splitlines())}
+        assert lines[ids[0]]["description"] == books[0]["description"]
+        assert lines[ids[1]]["author_title"] == "Export Author"
+
+        # since exports only what changed after the cursor of the previous export.
+        await ac.put(f"/api/books/{ids[1]}", json={"count": 10})
+        changed = await ac.get("/api/books/export", params={"format": "ndjson", "since": cursor})
+        assert [(line["id"], line["count"], line["version"]) for line in map(json.loads, changed.text.splitlines())] \
+            == [(ids[1], 10, 2)]
+        # Same rows whether or not the change has been relayed into the feed yet.
+        await relay()
+        relayed = await ac.get("/api/books/export", params={"format": "ndjson", "since": cursor})
+        assert relayed.text == changed.text
+        authors = await ac.get("/api/authors/export", params={"since": cursor})
+        assert authors.text.splitlines() == ["id,title,version"]
@@ -0,0 +1,43 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from src.database.models import BookGenre
+from src.main import app
+from tests.pagination_test import collect_pages
+
+
+@pytest.mark.asyncio
+async def test_books_filters_sorting_and_fields():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Filter Author"})).json()["id"]
+        ids = {}
+        for title, genre, count in [("Filter A", BookGenre.MYSTERY, 5),
+                                    ("Filter B", BookGenre.MYSTERY, 9),
+                                    ("Filter C", BookGenre.MYSTERY, 5),
+                                    ("Filter D", BookGenre.HISTORICAL, 7)]:
+            ids[title] = (await ac.post("/api/books", json={"title": title, "author_id": author_id,
+                                                            "genre": genre, "count": count})).json()["id"]
+        await ac.post(f"/api/books/{ids['Filter D']}/stock", json={"delta": -7})
+
+        mystery = await collect_pages(ac, "/api/books", {"limit": 1, "author_id": author_id,
+                                                         "genre": BookGenre.MYSTERY.value, "order_by": "count"})
+        assert [book["title"] for book in mystery][0] == "Filter B"
+        assert sorted(book["title"] for book in mystery[1:]) == ["Filter A", "Filter C"]
+        assert [book["count"] for book in mystery] == [9, 5, 5]
+
+        out_of_stock = (await ac.get("/api/books", params={"author_id": author_id, "in_stock": False})).json()
+        assert [book["title"] for book in out_of_stock] == ["Filter D"]
+        ranged = (await ac.get("/api/books", params={"author_id": author_id, "min_count": 6, "max_count": 9})).json()
+        assert [book["title"] for book in ranged] == ["Filter B"]
+
+        sparse = await collect_pages(ac, "/api/books", {"limit": 2, "author_id": author_id, "order_by": "count",
+                                                        "fields": "title,count"})
+        assert [set(book) for book in sparse] == [{"id", "title", "count"}] * 4
+        assert [book["count"] for book in sparse] == [9, 5, 5, 0]
+
+        streamed = await ac.get("/api/books", params={"author_id": author_id, "fields": "genre", "stream": True})
+        assert len(streamed.text.splitlines()) == 4
+
+        unknown = await ac.get("/api/books", params={"fields": "title,price"})
+        assert unknown.status_code == status.HTTP_400_BAD_REQUEST
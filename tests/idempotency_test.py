@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from starlette import status
+
+from src.database.models import BookGenre
+from src.main import app
+from tests.conftest import async_session_test
+
+
+@pytest.mark.asyncio
+async def test_retried_writes_are_replayed_not_repeated():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author = await ac.post("/api/authors", json={"title": "Idempotent Author"},
+                               headers={"Idempotency-Key": "author-1"})
+        replayed_author = await ac.post("/api/authors", json={"title": "Idempotent Author"},
+                                        headers={"Idempotency-Key": "author-1"})
+        assert replayed_author.status_code == status.HTTP_200_OK
+        assert replayed_author.json() == author.json()
+        assert replayed_author.headers["Idempotent-Replayed"] == "true"
+        author_id = author.json()["id"]
+
+        book = {"title": "Idempotent Book", "author_id": author_id, "genre": BookGenre.POETRY, "count": 2}
+        created = await ac.post("/api/books", json=book, headers={"Idempotency-Key": "book-1"})
+        assert (await ac.post("/api/books", json=book, headers={"Idempotency-Key": "book-1"})).json() == created.json()
+
+        # Concurrent retries of one delivery restock the book once.
+        delivery = [{**book, "count": 5}]
+        responses = await asyncio.gather(*(ac.post("/api/books/delivery", json=delivery,
+                                                   headers={"Idempotency-Key": "delivery-1"}) for _ in range(3)))
+        assert len({response.content for response in responses}) == 1
+        assert responses[0].json()["restocked"] == 1
+        assert (await ac.get(f"/api/books/{created.json()['id']}")).json()["count"] == 7
+
+        # Without a key the write runs again; the same key with another body is rejected.
+        await ac.post("/api/books/delivery", json=delivery)
+        assert (await ac.get(f"/api/books/{created.json()['id']}")).json()["count"] == 12
+        reused = await ac.post("/api/books/delivery", json=[{**book, "count": 1}],
+                               headers={"Idempotency-Key": "delivery-1"})
+        assert reused.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        # Expired keys are claimed again by the next request.
+        async with async_session_test() as session:
+            await session.execute(text("UPDATE idempotency_key SET expires_at = now() WHERE key = 'delivery-1'"))
+            await session.commit()
+        again = await ac.post("/api/books/delivery", json=delivery, headers={"Idempotency-Key": "delivery-1"})
+        assert "Idempotent-Replayed" not in again.headers
+        assert (await ac.get(f"/api/books/{created.json()['id']}")).json()["count"] == 17
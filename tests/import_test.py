@@ -0,0 +1,63 @@
+import json
+import uuid
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from src.database.models import BookGenre
+from src.main import app
+
+
+async def chunked(payload: bytes, size: int = 7):
+    for start in range(0, len(payload), size):
+        yield payload[start:start + size]
+
+
+@pytest.mark.asyncio
+async def test_import_csv_stream():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Import Author"})).json()["id"]
+        existing = (await ac.post("/api/books", json={"title": "Imported Old", "author_id": author_id,
+                                                      "genre": BookGenre.POETRY, "count": 1})).json()
+        payload = (
+            "title,genre,count,author_id,description\n"
+            f"Imported Old,{BookGenre.POETRY.value},4,{author_id},\n"
+            f"Imported New,{BookGenre.HORROR.value},2,{author_id},\"multi\nline\"\n"
+            f"Imported New,{BookGenre.HORROR.value},3,{author_id},\n"
+            f"Bad Count,{BookGenre.HORROR.value},-1,{author_id},\n"
+            f"Orphan,{BookGenre.HORROR.value},1,{uuid.uuid4()},\n"
+        ).encode()
+        response = await ac.post("/api/books/import", params={"format": "csv"}, content=chunked(payload))
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        assert {key: body[key] for key in ("rows", "loaded", "invalid", "created", "restocked", "rejected")} == {
+            "rows": 5, "loaded": 4, "invalid": 1, "created": 1, "restocked": 1, "rejected": 2}
+        assert [error["line"] for error in body["errors"]] == [6, 7]
+
+        assert (await ac.get(f"/api/books/{existing['id']}")).json()["count"] == 5
+        books = [json.loads(line) for line in (await ac.get("/api/books", params={"stream": True})).text.splitlines()]
+        new = next(book for book in books if book["title"] == "Imported New")
+        assert (new["count"], new["description"]) == (5, "multi\nline")
+
+
+@pytest.mark.asyncio
+async def test_import_ndjson_reports_malformed_lines():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Import NDJSON Author"})).json()["id"]
+        payload = "\n".join([
+            json.dumps({"title": "Imported Line", "genre": BookGenre.FICTION, "count": 2, "author_id": author_id}),
+            "{not json",
+            json.dumps({"title": "No Genre", "count": 2, "author_id": author_id}),
+        ]).encode() + b"\n{\"title\": \"\xff\"}"
+        response = await ac.post("/api/books/import", params={"format": "ndjson"}, content=chunked(payload))
+        body = response.json()
+        assert (body["created"], body["invalid"]) == (1, 3)
+        assert [error["line"] for error in body["errors"]] == [2, 3, 4]
+        assert body["errors"][2]["detail"] == "line is not valid UTF-8"
+
+        csv_payload = f"title,genre,count,author_id\nBad ,{BookGenre.FICTION.value},1,{author_id}\n".encode() \
+            .replace(b"Bad ", b"Bad \xff")
+        response = await ac.post("/api/books/import", params={"format": "csv"}, content=csv_payload)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["errors"] == [{"line": 2, "detail": "line is not valid UTF-8"}]
@@ -0,0 +1,102 @@
+import asyncio
+import uuid
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import update
+from starlette import status
+
+from config import settings
+from src.database.jobs import claim_job, enqueue_job, lock_job
+from src.database.models import BookGenre, Job
+from src.jobs import JobWorker, get_job_worker
+from src.main import app
+from tests.conftest import async_session_test
+
+
+@pytest_asyncio.fixture
+async def worker():
+    worker = JobWorker(async_session_test, concurrency=2)
+    app.dependency_overrides[get_job_worker] = lambda: worker
+    worker.start()
+    yield worker
+    await worker.stop()
+    del app.dependency_overrides[get_job_worker]
+
+
+async def wait_for_job(ac: AsyncClient, location: str) -> dict:
+    for _ in range(100):
+        job = (await ac.get(location)).json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"job did not finish: {job}")
+
+
+@pytest.mark.asyncio
+async def test_large_delivery_runs_as_background_job(worker, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "DELIVERY_BACKGROUND_THRESHOLD", 3)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Job Author"})).json()["id"]
+        existing = (await ac.post("/api/books", json={"title": "Job Book 0", "author_id": author_id,
+                                                      "genre": BookGenre.FANTASY, "count": 1})).json()
+        delivery = [{"title": f"Job Book {i}", "author_id": author_id, "genre": BookGenre.FANTASY, "count": 2}
+                    for i in range(4)]
+        delivery.insert(2, {"title": "Orphan", "author_id": str(uuid.uuid4()), "genre": BookGenre.FANTASY,
+                            "count": 1})
+
+        accepted = await ac.post("/api/books/delivery", json=delivery, headers={"Idempotency-Key": "job-1"})
+        assert accepted.status_code == status.HTTP_202_ACCEPTED
+        assert accepted.json()["status"] == "queued"
+        replayed = await ac.post("/api/books/delivery", json=delivery, headers={"Idempotency-Key": "job-1"})
+        assert replayed.status_code == status.HTTP_202_ACCEPTED
+        assert replayed.json()["id"] == accepted.json()["id"]
+        assert replayed.headers["Location"] == accepted.headers["Location"]
+
+        job = await wait_for_job(ac, accepted.headers["Location"])
+        assert job["status"] == "succeeded"
+        assert (job["total"], job["processed"], job["attempts"]) == (5, 5, 1)
+        assert job["result"] == {"created": 3, "restocked": 1, "rejected": 1}
+        assert [(failure["index"], failure["status"]) for failure in job["failures"]] == [
+            (2, "rejected_unknown_author")]
+        assert (await ac.get(f"/api/books/{existing['id']}")).json()["count"] == 3
+
+        # Small deliveries still run in the request unless asked otherwise.
+        small = await ac.post("/api/books/delivery", json=delivery[:1])
+        assert small.status_code == status.HTTP_200_OK
+        queued = await ac.post("/api/books/delivery", json=delivery[:1], params={"background": True})
+        assert (await wait_for_job(ac, queued.headers["Location"]))["result"] == {
+            "created": 0, "restocked": 1, "rejected": 0}
+        assert (await ac.get(f"/api/books/{existing['id']}")).json()["count"] == 7
+
+        assert (await ac.get(f"/api/jobs/{uuid.uuid4()}")).status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_claims_skip_locked_jobs_and_expired_leases_move():
+    async with async_session_test() as session:
+        first = (await enqueue_job(session, "delivery", [])).id
+        second = (await enqueue_job(session, "delivery", [])).id
+        await session.commit()
+
+    worker_a, worker_b = uuid.uuid4(), uuid.uuid4()
+    async with async_session_test() as session_a, async_session_test() as session_b:
+        # While one claim is open, a concurrent one skips the locked row instead of waiting on it.
+        claimed_a = await claim_job(session_a, worker_a)
+        claimed_b = await claim_job(session_b, worker_b)
+        assert {claimed_a.id, claimed_b.id} == {first, second}
+        await session_a.commit()
+        await session_b.commit()
+
+    async with async_session_test() as session:
+        await session.execute(update(Job).where(Job.id == claimed_a.id).values(locked_until=Job.created_at))
+        await session.commit()
+        taken_over = await claim_job(session, worker_b)
+        await session.commit()
+        assert (taken_over.id, taken_over.attempts) == (claimed_a.id, 2)
+        assert await lock_job(session, claimed_a.id, worker_a) is None
+        assert await lock_job(session, claimed_a.id, worker_b) == 0
+        await session.execute(update(Job).where(Job.id.in_([first, second])).values(status="succeeded"))
+        await session.commit()
@@ -0,0 +1,62 @@
+import logging
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from config import settings
+from src.database.models import BookGenre
+from src.main import app
+from src.metrics import Histogram
+from src.metrics.sql import RequestStats, fingerprint
+
+
+def test_fingerprints_and_n_plus_one_detection(caplog):
+    assert fingerprint("SELECT * FROM book WHERE id = $1::UUID") == \
+        fingerprint("SELECT *  FROM book\nWHERE id = $7::UUID")
+    assert fingerprint("SELECT 1 WHERE x IN ($1, $2, $3)") == fingerprint("SELECT 2 WHERE x IN ($1)")
+    assert fingerprint("SELECT * FROM book") != fingerprint("SELECT * FROM author")
+
+    stats = RequestStats("GET /api/things")
+    with caplog.at_level(logging.WARNING):
+        for i in range(settings.N_PLUS_ONE_THRESHOLD):
+            stats.record(f"SELECT title FROM author WHERE id = ${i + 1}::UUID", 0.001)
+            stats.record("UPDATE book SET count = $1::INTEGER", 0.001)
+    assert stats.queries == 2 * settings.N_PLUS_ONE_THRESHOLD
+    assert stats.n_plus_one_reported
+    assert [record.message.startswith("possible N+1: GET /api/things") for record in caplog.records] == [True]
+
+    histogram = Histogram("latency", "test", ("route",), (0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe("/x", value=value)
+    assert histogram.render().splitlines()[2:] == [
+        'latency_bucket{route="/x",le="0.1"} 1',
+        'latency_bucket{route="/x",le="1"} 2',
+        'latency_bucket{route="/x",le="+Inf"} 3',
+        'latency_sum{route="/x"} 5.55',
+        'latency_count{route="/x"} 3',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_and_server_timing(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SERVER_TIMING", True)
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Metrics Author"})).json()["id"]
+        book_id = (await ac.post("/api/books", json={"title": "Metrics Book", "author_id": author_id,
+                                                     "genre": BookGenre.FANTASY, "count": 1})).json()["id"]
+        with caplog.at_level(logging.WARNING):
+            response = await ac.get(f"/api/books/{book_id}", params={"expand": "author"})
+        assert response.headers["Server-Timing"].startswith("db;dur=")
+        assert any(record.message.startswith("slow query") for record in caplog.records)
+
+        metrics = await ac.get("/metrics")
+        assert metrics.status_code == status.HTTP_200_OK
+        assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'http_requests_total{method="GET",route="/api/books/{book_id}",status="200"}' in metrics.text
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/api/books/{book_id}",le="+Inf"}' \
+            in metrics.text
+        assert 'db_queries_per_request_count{route="/api/books/"}' in metrics.text
+        assert "db_slow_queries_total{fingerprint=" in metrics.text
+        assert 'db_pool_connections{engine="primary",state="checked_out"}' in metrics.text
@@ -0,0 +1,55 @@
+import base64
+import json
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from src.database.models import BookGenre
+from src.main import app
+
+
+async def collect_pages(ac: AsyncClient, url: str, params: dict) -> list:
+    items = []
+    while True:
+        response = await ac.get(url, params=params)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) <= params["limit"]
+        items.extend(response.json())
+        if "X-Next-Cursor" not in response.headers:
+            return items
+        params = {**params, "cursor": response.headers["X-Next-Cursor"]}
+
+
+@pytest.mark.asyncio
+async def test_books_keyset_pagination_and_stream():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Paged Author"})).json()["id"]
+        for title in ["Paged C", "Paged A", "Paged B"]:
+            await ac.post("/api/books", json={"title": title, "author_id": author_id,
+                                              "genre": BookGenre.CLASSICS, "count": 1})
+
+        by_id = await collect_pages(ac, "/api/books", {"limit": 2})
+        assert [book["id"] for book in by_id] == sorted(book["id"] for book in by_id)
+
+        by_title = await collect_pages(ac, "/api/books", {"limit": 2, "order_by": "title"})
+        titles = [book["title"] for book in by_title]
+        assert titles == sorted(titles)
+        assert {"Paged A", "Paged B", "Paged C"} <= set(titles)
+
+        streamed = await ac.get("/api/books", params={"stream": True, "order_by": "title"})
+        assert streamed.headers["content-type"] == "application/x-ndjson"
+        assert [json.loads(line) for line in streamed.text.splitlines()] == by_title
+
+        authors = await collect_pages(ac, "/api/authors", {"limit": 1, "order_by": "title"})
+        assert author_id in {author["id"] for author in authors}
+
+        mismatched = await ac.get("/api/books", params={"order_by": "title",
+                                                        "cursor": (await ac.get("/api/books", params={"limit": 1})).headers["X-Next-Cursor"]})
+        assert mismatched.status_code == status.HTTP_400_BAD_REQUEST
+        for values in ([None], [{}], [1]):
+            forged = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            for url in ("/api/books", "/api/authors/stat"):
+                assert (await ac.get(url, params={"cursor": forged})).json() == {"detail": "Invalid cursor"}, url
+        too_large = await ac.get("/api/books", params={"limit": 10_000})
+        assert too_large.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
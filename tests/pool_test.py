@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event, text
+from starlette import status
+
+from config import settings
+from src.database.database import create_engine
+from src.database.pool import pool_saturated, pool_stats
+from src.main import app
+
+
+@pytest.mark.asyncio
+async def test_tuned_engine_reports_pool_stats():
+    engine = create_engine(settings.TEST_DATABASE_URL)
+    try:
+        async with engine.connect() as connection:
+            assert (await connection.execute(text("SELECT 1"))).scalar() == 1
+            stats = pool_stats(engine)
+            assert stats["size"] == settings.DB_POOL_SIZE
+            assert stats["checked_out"] == 1
+            assert stats["checkouts"] == 1
+        assert pool_stats(engine)["checked_out"] == 0
+    finally:
+        await engine.dispose()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        response = await ac.get("/api/database/pool")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["replica"] is None
+        assert response.json()["primary"]["max_overflow"] == settings.DB_MAX_OVERFLOW
+
+
+@pytest.mark.asyncio
+async def test_only_checkouts_blocked_on_a_full_pool_count_as_waiting(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+    engine = create_engine(settings.TEST_DATABASE_URL)
+    opening = []
+    event.listen(engine.sync_engine, "connect", lambda *args: opening.append(engine.pool.waiting))
+    try:
+        async with engine.connect():
+            assert opening == [0]
+            assert pool_saturated(engine)
+            blocked = asyncio.create_task(engine.connect().start())
+            await asyncio.sleep(0.1)
+            assert engine.pool.waiting == 1
+        await (await blocked).close()
+        assert engine.pool.waiting == 0
+        assert not pool_saturated(engine)
+    finally:
+        await engine.dispose()
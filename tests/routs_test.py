@@ -45,3 +45,50 @@ async def test_create_delete_book_and_author():
         assert delete_book_response.json() == {"detail": "Book deleted"}
         assert delete_author_response.status_code == status.HTTP_200_OK
         assert delete_author_response.json() == {"detail": "Author deleted"}
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_outcomes():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Outcome Author"})).json()["id"]
+        other_id = (await ac.post("/api/authors", json={"title": "Outcome Other"})).json()["id"]
+        book = {"author_id": author_id, "genre": BookGenre.FANTASY, "count": 1}
+        book_id = (await ac.post("/api/books", json={**book, "title": "Outcome One"})).json()["id"]
+        await ac.post("/api/books", json={**book, "title": "Outcome Two"})
+        missing = "00000000-0000-4000-8000-000000000000"
+        created_twice = await ac.post("/api/books", json={**book, "title": "Outcome Two"})
+        assert (created_twice.status_code, created_twice.json()["detail"]) == \
+            (status.HTTP_400_BAD_REQUEST, "Book already exists")
+        for unknown_author in (missing, "not-a-uuid"):
+            orphan = await ac.post("/api/books", json={**book, "title": "Outcome Orphan", "author_id": unknown_author})
+            assert (orphan.status_code, orphan.json()["detail"]) == (status.HTTP_400_BAD_REQUEST, "Author not found")
+
+        updated = await ac.put(f"/api/books/{book_id}", json={"count": 3, "author_id": other_id})
+        assert updated.status_code == status.HTTP_200_OK
+        assert (updated.json()["count"], updated.json()["author_id"]) == (3, other_id)
+        assert (await ac.get(f"/api/authors/{other_id}/stat")).json()["count"] == 1
+        assert (await ac.put(f"/api/books/{missing}", json={"count": 3})).status_code == status.HTTP_404_NOT_FOUND
+        duplicate = await ac.put(f"/api/books/{book_id}", json={"title": "Outcome Two", "author_id": author_id})
+        assert (duplicate.status_code, duplicate.json()["detail"]) == (status.HTTP_400_BAD_REQUEST, "Book already exists")
+        for unknown_author in (missing, "not-a-uuid"):
+            orphan = await ac.put(f"/api/books/{book_id}", json={"author_id": unknown_author})
+            assert (orphan.status_code, orphan.json()["detail"]) == (status.HTTP_400_BAD_REQUEST, "Author not found")
+        for field in ("title", "genre", "count", "author_id"):
+            cleared = await ac.put(f"/api/books/{book_id}", json={field: None})
+            assert cleared.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert (await ac.put("/api/books/batch", json=[{"id": book_id, "count": None}])
+                ).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert (await ac.put(f"/api/books/{book_id}", json={"description": None})).status_code == status.HTTP_200_OK
+
+        renamed = await ac.put(f"/api/authors/{other_id}", json={"title": "Outcome Renamed"})
+        assert renamed.json()["title"] == "Outcome Renamed"
+        assert (await ac.put(f"/api/authors/{missing}", json={"title": "Nobody"})
+                ).status_code == status.HTTP_404_NOT_FOUND
+        assert (await ac.put(f"/api/authors/{other_id}", json={"title": "Outcome Author"})
+                ).status_code == status.HTTP_400_BAD_REQUEST
+
+        assert (await ac.delete(f"/api/authors/{other_id}")).status_code == status.HTTP_403_FORBIDDEN
+        assert (await ac.delete(f"/api/books/{book_id}")).status_code == status.HTTP_200_OK
+        assert (await ac.delete(f"/api/books/{book_id}")).status_code == status.HTTP_404_NOT_FOUND
+        assert (await ac.delete(f"/api/authors/{other_id}")).status_code == status.HTTP_200_OK
+        assert (await ac.delete(f"/api/authors/{other_id}")).status_code == status.HTTP_404_NOT_FOUND
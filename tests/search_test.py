@@ -0,0 +1,59 @@
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from starlette import status
+
+from config import settings
+from src.database.models import BookGenre
+from src.main import app
+from tests.conftest import async_engine_test
+
+
+@pytest_asyncio.fixture
+async def fuzzy_search(monkeypatch):
+    # Trigram matching needs pg_trgm; without it only the full-text part is exercised.
+    try:
+        async with async_engine_test.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        available = True
+    except DBAPIError:
+        available = False
+    monkeypatch.setattr(settings, "SEARCH_FUZZY", available)
+    return available
+
+
+@pytest.mark.asyncio
+async def test_search_books(fuzzy_search):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Лев Толстой"})).json()["id"]
+        for title, genre, description in [
+            ("Война и мир", BookGenre.CLASSICS, "Роман-эпопея о войне 1812 года"),
+            ("Анна Каренина", BookGenre.CLASSICS, "Роман о любви"),
+            ("Детство", BookGenre.BIOGRAPHY, None),
+        ]:
+            await ac.post("/api/books", json={"title": title, "author_id": author_id, "genre": genre,
+                                              "count": 1, "description": description})
+
+        by_title = (await ac.get("/api/books/search", params={"q": "войн"})).json()
+        assert by_title[0]["title"] == "Война и мир"
+        assert by_title[0]["score"] > 0
+
+        by_description = (await ac.get("/api/books/search", params={"q": "любви"})).json()
+        assert [book["title"] for book in by_description] == ["Анна Каренина"]
+
+        by_author = await ac.get("/api/books/search",
+                                 params={"q": "Толстой", "genre": BookGenre.CLASSICS.value, "limit": 1})
+        assert by_author.status_code == status.HTTP_200_OK
+        rest = await ac.get("/api/books/search", params={"q": "Толстой", "genre": BookGenre.CLASSICS.value,
+                                                         "cursor": by_author.headers["X-Next-Cursor"]})
+        titles = {book["title"] for book in by_author.json() + rest.json()}
+        assert titles == {"Война и мир", "Анна Каренина"}
+
+        expanded = (await ac.get("/api/books/search", params={"q": "любви", "expand": "author"})).json()
+        assert expanded[0]["author"] == {"id": author_id, "title": "Лев Толстой"}
+
+        if fuzzy_search:
+            typo = (await ac.get("/api/books/search", params={"q": "Карнина"})).json()
+            assert typo[0]["title"] == "Анна Каренина"
@@ -0,0 +1,43 @@
+from typing import List
+
+import pytest
+from fastapi.responses import JSONResponse
+from httpx import AsyncClient, ASGITransport
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from src.api.schemas.author import AuthorCreateResponse
+from src.api.schemas.book import BookCreateResponse
+from src.database.models import Author, Book, BookGenre
+from src.main import app
+from tests.conftest import async_session_test
+
+
+def model_path(model, rows) -> bytes:
+    # What response_model=List[model] produces for ORM rows.
+    adapter = TypeAdapter(List[model])
+    return JSONResponse(adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")).body
+
+
+@pytest.mark.asyncio
+async def test_list_fast_path_matches_response_model_output():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Сериализация"})).json()["id"]
+        for i, description in enumerate([None, "Описание \"в кавычках\"\n", ""]):
+            await ac.post("/api/books", json={"title": f"Быстрый путь {i}", "author_id": author_id,
+                                              "genre": BookGenre.SCIENCE_FICTION, "count": i + 1,
+                                              "description": description})
+
+        async with async_session_test() as session:
+            books = (await session.scalars(select(Book).where(Book.author_id == author_id).order_by(Book.id))).all()
+            authors = (await session.scalars(select(Author).order_by(Author.id).limit(500))).all()
+
+        page = await ac.get("/api/books", params={"author_id": author_id})
+        assert page.headers["content-type"] == "application/json"
+        assert page.content == model_path(BookCreateResponse, books)
+        assert (await ac.get("/api/authors", params={"limit": 500})).content == model_path(AuthorCreateResponse,
+                                                                                             authors)
+
+        sparse = await ac.get("/api/books", params={"author_id": author_id, "fields": "title", "order_by": "count"})
+        assert sparse.json() == [{"id": str(book.id), "title": book.title}
+                                 for book in sorted(books, key=lambda book: (-book.count, book.id))]
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import text
+
+from config import settings
+from src.database.database import create_engine
+from src.database.schema import SchemaError, ensure_schema, has_extension, migration_heads, warm_up
+from tests.conftest import async_engine_test
+
+
+@pytest.mark.asyncio
+async def test_schema_check_requires_migration_head():
+    with pytest.raises(SchemaError, match="alembic upgrade head"):
+        await ensure_schema(async_engine_test)
+
+    head, = migration_heads()
+    async with async_engine_test.begin() as connection:
+        await connection.execute(text("CREATE TABLE alembic_version (version_num varchar(32) PRIMARY KEY)"))
+        await connection.execute(text("INSERT INTO alembic_version VALUES ('5b7e0c3d9a16')"))
+    try:
+        with pytest.raises(SchemaError, match="5b7e0c3d9a16"):
+            await ensure_schema(async_engine_test)
+        async with async_engine_test.begin() as connection:
+            await connection.execute(text("UPDATE alembic_version SET version_num = :head"), {"head": head})
+        await ensure_schema(async_engine_test)
+        await ensure_schema(async_engine_test, create_all=True)
+    finally:
+        async with async_engine_test.begin() as connection:
+            await connection.execute(text("DROP TABLE alembic_version"))
+
+
+@pytest.mark.asyncio
+async def test_fuzzy_search_follows_pg_trgm(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_FUZZY", True)
+    async with async_engine_test.connect() as connection:
+        available = await has_extension(connection, "pg_trgm")
+    await ensure_schema(async_engine_test, create_all=True)
+    assert settings.SEARCH_FUZZY is available
+
+
+@pytest.mark.asyncio
+async def test_warm_up_fills_the_pool():
+    engine = create_engine(settings.TEST_DATABASE_URL)
+    try:
+        await warm_up(engine, 3)
+        assert engine.pool.checkedin() == 3
+        await warm_up(engine, settings.DB_POOL_SIZE + 5)
+        assert engine.pool.checkedin() == settings.DB_POOL_SIZE
+    finally:
+        await engine.dispose()
@@ -0,0 +1,40 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from src.database.models import BookGenre
+from src.main import app
+
+
+@pytest.mark.asyncio
+async def test_all_authors_books_count():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        writer_id = (await ac.post("/api/authors", json={"title": "Stat Writer"})).json()["id"]
+        idle_id = (await ac.post("/api/authors", json={"title": "Stat Idle"})).json()["id"]
+        for title, genre, count in [("One", BookGenre.POETRY, 3),
+                                    ("Two", BookGenre.POETRY, 4),
+                                    ("Three", BookGenre.HORROR, 5)]:
+            response = await ac.post("/api/books", json={"title": title, "author_id": writer_id,
+                                                         "genre": genre, "count": count})
+            assert response.status_code == status.HTTP_200_OK
+
+        stats = {}
+        params = {"limit": 1, "copies": True, "genres": True}
+        while True:
+            response = await ac.get("/api/authors/stat", params=params)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.json()) <= 1
+            stats.update({item["author_id"]: item for item in response.json()})
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+
+        assert stats[writer_id] == {"author_id": writer_id, "count": 3, "copies": 12,
+                                    "genres": {BookGenre.POETRY: 2, BookGenre.HORROR: 1}}
+        assert stats[idle_id] == {"author_id": idle_id, "count": 0, "copies": 0, "genres": {}}
+
+        plain = await ac.get("/api/authors/stat", params={"limit": 100})
+        assert all(set(item) == {"author_id", "count"} for item in plain.json())
+
+        invalid = await ac.get("/api/authors/stat", params={"cursor": "not-a-cursor"})
+        assert invalid.status_code == status.HTTP_400_BAD_REQUEST
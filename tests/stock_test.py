@@ -0,0 +1,75 @@
+import asyncio
+import uuid
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette import status
+
+from src.database.models import BookGenre
+from src.main import app
+
+
+@pytest.mark.asyncio
+async def test_stock_changes_are_atomic_and_guarded():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Stock Author"})).json()["id"]
+        book_id = (await ac.post("/api/books", json={"title": "Stock Book", "author_id": author_id,
+                                                     "genre": BookGenre.CHILDREN, "count": 2})).json()["id"]
+        other_id = (await ac.post("/api/books", json={"title": "Stock Other", "author_id": author_id,
+                                                      "genre": BookGenre.CHILDREN, "count": 1})).json()["id"]
+
+        responses = await asyncio.gather(*(ac.post(f"/api/books/{book_id}/stock", json={"delta": 1})
+                                           for _ in range(20)))
+        assert all(response.status_code == status.HTTP_200_OK for response in responses)
+        assert (await ac.get(f"/api/books/{book_id}")).json()["count"] == 22
+
+        drained = await ac.post(f"/api/books/{book_id}/stock", json={"delta": -22})
+        assert drained.json() == {"book_id": book_id, "count": 0}
+        assert (await ac.get(f"/api/books/{book_id}")).json()["count"] == 0
+        short = await ac.post(f"/api/books/{book_id}/stock", json={"delta": -1})
+        assert short.status_code == status.HTTP_409_CONFLICT
+        missing = await ac.post(f"/api/books/{uuid.uuid4()}/stock", json={"delta": 1})
+        assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+        unknown = str(uuid.uuid4())
+        batch = await ac.post("/api/books/stock", json=[
+            {"book_id": book_id, "delta": 3},
+            {"book_id": book_id, "delta": 2},
+            {"book_id": other_id, "delta": -5},
+            {"book_id": unknown, "delta": 1},
+        ])
+        assert batch.status_code == status.HTTP_200_OK
+        assert {item["book_id"]: (item["status"], item["count"]) for item in batch.json()} == {
+            book_id: ("applied", 5),
+            other_id: ("insufficient_stock", 1),
+            unknown: ("not_found", None),
+        }
+        assert (await ac.post("/api/books/stock", json=[])).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_stock_deltas_are_bounded_and_non_zero():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", follow_redirects=True) as ac:
+        author_id = (await ac.post("/api/authors", json={"title": "Bounded Stock Author"})).json()["id"]
+        book_id = (await ac.post("/api/books", json={"title": "Bounded Stock Book", "author_id": author_id,
+                                                     "genre": BookGenre.CHILDREN, "count": 2})).json()["id"]
+        etag = (await ac.get(f"/api/books/{book_id}")).headers["etag"]
+
+        for delta in (0, 3000000000, -3000000000):
+            response = await ac.post(f"/api/books/{book_id}/stock", json={"delta": delta})
+            assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+            batch = await ac.post("/api/books/stock", json=[{"book_id": book_id, "delta": delta}])
+            assert batch.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        # Changes that cancel out are reported without touching the book.
+        batch = await ac.post("/api/books/stock", json=[{"book_id": book_id, "delta": 5},
+                                                        {"book_id": book_id, "delta": -5}])
+        assert batch.json() == [{"book_id": book_id, "status": "applied", "count": 2}]
+        assert (await ac.get(f"/api/books/{book_id}")).headers["etag"] == etag
+
+        overflow = await ac.post(f"/api/books/{book_id}/stock", json={"delta": 2 ** 31 - 2})
+        assert overflow.status_code == status.HTTP_409_CONFLICT
+        batch = await ac.post("/api/books/stock", json=[{"book_id": book_id, "delta": 2 ** 31 - 1},
+                                                        {"book_id": book_id, "delta": 2 ** 31 - 1}])
+        assert batch.json() == [{"book_id": book_id, "status": "out_of_range", "count": 2}]
+        assert (await ac.get(f"/api/books/{book_id}")).json()["count"] == 2